@@ -1,3 +1,6 @@
 #!/bin/bash
 python src/manage.py migrate
+python src/manage.py createcachetable
+python src/manage.py dispatch_outbox &
+python src/manage.py send_notification_digests &
 python src/manage.py runserver 0.0.0.0:8000
\ No newline at end of file
@@ -0,0 +1,41 @@
+from buildings.models import Building
+from buildings.serializers import BuildingSerializer
+
+from proj.api import ConditionalGetMixin, CursorPagination, ModelPermissions
+
+from rest_framework import viewsets
+
+from users.models import AuditEntry
+
+
+class BuildingViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Building.objects.all()
+    serializer_class = BuildingSerializer
+    permission_classes = [ModelPermissions]
+    pagination_class = CursorPagination
+    cursor_ordering = ("name", "id")
+
+    def perform_create(self, serializer):
+        building = serializer.save()
+        AuditEntry.log_action(
+            AuditEntry.BUILDING_CREATED,
+            self.request,
+            f"Budynek '{building.name}' został utworzony.",
+        )
+
+    def perform_update(self, serializer):
+        building = serializer.save()
+        AuditEntry.log_action(
+            AuditEntry.BUILDING_UPDATED,
+            self.request,
+            f"Budynek '{building.name}' został zaktualizowany.",
+        )
+
+    def perform_destroy(self, instance):
+        name = instance.name
+        instance.delete()
+        AuditEntry.log_action(
+            AuditEntry.BUILDING_DELETED,
+            self.request,
+            f"Budynek '{name}' został usunięty.",
+        )
@@ -0,0 +1,41 @@
+from buildings.forms import BuildingForm
+from buildings.models import Building
+
+from django.db import transaction
+
+from proj.autocomplete import invalidate_autocomplete
+from proj.imports import CsvImportError, format_form_errors, read_csv_rows
+
+from users.models import AuditEntry
+
+BUILDING_COLUMNS = ["name", "address"]
+
+
+def import_buildings(stream, request=None, batch_size=500):
+    """
+    Validates every row of the CSV stream and, if all of them are valid,
+    creates the buildings with bulk INSERTs. Returns the created buildings.
+    Raises CsvImportError listing the invalid rows otherwise.
+    """
+    buildings = []
+    errors = []
+    for line, row in read_csv_rows(stream, BUILDING_COLUMNS):
+        form = BuildingForm(row)
+        if form.is_valid():
+            buildings.append(form.save(commit=False))
+        else:
+            errors.extend(format_form_errors(line, form))
+
+    if errors:
+        raise CsvImportError(errors)
+
+    with transaction.atomic():
+        Building.objects.bulk_create(buildings, batch_size=batch_size)
+        AuditEntry.log_action(
+            AuditEntry.BUILDINGS_IMPORTED,
+            request,
+            f"Zaimportowano budynki: {len(buildings)}.",
+        )
+
+    invalidate_autocomplete("buildings")
+    return buildings
@@ -0,0 +1,26 @@
+from buildings.imports import import_buildings
+
+from django.core.management.base import BaseCommand, CommandError
+
+from proj.imports import CsvImportError
+
+
+class Command(BaseCommand):
+    help = "Imports buildings from a UTF-8 CSV file with name and address columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the CSV file.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of rows written per INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                buildings = import_buildings(stream, batch_size=options["batch_size"])
+        except CsvImportError as exc:
+            raise CommandError(f"Import rejected:\n{exc}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(buildings)} buildings."))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buildings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="building",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="building_name_lower_idx",
+            ),
+        ),
+    ]
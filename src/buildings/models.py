@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class Building(models.Model):
@@ -11,5 +14,16 @@ class Building(models.Model):
         verbose_name="Address",
     )
 
+    class Meta:
+        indexes = [models.Index(Lower("name"), name="building_name_lower_idx")]
+
     def __str__(self):
         return self.name
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def building_changed_callback(sender, instance, **kwargs):
+    from proj.autocomplete import invalidate_autocomplete
+
+    invalidate_autocomplete("buildings")
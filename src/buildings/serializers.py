@@ -0,0 +1,11 @@
+from buildings.models import Building
+
+from proj.api import SparseFieldsetMixin
+
+from rest_framework import serializers
+
+
+class BuildingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Building
+        fields = ["id", "name", "address"]
@@ -1,4 +1,5 @@
 from buildings.forms import BuildingForm
+from buildings.imports import BUILDING_COLUMNS, import_buildings
 from buildings.models import Building
 
 from django.contrib import messages
@@ -9,6 +10,10 @@ from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import CreateView, ListView, UpdateView
 
+from proj.autocomplete import AutocompleteView
+from proj.imports import CsvImportView
+from proj.pagination import WindowedPaginator
+
 from users.models import AuditEntry
 
 
@@ -18,6 +23,7 @@ class BuildingListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     template_name = "buildings/building_list.html"
     context_object_name = "buildings"
     paginate_by = 10
+    paginator_class = WindowedPaginator
 
     def get_queryset(self):
         return Building.objects.order_by("name")
@@ -67,6 +73,16 @@ class BuildingCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView
         return super().form_invalid(form)
 
 
+class BuildingImportView(CsvImportView):
+    permission_required = "buildings.add_building"
+    success_url = reverse_lazy("building_list")
+    title = "Import budynków"
+    columns = BUILDING_COLUMNS
+
+    def run_import(self, stream):
+        return len(import_buildings(stream, self.request))
+
+
 class BuildingUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = Building
     permission_required = "buildings.change_building"
@@ -142,3 +158,14 @@ class BuildingDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
                     {"success": False, "message": f"Bląd: {str(e)}"}, status=400
                 )
             return redirect("building_list")
+
+
+class BuildingAutocompleteView(AutocompleteView):
+    model = Building
+    permission_required = "buildings.view_building"
+    search_fields = ("name",)
+    ordering = ("name", "id")
+    namespace = "buildings"
+
+    def get_queryset(self):
+        return Building.objects.only("id", "name")
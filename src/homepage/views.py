@@ -1,15 +1,34 @@
+from collections import defaultdict
+
+from buildings.models import Building
+
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F
+from django.core.exceptions import PermissionDenied
+from django.db.models import F, Sum
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
 from django.views import View
 
-from tasks.models import Task
+from tasks import stats
+from tasks.forms import TaskFilterForm
+from tasks.models import Task, TaskClosureTime, TaskRollup
+
+from users.models import CmmsUser
+
+
+def format_duration(total_seconds):
+    days = int(total_seconds // 86400)
+    hours = int((total_seconds % 86400) // 3600)
+    minutes = int((total_seconds % 3600) // 60)
+    return f"{days} d. {hours} g. {minutes} min."
 
 
 class IndexView(LoginRequiredMixin, View):
     """
     Main page view.
+    The counters are read from the task statistics,
+    only the overdue tasks depend on the current time and are counted here.
     """
 
     def get(self, request):
@@ -20,11 +39,9 @@ class IndexView(LoginRequiredMixin, View):
         else:
             tasks = Task.objects.filter(assigned_person=user)
 
-        total_tasks = tasks.count()
-        open_tasks = tasks.filter(status_field__isnull=True).count()
-        closed_tasks = tasks.filter(status_field="accepted").count()
+        counters = stats.read_counters(None if user.is_manager else user)
         overdue_tasks = tasks.filter(
-            deadline__lt=timezone.now(), status_field__isnull=True
+            status_field__isnull=True, deadline__lt=timezone.now()
         ).count()
 
         status_translation = {
@@ -35,48 +52,32 @@ class IndexView(LoginRequiredMixin, View):
             "low": "Niski",
         }
 
-        category_stats = [
-            {
-                "category": status_translation.get(item["category"], item["category"]),
-                "count": item["count"],
-            }
-            for item in tasks.values("category").annotate(count=Count("id"))
-        ]
-
-        priority_stats = [
-            {
-                "priority": status_translation.get(item["priority"], item["priority"]),
-                "count": item["count"],
-            }
-            for item in tasks.values("priority").annotate(count=Count("id"))
-        ]
+        category_stats = []
+        priority_stats = []
+        for key, count in sorted(counters.items()):
+            group, _, value = key.partition(":")
+            if group == "category":
+                category_stats.append(
+                    {"category": status_translation.get(value, value), "count": count}
+                )
+            elif group == "priority":
+                priority_stats.append(
+                    {"priority": status_translation.get(value, value), "count": count}
+                )
 
         avg_closure_time = None
-        if user.is_manager:
-            avg_closure_time = (
-                Task.objects.filter(status_field="accepted")
-                .annotate(
-                    closure_time=ExpressionWrapper(
-                        F("closed_at") - F("created_at"), output_field=DurationField()
-                    )
-                )
-                .aggregate(avg_closure=Avg("closure_time"))["avg_closure"]
+        if user.is_manager and counters.get("closure_count"):
+            avg_closure_time = format_duration(
+                counters["closure_seconds"] / counters["closure_count"]
             )
 
-            if avg_closure_time:
-                total_seconds = avg_closure_time.total_seconds()
-                days = int(total_seconds // 86400)
-                hours = int((total_seconds % 86400) // 3600)
-                minutes = int((total_seconds % 3600) // 60)
-                avg_closure_time = f"{days} d. {hours} g. {minutes} min."
-
         recent_tasks = tasks.order_by("-created_at")[:5]
 
         context = {
             "user": user,
-            "total_tasks": total_tasks,
-            "open_tasks": open_tasks,
-            "closed_tasks": closed_tasks,
+            "total_tasks": counters.get("total", 0),
+            "open_tasks": counters.get("open", 0),
+            "closed_tasks": counters.get("closed", 0),
             "overdue_tasks": overdue_tasks,
             "category_stats": category_stats,
             "priority_stats": priority_stats,
@@ -85,3 +86,141 @@ class IndexView(LoginRequiredMixin, View):
         }
 
         return render(request, "homepage/index.html", context)
+
+
+class TaskTrendsView(LoginRequiredMixin, View):
+    """
+    Returns the weekly or monthly numbers of created, closed, declined
+    and overdue tasks as JSON, read from the task rollups.
+    Accepts the period, building, category and priority GET parameters.
+    """
+
+    periods_shown = {"week": 52, "month": 36}
+
+    def get(self, request):
+        if not request.user.is_manager:
+            raise PermissionDenied
+
+        period = request.GET.get("period")
+        if period not in self.periods_shown:
+            period = "month"
+        filters = {
+            field: request.GET[field]
+            for field in ("category", "priority")
+            if request.GET.get(field)
+        }
+        building = request.GET.get("building", "")
+        building_id = int(building) if building.isdigit() else None
+
+        now = timezone.now()
+        starts = [stats.period_start(now, period)]
+        for _ in range(self.periods_shown[period] - 1):
+            starts.append(stats.previous_period_start(starts[-1], period))
+        starts.reverse()
+
+        totals = defaultdict(int)
+        rollups = (
+            TaskRollup.objects.filter(
+                period=period,
+                building_id=building_id,
+                period_start__gte=starts[0],
+                **filters,
+            )
+            .values("period_start", "metric")
+            .annotate(total=Sum("value"))
+            .order_by()
+        )
+        for row in rollups:
+            totals[(row["period_start"], row["metric"])] = row["total"]
+
+        # the deadlines of the current period that have not passed are not overdue yet
+        current_overdue = Task.objects.filter(
+            deadline__gte=TaskFilterForm.start_of_day(starts[-1]),
+            deadline__lt=now,
+            **filters,
+        ).exclude(status_field="accepted", closed_at__lte=F("deadline"))
+        if building_id:
+            current_overdue = current_overdue.filter(building=building_id)
+
+        series = {
+            metric: [totals[(start, metric)] for start in starts]
+            for metric in ("created", "closed", "declined")
+        }
+        series["overdue"] = [
+            totals[(start, "due")] - totals[(start, "due_on_time")]
+            for start in starts[:-1]
+        ] + [current_overdue.count()]
+
+        return JsonResponse(
+            {
+                "period": period,
+                "labels": [start.isoformat() for start in starts],
+                "series": series,
+            }
+        )
+
+
+class ClosureTimeView(LoginRequiredMixin, View):
+    """
+    Mean and p50, p90 and p99 closure times of accepted tasks
+    per building, assigned person and category,
+    read from the closure time histograms.
+    """
+
+    def get(self, request):
+        if not request.user.is_manager:
+            raise PermissionDenied
+
+        histograms = defaultdict(list)
+        buckets = TaskClosureTime.objects.filter(count__gt=0).values_list(
+            "dimension", "key", "bucket", "count", "total_seconds"
+        )
+        for dimension, key, *bucket in buckets:
+            histograms[(dimension, key)].append(bucket)
+
+        def ids(dimension):
+            return [int(key) for kind, key in histograms if kind == dimension]
+
+        labels = {
+            "all": {"": "Wszystkie zadania"},
+            "category": dict(Task.CATEGORY_CHOICES),
+            "building": {
+                str(pk): name
+                for pk, name in Building.objects.filter(
+                    pk__in=ids("building")
+                ).values_list("pk", "name")
+            },
+            "person": {
+                str(person.pk): person.full_name
+                for person in CmmsUser.objects.filter(pk__in=ids("person")).only(
+                    "first_name", "last_name"
+                )
+            },
+        }
+
+        sections = []
+        for dimension, title, label in [
+            ("all", "Wszystkie zadania", ""),
+            ("building", "Według budynku", "Budynek"),
+            ("person", "Według przypisanej osoby", "Przypisana osoba"),
+            ("category", "Według kategorii", "Kategoria"),
+        ]:
+            rows = []
+            for (kind, key), histogram in histograms.items():
+                summary = stats.summarize_closure_times(histogram)
+                if kind != dimension or key not in labels[kind] or summary is None:
+                    continue
+                rows.append(
+                    {
+                        "label": labels[kind][key],
+                        "count": summary["count"],
+                        **{
+                            name: format_duration(summary[name])
+                            for name in ("mean", "p50", "p90", "p99")
+                        },
+                    }
+                )
+            rows.sort(key=lambda row: row["label"])
+            sections.append({"title": title, "label": label, "rows": rows})
+
+        return render(request, "homepage/closure_times.html", {"sections": sections})
@@ -0,0 +1,55 @@
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.utils import timezone
+
+from mailing.models import OutboxMessage
+from mailing.outbox import CLAIM_TIMEOUT
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "subject",
+        "to",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+    ]
+    list_filter = ["status", "created_at"]
+    search_fields = ["subject"]
+    actions = ["retry_now"]
+
+    @admin.action(description="Wyślij ponownie")
+    def retry_now(self, request, queryset):
+        """
+        Queues the selected messages again. Messages being sent by
+        a dispatcher are skipped unless their claim has expired, see claim.
+        The body of a sensitive message is erased once it has failed
+        for the last time, so those are skipped as well.
+        """
+        queryset = queryset.filter(
+            Q(status__in=[OutboxMessage.PENDING, OutboxMessage.FAILED])
+            | Q(
+                status=OutboxMessage.SENDING,
+                claimed_at__lt=timezone.now() - CLAIM_TIMEOUT,
+            )
+        )
+        erased = queryset.filter(sensitive=True, body="")
+        skipped = erased.count()
+        count = queryset.exclude(pk__in=erased).update(
+            status=OutboxMessage.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            claim_token="",
+        )
+        self.message_user(request, f"Wiadomości ponownie w kolejce: {count}.")
+        if skipped:
+            self.message_user(
+                request,
+                f"Pominięto wiadomości z usuniętą treścią: {skipped}. "
+                "Zawierały dane logowania, ustaw użytkownikom nowe hasło, "
+                "aby wysłać je ponownie.",
+                messages.WARNING,
+            )
@@ -0,0 +1,95 @@
+import mimetypes
+from email import encoders
+from email.mime.base import MIMEBase
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+SIGNING_SALT = "mailing.attachment"
+ENCODED_CACHE_SIZE = 32
+
+
+def attachment_signer():
+    return signing.TimestampSigner(salt=SIGNING_SALT)
+
+
+def attachment_token(name):
+    """
+    Returns the timestamp and signature that grant access to one media file.
+    """
+    start = len(name) + 1
+    return attachment_signer().sign(name)[start:]
+
+
+def is_valid_attachment_token(name, token):
+    try:
+        attachment_signer().unsign(
+            f"{name}:{token}", max_age=settings.EMAIL_ATTACHMENT_LINK_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def absolute_url(path):
+    """
+    Returns the link to a path of the site for use in emails.
+    """
+    domain = (settings.DEFAULT_DOMAIN or "localhost").rstrip("/")
+    if "://" not in domain:
+        domain = f"https://{domain}"
+    return f"{domain}{path}"
+
+
+def attachment_url(name):
+    """
+    Returns an absolute, signed and expiring link to serve_attachment.
+    """
+    path = reverse("serve_attachment", kwargs={"file_path": name})
+    return absolute_url(f"{path}?{urlencode({'token': attachment_token(name)})}")
+
+
+@lru_cache(maxsize=ENCODED_CACHE_SIZE)
+def encoded_attachment(name, size):
+    """
+    Returns the base64-encoded MIME part of a media file.
+    The part is shared by every message inlining the file, so it is read
+    and encoded once. size is part of the key so that a replaced file is read again.
+    """
+    mime_type, _ = mimetypes.guess_type(name)
+    maintype, subtype = (mime_type or "application/octet-stream").split("/", 1)
+    part = MIMEBase(maintype, subtype)
+    with default_storage.open(name, "rb") as file_content:
+        part.set_payload(file_content.read())
+    encoders.encode_base64(part)
+    part.add_header("Content-Disposition", "attachment", filename=name)
+    return part
+
+
+def split_attachments(names):
+    """
+    Returns the MIME parts of the files up to EMAIL_ATTACHMENT_INLINE_MAX_SIZE bytes
+    and (name, signed link) pairs for the larger ones. Missing files are skipped.
+    """
+    parts, links = [], []
+    for name in names:
+        if not default_storage.exists(name):
+            continue
+        size = default_storage.size(name)
+        if size <= settings.EMAIL_ATTACHMENT_INLINE_MAX_SIZE:
+            parts.append(encoded_attachment(name, size))
+        else:
+            links.append((name, attachment_url(name)))
+    return parts, links
+
+
+def format_links(links):
+    if not links:
+        return ""
+    days = max(settings.EMAIL_ATTACHMENT_LINK_MAX_AGE // (24 * 3600), 1)
+    lines = "\n".join(f"- {name}: {url}" for name, url in links)
+    return f"\n\nZałączniki do pobrania (linki ważne przez {days} dni):\n{lines}"
@@ -0,0 +1,91 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailing import outbox
+from mailing.models import OutboxMessage
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends the queued emails with a pool of workers, retrying failed "
+        "messages with exponential backoff. Every worker reuses one SMTP "
+        "connection. Runs until interrupted unless --once is given, "
+        "--verbosity 2 prints the timing of every batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of messages sent concurrently.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of messages claimed at a time.",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=outbox.MAX_ATTEMPTS,
+            help="Number of attempts after which a message is marked as failed.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait when no message is due.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the messages that are due and exit.",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        totals = dict.fromkeys(
+            [OutboxMessage.SENT, OutboxMessage.PENDING, OutboxMessage.FAILED], 0
+        )
+        dispatcher = outbox.Dispatcher(
+            workers=options["workers"], max_attempts=options["max_attempts"]
+        )
+        try:
+            with dispatcher:
+                while True:
+                    started = time.perf_counter()
+                    statuses = dispatcher.dispatch(batch_size=options["batch_size"])
+                    if not statuses:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+                        continue
+                    self.report_batch(statuses, time.perf_counter() - started)
+                    for status in statuses:
+                        totals[status] += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent: {totals[OutboxMessage.SENT]}, "
+                f"retrying: {totals[OutboxMessage.PENDING]}, "
+                f"failed: {totals[OutboxMessage.FAILED]}."
+            )
+        )
+
+    def report_batch(self, statuses, seconds):
+        """
+        Prints the size and throughput of every batch with --verbosity 2.
+        """
+        if self.verbosity < 2:
+            return
+        sent = statuses.count(OutboxMessage.SENT)
+        rate = sent / seconds if seconds else 0
+        self.stdout.write(
+            f"Batch of {len(statuses)}: {sent} sent in {seconds:.3f} s "
+            f"({rate:.1f} messages/s)."
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mailing", "0002_outboxmessage_coalesce_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="html_body",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="sensitive",
+            field=models.BooleanField(default=False),
+        ),
+    ]
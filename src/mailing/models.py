@@ -0,0 +1,56 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    An email saved in the same transaction as the change it reports on
+    and delivered later by the dispatch_outbox command.
+    Attachments are storage names, read when the message is sent.
+    The bodies of sensitive messages, such as the ones with a password,
+    are erased once the message has been sent.
+    """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (PENDING, "Oczekuje"),
+        (SENDING, "Wysyłanie"),
+        (SENT, "Wysłano"),
+        (FAILED, "Błąd"),
+    ]
+
+    subject = models.TextField()
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    sensitive = models.BooleanField(default=False)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    attachments = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claim_token = models.CharField(max_length=32, blank=True)
+    coalesce_key = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_status_next_idx"
+            ),
+            models.Index(
+                fields=["coalesce_key"],
+                condition=models.Q(status="pending"),
+                name="outbox_pending_coalesce_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to}"
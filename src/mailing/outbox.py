@@ -0,0 +1,354 @@
+import datetime
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from mailing.attachments import format_links, split_attachments
+from mailing.models import OutboxMessage
+
+from proj.settings import DEFAULT_FROM_EMAIL
+
+from users.models import AuditEntry
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = datetime.timedelta(minutes=1)
+MAX_RETRY_DELAY = datetime.timedelta(hours=1)
+CLAIM_TIMEOUT = datetime.timedelta(minutes=10)
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_message(
+    subject,
+    body,
+    to,
+    attachments=(),
+    from_email=DEFAULT_FROM_EMAIL,
+    coalesce_key="",
+    send_after=None,
+    html_body="",
+    sensitive=False,
+):
+    """
+    Returns an unsaved OutboxMessage.
+    attachments are storage names of the files to attach when the message is sent.
+    html_body is sent as an HTML alternative of body, both are erased
+    once a sensitive message has been sent or has finally failed.
+    A message with a coalesce_key replaces the waiting message with the same key,
+    see enqueue. send_after is a timedelta postponing the first attempt.
+    """
+    message = OutboxMessage(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        sensitive=sensitive,
+        from_email=from_email,
+        to=list(to),
+        attachments=list(attachments),
+        coalesce_key=coalesce_key,
+    )
+    if send_after:
+        message.next_attempt_at = timezone.now() + send_after
+    return message
+
+
+def enqueue(messages):
+    """
+    Saves the messages with a single INSERT.
+    A message whose coalesce_key matches a message that has not been picked up
+    by the dispatcher yet replaces the content of that message instead,
+    keeping its send time, so a burst of events ends up in one email.
+    Call it inside the transaction that makes the change the messages report on,
+    so that they are only sent if that change is committed.
+    """
+    keyed = {}
+    new = []
+    for message in messages:
+        if message.coalesce_key:
+            keyed[message.coalesce_key] = message
+        else:
+            new.append(message)
+
+    waiting = {}
+    if keyed:
+        waiting = dict(
+            OutboxMessage.objects.filter(
+                coalesce_key__in=keyed, status=OutboxMessage.PENDING, attempts=0
+            ).values_list("coalesce_key", "pk")
+        )
+    coalesced = []
+    for key, message in keyed.items():
+        updated = key in waiting and OutboxMessage.objects.filter(
+            pk=waiting[key], status=OutboxMessage.PENDING
+        ).update(
+            subject=message.subject,
+            body=message.body,
+            html_body=message.html_body,
+            sensitive=message.sensitive,
+            from_email=message.from_email,
+            to=message.to,
+            attachments=message.attachments,
+        )
+        if updated:
+            message.pk = waiting[key]
+            coalesced.append(message)
+        else:
+            new.append(message)
+    return OutboxMessage.objects.bulk_create(new) + coalesced
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with jitter: about 1, 2, 4... minutes, capped at an hour.
+    """
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(batch_size):
+    """
+    Marks up to batch_size due messages as being sent and returns their ids.
+    Messages left in sending for longer than CLAIM_TIMEOUT by a crashed
+    dispatcher are claimed again. The claim token makes concurrent
+    dispatchers skip the rows another one has claimed first.
+    """
+    now = timezone.now()
+    due = Q(status=OutboxMessage.PENDING, next_attempt_at__lte=now) | Q(
+        status=OutboxMessage.SENDING, claimed_at__lt=now - CLAIM_TIMEOUT
+    )
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        OutboxMessage.objects.filter(due, id__in=ids).update(
+            status=OutboxMessage.SENDING, claimed_at=now, claim_token=token
+        )
+    return list(
+        OutboxMessage.objects.filter(claim_token=token)
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)
+    )
+
+
+def build_email(message):
+    """
+    Inlines the small attachments and links to the large ones.
+    """
+    parts, links = split_attachments(message.attachments)
+    email = EmailMultiAlternatives(
+        message.subject,
+        message.body + format_links(links),
+        message.from_email,
+        message.to,
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, "text/html")
+    for part in parts:
+        email.attach(part)
+    return email
+
+
+class MailSender:
+    """
+    An email backend connection kept open across messages and batches.
+    It is opened on first use and reopened once when the server has dropped it.
+    """
+
+    def __init__(self):
+        self.connection = get_connection()
+
+    def send_messages(self, emails):
+        """
+        Sends the emails with as few send_messages calls as the backend allows
+        and returns the exception every email failed with, or None if it was sent.
+        The backend stops at the first email it cannot send. It is handed
+        the emails one at a time, so the failed one is known and the rest
+        of the batch goes out with the next call.
+        """
+        results = []
+        reconnected_at = None
+        while len(results) < len(emails):
+            sent = len(results)
+            pending = emails[sent:]
+            handed = []
+
+            def hand_over():
+                for email in pending:
+                    handed.append(email)
+                    yield email
+
+            try:
+                self.connection.open()
+                self.connection.send_messages(hand_over())
+            except Exception as exc:
+                results.extend([None] * (len(handed) - 1))
+                dropped = isinstance(
+                    exc, (smtplib.SMTPServerDisconnected, ConnectionError)
+                )
+                if dropped and reconnected_at != len(results):
+                    reconnected_at = len(results)
+                    self.close()
+                else:
+                    results.append(exc)
+            else:
+                results.extend([None] * len(pending))
+        return results
+
+    def close(self):
+        try:
+            self.connection.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+class Dispatcher:
+    """
+    Sends the claimed messages with a pool of worker threads.
+    Every worker keeps its own MailSender for as long as the dispatcher runs,
+    so the SMTP handshake is paid once per worker, not once per message.
+    With a single worker the messages are sent in the calling thread.
+    """
+
+    def __init__(self, workers=4, max_attempts=MAX_ATTEMPTS):
+        self.workers = max(workers, 1)
+        self.max_attempts = max_attempts
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.senders = []
+        self.pool = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        for sender in self.senders:
+            sender.close()
+        self.senders = []
+
+    def get_sender(self):
+        sender = getattr(self.local, "sender", None)
+        if sender is None:
+            sender = self.local.sender = MailSender()
+            with self.lock:
+                self.senders.append(sender)
+        return sender
+
+    def dispatch(self, batch_size=100):
+        """
+        Claims one batch of due messages and splits it between the workers.
+        Returns a list with the new status of every claimed message.
+        """
+        ids = claim(batch_size)
+        if self.pool is None or len(ids) <= 1:
+            return self.deliver_batch(ids)
+        step = self.workers
+        chunks = [ids[start::step] for start in range(step)]
+        results = self.pool.map(
+            self.deliver_in_thread, [chunk for chunk in chunks if chunk]
+        )
+        return [status for statuses in results for status in statuses]
+
+    def deliver_in_thread(self, ids):
+        try:
+            return self.deliver_batch(ids)
+        finally:
+            connection.close()
+
+    def send_messages(self, messages):
+        """
+        Builds the emails and sends them with the worker's connection in one go.
+        Returns the exception every message failed with, or None if it was sent.
+        """
+        errors = [None] * len(messages)
+        emails = []
+        for position, message in enumerate(messages):
+            try:
+                emails.append((position, build_email(message)))
+            except Exception as exc:
+                errors[position] = exc
+        results = self.get_sender().send_messages([email for _, email in emails])
+        for (position, _), error in zip(emails, results):
+            errors[position] = error
+        return errors
+
+    def deliver_batch(self, ids):
+        """
+        Sends the messages over the worker's connection, see send_messages,
+        and saves their new status with a single UPDATE. A failed message
+        is scheduled again after retry_delay, until max_attempts is reached.
+        The bodies of sensitive messages are erased once they are sent
+        or have failed for the last time.
+        """
+        if not ids:
+            return []
+        started = time.perf_counter()
+        messages = list(OutboxMessage.objects.filter(pk__in=ids).order_by("id"))
+        sent, failed = [], []
+        for message, error in zip(messages, self.send_messages(messages)):
+            description = f"{message.subject} -> {message.to}"
+            message.attempts += 1
+            message.claim_token = ""
+            if error is not None:
+                message.last_error = f"{type(error).__name__}: {error}"
+                if message.attempts >= self.max_attempts:
+                    message.status = OutboxMessage.FAILED
+                    failed.append(description)
+                else:
+                    message.status = OutboxMessage.PENDING
+                    message.next_attempt_at = timezone.now() + retry_delay(
+                        message.attempts
+                    )
+            else:
+                message.status = OutboxMessage.SENT
+                message.sent_at = timezone.now()
+                message.last_error = ""
+                sent.append(description)
+
+        OutboxMessage.objects.bulk_update(
+            messages,
+            [
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "last_error",
+                "sent_at",
+                "claim_token",
+            ],
+        )
+        erased = [
+            message.pk
+            for message in messages
+            if message.sensitive
+            and message.status in (OutboxMessage.SENT, OutboxMessage.FAILED)
+        ]
+        if erased:
+            OutboxMessage.objects.filter(pk__in=erased).update(body="", html_body="")
+        if sent:
+            AuditEntry.log_actions(AuditEntry.EMAIL_SENT, None, sent)
+        if failed:
+            AuditEntry.log_actions(AuditEntry.EMAIL_FAILED, None, failed)
+        logger.info(
+            "Sent %d of %d messages in %.3f s",
+            len(sent),
+            len(messages),
+            time.perf_counter() - started,
+        )
+        return [message.status for message in messages]
@@ -0,0 +1,72 @@
+from django.utils.cache import get_conditional_response, set_response_etag
+
+from rest_framework import pagination, permissions
+
+
+def get_requested_fields(request):
+    """
+    Returns the set of field names requested with ?fields=a,b on a safe request,
+    or None if the full representation should be returned.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    fields = request.query_params.get("fields")
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(",") if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin dropping the fields not listed in the ?fields= parameter.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = get_requested_fields(self.context.get("request"))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+class ModelPermissions(permissions.DjangoModelPermissions):
+    """
+    Same as DjangoModelPermissions, but reading also requires the view permission.
+    """
+
+    perms_map = {
+        **permissions.DjangoModelPermissions.perms_map,
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+    }
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Cursor pagination ordered by the view's cursor_ordering,
+    so deep pages cost the same as the first one and no COUNT(*) is issued.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, "cursor_ordering", ("-id",))
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin adding an ETag to successful GET responses
+    and answering 304 Not Modified when it matches If-None-Match.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") or response.status_code != 200:
+            return response
+        response.render()
+        set_response_etag(response)
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
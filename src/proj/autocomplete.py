@@ -0,0 +1,139 @@
+import hashlib
+
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views import View
+
+from django_select2.forms import ModelSelect2MultipleWidget, ModelSelect2Widget
+
+
+def get_cache_version(namespace):
+    return cache.get_or_set(f"autocomplete:{namespace}:version", 1, None)
+
+
+def invalidate_autocomplete(namespace):
+    """
+    Makes the cached autocomplete pages of the namespace stale.
+    """
+    key = f"autocomplete:{namespace}:version"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def filter_by_prefix(queryset, fields, term):
+    """
+    Returns the rows where any of the fields starts with the term, case-insensitively.
+    The prefix is expressed as a range over LOWER(field), so the lookup
+    is served by an index on that expression.
+    """
+    term = term.lower()
+    upper_bound = term[:-1] + chr(ord(term[-1]) + 1)
+    condition = Q()
+    for field in fields:
+        alias = f"{field}_lower"
+        queryset = queryset.alias(**{alias: Lower(field)})
+        condition |= Q(
+            **{
+                f"{alias}__gte": term,
+                f"{alias}__lt": upper_bound,
+                f"{alias}__startswith": term,
+            }
+        )
+    return queryset.filter(condition)
+
+
+class AutocompleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Serves a page of select2 results for ?term=&page=.
+    Every word of the term must prefix-match one of the search_fields.
+    Pages are cached until the namespace is invalidated, which takes
+    a cache shared by all the processes, see CACHES.
+    """
+
+    model = None
+    search_fields = ()
+    ordering = ()
+    namespace = ""
+    page_size = 20
+    cache_timeout = 300
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def get_label(self, obj):
+        return str(obj)
+
+    def get_page(self, term, page):
+        queryset = self.get_queryset()
+        for word in term.split():
+            queryset = filter_by_prefix(queryset, self.search_fields, word)
+        offset = (page - 1) * self.page_size
+        end = offset + self.page_size + 1
+        rows = list(queryset.order_by(*self.ordering)[offset:end])
+        more = len(rows) > self.page_size
+        if more:
+            rows.pop()
+        return {
+            "results": [{"id": obj.pk, "text": self.get_label(obj)} for obj in rows],
+            "pagination": {"more": more},
+        }
+
+    def get(self, request, *args, **kwargs):
+        term = request.GET.get("term", "").strip()[:100]
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+
+        digest = hashlib.md5(term.lower().encode()).hexdigest()
+        version = get_cache_version(self.namespace)
+        key = f"autocomplete:{self.namespace}:{version}:{digest}:{page}"
+        data = cache.get(key)
+        if data is None:
+            data = self.get_page(term, page)
+            cache.set(key, data, self.cache_timeout)
+
+        response = JsonResponse(data)
+        # The browser revalidates every time, so a new record shows up at once
+        # and an unchanged page costs a 304 served from the cache
+        response["Cache-Control"] = "private, no-cache"
+        set_response_etag(response)
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
+
+
+class AutocompleteWidgetMixin:
+    """
+    Renders only the selected options and lets select2 fetch the others
+    page by page from one of the AutocompleteView endpoints.
+    """
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        base_attrs = {
+            "data-minimum-input-length": 0,
+            "data-ajax--delay": 250,
+            **base_attrs,
+        }
+        return super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+
+    def set_to_cache(self):
+        """
+        The endpoints do not depend on the widget, so nothing needs to be cached.
+        """
+
+
+class AutocompleteSelectWidget(AutocompleteWidgetMixin, ModelSelect2Widget):
+    pass
+
+
+class AutocompleteSelectMultipleWidget(
+    AutocompleteWidgetMixin, ModelSelect2MultipleWidget
+):
+    pass
@@ -0,0 +1,136 @@
+import csv
+import io
+
+from django import forms
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.views.generic import FormView
+
+MAX_DISPLAYED_ERRORS = 20
+MULTIPLE_VALUES_SEPARATOR = "|"
+
+
+class CsvImportError(Exception):
+    """
+    Raised when an import file is rejected. Holds one message per invalid row.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+def read_csv_rows(stream, columns, optional_columns=()):
+    """
+    Yields (line number, row) pairs from a text stream, one row at a time.
+    Each row is a dict with a stripped value for each of the expected columns
+    and the optional ones, which are empty when the file lacks them.
+    Both comma and semicolon separated files are accepted.
+    Raises CsvImportError if the header lacks any of the columns.
+    """
+    first_line = stream.readline()
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    header = next(csv.reader([first_line], delimiter=delimiter), [])
+    header = [name.strip().lower() for name in header]
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise CsvImportError([f"Brak kolumn: {', '.join(missing)}."])
+
+    reader = csv.reader(stream, delimiter=delimiter)
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        row = dict(zip(header, (value.strip() for value in values)))
+        yield reader.line_num + 1, {
+            column: row.get(column, "") for column in [*columns, *optional_columns]
+        }
+
+
+def resolve_references(value, lookup, label, line, errors, required=True):
+    """
+    Returns the ids of the |-separated names of the value found in the lookup,
+    appending an error for every unknown or ambiguous name.
+    """
+    ids = []
+    for name in filter(
+        None, (part.strip() for part in value.split(MULTIPLE_VALUES_SEPARATOR))
+    ):
+        pk = lookup.get(name.lower())
+        if pk is None:
+            errors.append(f"Wiersz {line}: {label}: nie znaleziono '{name}'.")
+        elif pk is False:
+            errors.append(f"Wiersz {line}: {label}: '{name}' nie jest jednoznaczny.")
+        else:
+            ids.append(pk)
+    if required and not value.strip():
+        errors.append(f"Wiersz {line}: {label}: to pole jest wymagane.")
+    return ids
+
+
+def format_form_errors(line, form):
+    return [
+        f"Wiersz {line}: {field}: {error}"
+        for field, errors in form.errors.items()
+        for error in errors
+    ]
+
+
+class CsvImportForm(forms.Form):
+    file = forms.FileField(
+        label="Plik CSV",
+        widget=forms.ClearableFileInput(
+            attrs={"class": "form-control", "accept": ".csv"}
+        ),
+    )
+
+
+class CsvImportView(LoginRequiredMixin, PermissionRequiredMixin, FormView):
+    """
+    Uploads a UTF-8 CSV file and passes it as a text stream to run_import.
+    Subclasses set the permission, title, columns and success_url
+    and implement run_import.
+    """
+
+    form_class = CsvImportForm
+    template_name = "csv_import.html"
+    title = ""
+    columns = ()
+    column_help = ""
+
+    def run_import(self, stream):
+        """
+        Imports the rows of the text stream and returns how many were created.
+        Must be overridden; invalid files are reported by raising CsvImportError,
+        which is shown as form errors.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} must implement run_import(stream)."
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["title"] = self.title
+        context["columns"] = ", ".join(self.columns)
+        context["column_help"] = self.column_help
+        return context
+
+    def form_valid(self, form):
+        upload = form.cleaned_data["file"]
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            count = self.run_import(stream)
+        except UnicodeDecodeError:
+            form.add_error("file", "Plik musi być zapisany w kodowaniu UTF-8.")
+            return self.form_invalid(form)
+        except CsvImportError as exc:
+            errors = exc.errors[:MAX_DISPLAYED_ERRORS]
+            if len(exc.errors) > MAX_DISPLAYED_ERRORS:
+                errors.append(
+                    f"... oraz {len(exc.errors) - MAX_DISPLAYED_ERRORS} innych błędów."
+                )
+            for error in errors:
+                form.add_error("file", error)
+            return self.form_invalid(form)
+
+        messages.success(self.request, f"Zaimportowano wierszy: {count}.")
+        return super().form_valid(form)
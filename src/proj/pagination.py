@@ -0,0 +1,42 @@
+from django.core.paginator import Page, Paginator
+
+
+class WindowedPage(Page):
+    """
+    Page exposing a precomputed window of page links for the list templates.
+    """
+
+    on_each_side = 2
+
+    @property
+    def page_window(self):
+        """
+        Returns the page numbers to render around the current page.
+        None marks an elided range. The window has a constant size,
+        so rendering does not depend on the total number of pages.
+        """
+        number = self.number
+        num_pages = self.paginator.num_pages
+        start = max(number - self.on_each_side, 1)
+        end = min(number + self.on_each_side, num_pages)
+
+        window = []
+        if start > 1:
+            window.append(1)
+            if start > 2:
+                window.append(None)
+        window.extend(range(start, end + 1))
+        if end < num_pages:
+            if end < num_pages - 1:
+                window.append(None)
+            window.append(num_pages)
+        return window
+
+
+class WindowedPaginator(Paginator):
+    """
+    Paginator shared by the list views, producing WindowedPage objects.
+    """
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
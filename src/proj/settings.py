@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     "users",
     "buildings",
     "tasks",
+    "mailing",
     "django_select2",
     "corsheaders",
 ]
@@ -79,6 +80,16 @@ DATABASES = {
     }
 }
 
+# Shared by the web workers and the management commands, so that
+# invalidate_autocomplete reaches all of them, see proj.autocomplete.
+# The table is created with createcachetable.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cmms_cache",
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -150,6 +161,16 @@ EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "password")
 EMAIL_PORT = os.environ.get("EMAIL_PORT", "465")
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "default_from_email")
 
+# Larger email attachments are sent as signed links, valid for the given seconds
+EMAIL_ATTACHMENT_INLINE_MAX_SIZE = int(
+    os.environ.get("EMAIL_ATTACHMENT_INLINE_MAX_SIZE", 1024 * 1024)
+)
+EMAIL_ATTACHMENT_LINK_MAX_AGE = int(
+    os.environ.get("EMAIL_ATTACHMENT_LINK_MAX_AGE", 7 * 24 * 3600)
+)
+# Task notifications to the same person within this many seconds are merged
+EMAIL_COALESCE_WINDOW = int(os.environ.get("EMAIL_COALESCE_WINDOW", 5))
+
 if not DEBUG_EMAIL:
     EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 else:
@@ -185,6 +206,11 @@ LOGGING = {
             "level": "ERROR",
             "propagate": False,
         },
+        "mailing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
@@ -1,6 +1,9 @@
+from buildings.api import BuildingViewSet
 from buildings.views import (
+    BuildingAutocompleteView,
     BuildingCreateView,
     BuildingDeleteView,
+    BuildingImportView,
     BuildingListView,
     BuildingUpdateView,
 )
@@ -9,14 +12,21 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
-from django.urls import path
+from django.urls import include, path
 
 from homepage import views as homepage_views
 
+from rest_framework.routers import DefaultRouter
+
+from tasks.api import TaskCommentViewSet, TaskViewSet
 from tasks.views import (
+    TaskBulkStatusUpdateView,
     TaskCreateView,
     TaskDeleteView,
+    TaskDetailView,
     TaskEmployeeStatusUpdateView,
+    TaskExportView,
+    TaskImportView,
     TaskLeaveComment,
     TaskListView,
     TaskManagerStatusUpdateView,
@@ -27,10 +37,27 @@ from tasks.views import (
 from users import views as users_views
 
 
+api_router = DefaultRouter()
+api_router.register("buildings", BuildingViewSet, basename="api-building")
+api_router.register("tasks", TaskViewSet, basename="api-task")
+api_router.register("comments", TaskCommentViewSet, basename="api-comment")
+
+
 urlpatterns = (
     [
         path("admin/", admin.site.urls),
+        path("api/", include(api_router.urls)),
         path("", homepage_views.IndexView.as_view(), name="index"),
+        path(
+            "dashboard/trends/",
+            homepage_views.TaskTrendsView.as_view(),
+            name="dashboard_trends",
+        ),
+        path(
+            "dashboard/closure-times/",
+            homepage_views.ClosureTimeView.as_view(),
+            name="closure_times",
+        ),
         path("accounts/login/", users_views.LoginView.as_view(), name="login"),
         path("accounts/logout/", users_views.LogoutView.as_view(), name="logout"),
         path(
@@ -70,7 +97,19 @@ urlpatterns = (
         ),
         path("task/list/", TaskListView.as_view(), name="task_list"),
         path("task/create/", TaskCreateView.as_view(), name="task_create"),
+        path("task/import/", TaskImportView.as_view(), name="task_import"),
+        path(
+            "task/export/<str:export_format>/",
+            TaskExportView.as_view(),
+            name="task_export",
+        ),
         path("task/<int:pk>/update/", TaskUpdateView.as_view(), name="task_update"),
+        path("task/<int:pk>/details/", TaskDetailView.as_view(), name="task_details"),
+        path(
+            "task/status/bulk/",
+            TaskBulkStatusUpdateView.as_view(),
+            name="task_bulk_status_update",
+        ),
         path(
             "task/<int:pk>/status/<str:status>/",
             TaskManagerStatusUpdateView.as_view(),
@@ -89,6 +128,7 @@ urlpatterns = (
         ),
         path("building/list/", BuildingListView.as_view(), name="building_list"),
         path("building/create/", BuildingCreateView.as_view(), name="building_create"),
+        path("building/import/", BuildingImportView.as_view(), name="building_import"),
         path(
             "building/<int:pk>/update/",
             BuildingUpdateView.as_view(),
@@ -99,6 +139,16 @@ urlpatterns = (
             BuildingDeleteView.as_view(),
             name="building_delete",
         ),
+        path(
+            "autocomplete/users/",
+            users_views.UserAutocompleteView.as_view(),
+            name="user_autocomplete",
+        ),
+        path(
+            "autocomplete/buildings/",
+            BuildingAutocompleteView.as_view(),
+            name="building_autocomplete",
+        ),
         path("media/<path:file_path>/", serve_attachment, name="serve_attachment"),
     ]
     + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
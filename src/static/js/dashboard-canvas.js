@@ -62,3 +62,49 @@ document.addEventListener("DOMContentLoaded", function () {
         console.error("Błąd ładowania danych dla wykresów:", error);
     }
 });
+
+document.addEventListener("DOMContentLoaded", function () {
+    const trendCard = document.getElementById("trendCard");
+    if (!trendCard) return;
+
+    const periodSelect = document.getElementById("trendPeriod");
+    const series = [
+        { key: "created", label: "Utworzone", color: "#4bc0c0" },
+        { key: "closed", label: "Zamknięte", color: "#1da024" },
+        { key: "declined", label: "Odrzucone", color: "#ffcb22" },
+        { key: "overdue", label: "Zaległe", color: "#da261d" },
+    ];
+    let trendChart = null;
+
+    function loadTrends() {
+        const url = `${trendCard.dataset.url}?period=${periodSelect.value}`;
+        fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+            .then(response => response.json())
+            .then(data => {
+                const chartData = {
+                    labels: data.labels,
+                    datasets: series.map(item => ({
+                        label: item.label,
+                        data: data.series[item.key],
+                        borderColor: item.color,
+                        backgroundColor: item.color,
+                        tension: 0.2,
+                    })),
+                };
+                if (trendChart) {
+                    trendChart.data = chartData;
+                    trendChart.update();
+                } else {
+                    trendChart = new Chart(document.getElementById("trendChart"), {
+                        type: "line",
+                        data: chartData,
+                        options: { animation: false, interaction: { mode: "index", intersect: false } },
+                    });
+                }
+            })
+            .catch(error => console.error("Błąd ładowania trendów:", error));
+    }
+
+    periodSelect.addEventListener("change", loadTrends);
+    loadTrends();
+});
@@ -1,62 +1,65 @@
 document.addEventListener("DOMContentLoaded", function () {
-    document.querySelectorAll("form[id^='comment-form-']").forEach(form => {
-        form.addEventListener("submit", function (event) {
-            event.preventDefault();
-
-            const formData = new FormData(form);
-            const url = form.getAttribute("data-url");
-
-            const taskPk = form.id.split("-")[2];
-
-            fetch(url, {
-                method: "POST",
-                body: formData,
-                headers: {
-                    "X-CSRFToken": document.querySelector("[name=csrfmiddlewaretoken]").value,
-                },
-            })
-            .then(response => response.json())
-            .then(data => {
-                toastr.options = {
-                    "positionClass": "toast-bottom-left",
-                    "closeButton": true,
-                    "progressBar": true,
-                    "timeOut": "5000"
-                };
-
-                if (data.success) {
-                    document.querySelectorAll(`#comment-text-${taskPk}`).forEach(el => el.value = "");
-
-                    fetch(window.location.href)
-                        .then(response => response.text())
-                        .then(html => {
-                            let parser = new DOMParser();
-                            let doc = parser.parseFromString(html, "text/html");
-                            const newCommentLists = doc.querySelectorAll(`#comment-list-${taskPk}`);
-                            const currentCommentLists = document.querySelectorAll(`#comment-list-${taskPk}`);
-                            
-                            newCommentLists.forEach((newCommentList, index) => {
-                                if (currentCommentLists[index]) {
-                                    currentCommentLists[index].innerHTML = newCommentList.innerHTML;
-                                }
-                            });
+    document.addEventListener("submit", function (event) {
+        const form = event.target;
+        if (!form.id || !form.id.startsWith("comment-form-")) return;
+
+        event.preventDefault();
+
+        const formData = new FormData(form);
+        const url = form.getAttribute("data-url");
+
+        const taskPk = form.id.split("-")[2];
+        const container = form.closest(".task-details-content, .task-details-lazy");
+
+        fetch(url, {
+            method: "POST",
+            body: formData,
+            headers: {
+                "X-CSRFToken": document.querySelector("[name=csrfmiddlewaretoken]").value,
+            },
+        })
+        .then(response => response.json())
+        .then(data => {
+            toastr.options = {
+                "positionClass": "toast-bottom-left",
+                "closeButton": true,
+                "progressBar": true,
+                "timeOut": "5000"
+            };
+
+            if (data.success) {
+                document.querySelectorAll(`#comment-text-${taskPk}`).forEach(el => el.value = "");
+
+                fetch(container.dataset.url, {
+                    headers: {
+                        "X-Requested-With": "XMLHttpRequest",
+                    },
+                })
+                    .then(response => response.json())
+                    .then(details => {
+                        let parser = new DOMParser();
+                        let doc = parser.parseFromString(details.html, "text/html");
+                        const newCommentList = doc.querySelector(`#comment-list-${taskPk}`);
+
+                        document.querySelectorAll(`#comment-list-${taskPk}`).forEach(currentCommentList => {
+                            currentCommentList.innerHTML = newCommentList.innerHTML;
                         });
+                    });
 
-                    toastr.success(data.message);
-                } else {
-                    toastr.error("Wystąpił błąd. Proszę wypełnić poprawnie formularz.");
-                }
-            })
-            .catch(error => {
-                console.error("Błąd:", error);
-                toastr.options = {
-                    "positionClass": "toast-bottom-left",
-                    "closeButton": true,
-                    "progressBar": true,
-                    "timeOut": "5000"
-                };
-                toastr.error("Wystąpił błąd. Spróbuj ponownie później.");
-            });
+                toastr.success(data.message);
+            } else {
+                toastr.error("Wystąpił błąd. Proszę wypełnić poprawnie formularz.");
+            }
+        })
+        .catch(error => {
+            console.error("Błąd:", error);
+            toastr.options = {
+                "positionClass": "toast-bottom-left",
+                "closeButton": true,
+                "progressBar": true,
+                "timeOut": "5000"
+            };
+            toastr.error("Wystąpił błąd. Spróbuj ponownie później.");
         });
     });
-});
\ No newline at end of file
+});
@@ -0,0 +1,60 @@
+document.addEventListener("DOMContentLoaded", function () {
+    function loadTaskDetails(url, container) {
+        container.dataset.url = url;
+        container.innerHTML = "<div class='text-center text-muted'>Ładowanie...</div>";
+
+        fetch(url, {
+            headers: {
+                "X-Requested-With": "XMLHttpRequest",
+            },
+        })
+        .then(response => response.json())
+        .then(data => {
+            container.innerHTML = data.html;
+        })
+        .catch(error => {
+            console.error("Błąd:", error);
+            container.innerHTML = "<div class='text-center text-muted'>Wystąpił błąd. Spróbuj ponownie później.</div>";
+        });
+    }
+
+    const detailsModal = document.getElementById("taskDetailsModal");
+    if (detailsModal) {
+        detailsModal.addEventListener("show.bs.modal", function (event) {
+            const trigger = event.relatedTarget;
+            detailsModal.querySelector(".task-number").textContent = trigger.dataset.taskId;
+            loadTaskDetails(trigger.dataset.url, detailsModal.querySelector(".task-details-content"));
+        });
+    }
+
+    ["taskDeleteModal", "managerTaskDeclinedModal"].forEach(modalId => {
+        const modal = document.getElementById(modalId);
+        if (!modal) return;
+
+        modal.addEventListener("show.bs.modal", function (event) {
+            const trigger = event.relatedTarget;
+            modal.querySelector("form").action = trigger.dataset.url;
+            modal.querySelector(".task-title").textContent = trigger.dataset.title;
+        });
+    });
+
+    document.querySelectorAll(".task-details-lazy").forEach(collapse => {
+        collapse.addEventListener("show.bs.collapse", function () {
+            if (collapse.dataset.loaded) return;
+            collapse.dataset.loaded = "true";
+            loadTaskDetails(collapse.dataset.url, collapse);
+        });
+    });
+
+    // Links in the notification emails open the details of the task they are about
+    const linkedTask = new URLSearchParams(window.location.search).get("task");
+    if (linkedTask) {
+        const button = document.querySelector(`.details-button[data-task-id="${CSS.escape(linkedTask)}"]`);
+        const collapse = document.getElementById(`taskDetails${linkedTask}`);
+        if (button && button.offsetParent !== null) {
+            button.click();
+        } else if (collapse) {
+            bootstrap.Collapse.getOrCreateInstance(collapse).show();
+        }
+    }
+});
@@ -18,4 +18,16 @@ document.addEventListener("DOMContentLoaded", function () {
             toggleIcon.classList.toggle("rotated", isNowExpanded);
         });
     });
-});
\ No newline at end of file
+});
+
+$(document).ready(function () {
+    $(".filter-form .django-select2").select2({
+        allowClear: true,
+        width: "100%",
+        language: {
+            noResults: function () {
+                return "Brak wyników";
+            }
+        }
+    });
+});
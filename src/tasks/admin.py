@@ -1,7 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.models import Permission
 
+from tasks import search
 from tasks.models import Attachment, Task, TaskComment
+from tasks.services import bulk_update_status
 
 
 @admin.register(Attachment)
@@ -27,6 +29,44 @@ class TaskAdmin(admin.ModelAdmin):
     ]
     list_filter = ["category", "priority", "created_at", "closed_at"]
     filter_horizontal = ["assigned_person", "building"]
+    search_fields = ["title"]
+    actions = ["mark_accepted", "mark_declined"]
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Uses the full-text index instead of icontains lookups over the whole table.
+        """
+        if not search_term:
+            return queryset, False
+        return search.search_tasks(queryset, search_term), not search.is_supported()
+
+    def review_confirmed(self, request, queryset, status, message):
+        """
+        Like TaskBulkStatusUpdateView, only reviews the tasks marked as done
+        and reports how many of the selected ones were skipped.
+        """
+        tasks = bulk_update_status(
+            queryset.filter(status_field="confirmed"), status, request
+        )
+        skipped = queryset.count() - len(tasks)
+        message = f"{message}: {len(tasks)}."
+        if skipped:
+            message += f" Pominięto zadania nieoznaczone jako wykonane: {skipped}."
+        self.message_user(
+            request, message, messages.WARNING if skipped else messages.SUCCESS
+        )
+
+    @admin.action(description="Potwierdź wykonanie zaznaczonych zadań")
+    def mark_accepted(self, request, queryset):
+        self.review_confirmed(
+            request, queryset, "accepted", "Wykonanie zadań potwierdzone"
+        )
+
+    @admin.action(description="Nie potwierdzaj wykonania zaznaczonych zadań")
+    def mark_declined(self, request, queryset):
+        self.review_confirmed(
+            request, queryset, "declined", "Wykonanie zadań nie potwierdzone"
+        )
 
     def display_assigned_person(self, obj):
         return ", ".join([user.full_name for user in obj.assigned_person.all()])
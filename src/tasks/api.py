@@ -0,0 +1,142 @@
+from django.db import transaction
+
+from proj.api import (
+    ConditionalGetMixin,
+    CursorPagination,
+    ModelPermissions,
+    get_requested_fields,
+)
+
+from rest_framework import mixins, viewsets
+
+from tasks import notifications
+from tasks.forms import TaskFilterForm
+from tasks.models import Task, TaskComment
+from tasks.serializers import TaskCommentSerializer, TaskSerializer
+from tasks.services import bulk_update_status
+
+from users.models import AuditEntry
+
+
+class TaskCommentPermissions(ModelPermissions):
+    """
+    Comments are read with the task view permission
+    and added with the same permission as in the task list.
+    """
+
+    perms_map = {
+        **ModelPermissions.perms_map,
+        "GET": ["tasks.view_task"],
+        "HEAD": ["tasks.view_task"],
+        "POST": ["tasks.leave_comment"],
+    }
+
+
+class TaskViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Tasks visible to the user, filtered with the same parameters as the task list.
+    Changes send the same notifications as the task views. Status changes go
+    through bulk_update_status, which also sets closed_at.
+    """
+
+    serializer_class = TaskSerializer
+    permission_classes = [ModelPermissions]
+    pagination_class = CursorPagination
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        queryset = Task.objects.visible_to(self.request.user)
+        if self.action == "list":
+            queryset = TaskFilterForm(self.request.query_params).filter_queryset(
+                queryset
+            )
+
+        requested = get_requested_fields(self.request)
+        relations = [
+            name
+            for name in ("building", "assigned_person")
+            if requested is None or name in requested
+        ]
+        return queryset.prefetch_related(*relations)
+
+    def update_status(self, task, status):
+        bulk_update_status(Task.objects.filter(pk=task.pk), status, self.request)
+        task.refresh_from_db()
+
+    def perform_create(self, serializer):
+        status = serializer.validated_data.pop("status_field", None)
+        with transaction.atomic():
+            task = serializer.save(created_by=self.request.user)
+            AuditEntry.log_action(
+                AuditEntry.TASK_CREATED, self.request, f"id={task.id}, {task.title}"
+            )
+            notifications.notify_task_created(task, self.request)
+            if status:
+                self.update_status(task, status)
+
+    def perform_update(self, serializer):
+        status_changed = (
+            "status_field" in serializer.validated_data
+            and serializer.validated_data["status_field"]
+            != serializer.instance.status_field
+        )
+        status = serializer.validated_data.pop("status_field", None)
+        fields_changed = bool(serializer.validated_data)
+        with transaction.atomic():
+            task = serializer.save()
+            if fields_changed:
+                AuditEntry.log_action(
+                    AuditEntry.TASK_UPDATED, self.request, f"id={task.id}, {task.title}"
+                )
+                notifications.notify_task_updated(task, self.request)
+            if status_changed:
+                self.update_status(task, status)
+
+    def perform_destroy(self, instance):
+        task_id, title = instance.id, instance.title
+        emails = list(instance.assigned_person.values_list("email", flat=True))
+        with transaction.atomic():
+            instance.delete()
+            AuditEntry.log_action(
+                AuditEntry.TASK_DELETED, self.request, f"id={task_id}, {title}"
+            )
+            notifications.notify_task_deleted(
+                title, emails, self.request, task_id=task_id
+            )
+
+
+class TaskCommentViewSet(
+    ConditionalGetMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Comments of the tasks visible to the user. ?task=<id> narrows them to one task.
+    As in the task views, comments can only be added, not edited or deleted.
+    """
+
+    serializer_class = TaskCommentSerializer
+    permission_classes = [TaskCommentPermissions]
+    pagination_class = CursorPagination
+    cursor_ordering = ("-creation_date", "-id")
+
+    def get_queryset(self):
+        queryset = TaskComment.objects.filter(
+            task__in=Task.objects.visible_to(self.request.user).values("pk")
+        )
+        task = self.request.query_params.get("task")
+        if task and task.isdigit():
+            queryset = queryset.filter(task_id=task)
+        return queryset
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            comment = serializer.save(user=self.request.user)
+            AuditEntry.log_action(
+                AuditEntry.TASK_COMMENT_CREATED,
+                self.request,
+                f"id={comment.task.id}, {comment.task.title} -> {comment.comment_text}",
+            )
+            notifications.notify_task_commented(comment.task, self.request)
@@ -0,0 +1,183 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+EXPORT_CHUNK_SIZE = 2000
+
+XML_ILLEGAL_CHARACTERS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Spreadsheets evaluate a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+COLUMNS = [
+    "ID",
+    "Tytuł",
+    "Status",
+    "Kategoria",
+    "Priorytet",
+    "Budynki",
+    "Przypisane osoby",
+    "Termin wykonania",
+    "Data utworzenia",
+    "Data zamknięcia",
+    "Utworzono przez",
+    "Opis",
+]
+
+
+def format_datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+def escape_formula(value):
+    """
+    Prefixes text that a spreadsheet would run as a formula with an apostrophe,
+    so that a task titled =HYPERLINK(...) is shown as text.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_task_rows(queryset):
+    """
+    Yields one row per task, reading the queryset in chunks
+    with the related buildings and assignees prefetched per chunk.
+    """
+    queryset = queryset.select_related("created_by").prefetch_related(
+        "building", "assigned_person"
+    )
+    for task in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            task.pk,
+            task.title,
+            task.get_status_field_display() if task.status_field else "",
+            task.get_category_display(),
+            task.get_priority_display(),
+            ", ".join(building.name for building in task.building.all()),
+            ", ".join(person.full_name for person in task.assigned_person.all()),
+            format_datetime(task.deadline),
+            format_datetime(task.created_at),
+            format_datetime(task.closed_at),
+            task.created_by.full_name if task.created_by else "",
+            task.description,
+        ]
+
+
+class StreamBuffer:
+    """
+    Write-only file object collecting the output between two reads.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def read(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class EchoBuffer:
+    """
+    Pseudo-buffer returning what is written to it, for use with csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(EchoBuffer())
+    yield "\ufeff"
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([escape_formula(value) for value in row])
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    "</Types>"
+)
+
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Zadania" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    "</Relationships>"
+)
+
+
+def xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, int):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            text = escape(escape_formula(XML_ILLEGAL_CHARACTERS.sub("", str(value))))
+            cells.append(
+                f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+            )
+    return f"<row>{''.join(cells)}</row>".encode()
+
+
+def stream_xlsx(rows):
+    """
+    Yields a single-sheet XLSX workbook. The sheet is written with inline strings
+    directly into a zip stream, so no part of the file is kept in memory
+    beyond the rows written since the last chunk.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", XLSX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", XLSX_ROOT_RELS)
+        archive.writestr("xl/workbook.xml", XLSX_WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", XLSX_WORKBOOK_RELS)
+        yield buffer.read()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b"<sheetData>"
+            )
+            sheet.write(xlsx_row(COLUMNS))
+            for number, row in enumerate(rows, start=1):
+                sheet.write(xlsx_row(row))
+                if number % EXPORT_CHUNK_SIZE == 0:
+                    yield buffer.read()
+            sheet.write(b"</sheetData></worksheet>")
+    yield buffer.read()
@@ -1,10 +1,18 @@
+import datetime
+
 from buildings.models import Building
 
 from django import forms
+from django.conf import settings
+from django.utils import timezone
 
-from django_select2.forms import Select2MultipleWidget
+from proj.autocomplete import (
+    AutocompleteSelectMultipleWidget,
+    AutocompleteSelectWidget,
+)
 
 from tasks.models import Task, TaskComment
+from tasks.search import search_tasks
 
 from users.models import CmmsUser
 
@@ -42,15 +50,17 @@ class TaskForm(forms.ModelForm):
     )
     assigned_person = forms.ModelMultipleChoiceField(
         queryset=CmmsUser.objects.all(),
-        widget=Select2MultipleWidget(
-            attrs={"class": "form-control", "data-placeholder": "---------"}
+        widget=AutocompleteSelectMultipleWidget(
+            data_view="user_autocomplete",
+            attrs={"class": "form-control", "data-placeholder": "---------"},
         ),
         required=True,
     )
     building = forms.ModelMultipleChoiceField(
         queryset=Building.objects.all(),
-        widget=Select2MultipleWidget(
-            attrs={"class": "form-control", "data-placeholder": "---------"}
+        widget=AutocompleteSelectMultipleWidget(
+            data_view="building_autocomplete",
+            attrs={"class": "form-control", "data-placeholder": "---------"},
         ),
         required=True,
     )
@@ -89,11 +99,27 @@ class TaskForm(forms.ModelForm):
 
 
 class TaskFilterForm(forms.Form):
+    search = forms.CharField(
+        required=False,
+        max_length=200,
+        label="Szukaj",
+        widget=forms.TextInput(
+            attrs={
+                "type": "search",
+                "class": "form-control",
+                "placeholder": "Tytuł, opis lub komentarz",
+            }
+        ),
+    )
+
     assigned_person = forms.ModelChoiceField(
         queryset=CmmsUser.objects.all(),
         required=False,
         label="Przypisana osoba",
-        widget=forms.Select(attrs={"class": "form-select"}),
+        widget=AutocompleteSelectWidget(
+            data_view="user_autocomplete",
+            attrs={"class": "form-select", "data-placeholder": "---------"},
+        ),
     )
 
     status_field = forms.ChoiceField(
@@ -152,3 +178,87 @@ class TaskFilterForm(forms.Form):
         label="Deadline (do)",
         widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
     )
+
+    # Set by the links in the notification emails, see task_context
+    task = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput())
+
+    date_ranges = {
+        "created_at": ("start_date", "end_date"),
+        "closed_at": ("closed_start", "closed_end"),
+        "deadline": ("deadline_start", "deadline_end"),
+    }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for start_field, end_field in self.date_ranges.values():
+            start = cleaned_data.get(start_field)
+            end = cleaned_data.get(end_field)
+            if start and end and start > end:
+                self.add_error(
+                    end_field, "Data końcowa nie może być wcześniejsza niż początkowa."
+                )
+        return cleaned_data
+
+    @staticmethod
+    def start_of_day(date):
+        value = datetime.datetime.combine(date, datetime.time.min)
+        if settings.USE_TZ:
+            value = timezone.make_aware(value)
+        return value
+
+    def filter_queryset(self, queryset):
+        """
+        Returns the queryset narrowed down by the filters that passed validation.
+        A search query annotates the tasks with search_rank.
+        Dates are applied as half-open [start, end + 1 day) ranges on the datetime
+        columns, so the database can use the indexes on them.
+        """
+        self.is_valid()
+        data = getattr(self, "cleaned_data", {})
+
+        if data.get("task"):
+            queryset = queryset.filter(pk=data["task"])
+        if data.get("assigned_person"):
+            queryset = queryset.filter(assigned_person=data["assigned_person"])
+        for field in ("status_field", "category", "priority"):
+            if data.get(field):
+                queryset = queryset.filter(**{field: data[field]})
+
+        if data.get("search"):
+            queryset = search_tasks(queryset, data["search"])
+
+        for column, (start_field, end_field) in self.date_ranges.items():
+            if data.get(start_field):
+                queryset = queryset.filter(
+                    **{f"{column}__gte": self.start_of_day(data[start_field])}
+                )
+            if data.get(end_field):
+                next_day = data[end_field] + datetime.timedelta(days=1)
+                queryset = queryset.filter(
+                    **{f"{column}__lt": self.start_of_day(next_day)}
+                )
+        return queryset
+
+
+class TaskBulkStatusForm(forms.Form):
+    STATUS_CHOICES = [
+        ("accepted", "Wykonanie potwierdzone"),
+        ("declined", "Wykonanie nie potwierdzone"),
+    ]
+
+    tasks = forms.ModelMultipleChoiceField(
+        queryset=Task.objects.all(),
+        error_messages={"required": "Nie zaznaczono żadnego zadania."},
+    )
+    status = forms.ChoiceField(choices=STATUS_CHOICES)
+    comment_text = forms.CharField(required=False, max_length=2048)
+
+
+class TaskImportRowForm(forms.ModelForm):
+    """
+    Validates the task fields of one row of an imported CSV file.
+    """
+
+    class Meta:
+        model = Task
+        fields = ["title", "deadline", "category", "priority", "description"]
@@ -0,0 +1,124 @@
+from buildings.models import Building
+
+from django.db import transaction
+
+from proj.imports import (
+    CsvImportError,
+    format_form_errors,
+    read_csv_rows,
+    resolve_references,
+)
+
+from tasks import search, stats
+from tasks.forms import TaskImportRowForm
+from tasks.models import Task
+from tasks.notifications import notify_imported_tasks
+
+from users.models import AuditEntry, CmmsUser
+
+TASK_COLUMNS = [
+    "title",
+    "description",
+    "category",
+    "priority",
+    "deadline",
+    "buildings",
+    "assigned_person",
+]
+
+
+def get_building_lookup():
+    """
+    Maps lowercased building names to their ids, or to False if the name is not unique.
+    """
+    lookup = {}
+    for pk, name in Building.objects.values_list("pk", "name"):
+        key = name.lower()
+        lookup[key] = False if key in lookup else pk
+    return lookup
+
+
+def import_tasks(stream, request=None, created_by=None, notify=True, batch_size=500):
+    """
+    Validates every row of the CSV stream and, if all of them are valid,
+    creates the tasks and their building and assignee links with bulk INSERTs.
+    Buildings are referenced by name and assignees by email, separated with |.
+    Logs one audit entry and queues one digest email per assignee.
+    Returns the created tasks, or raises CsvImportError listing the invalid rows.
+    """
+    buildings = get_building_lookup()
+    users = {
+        email.lower(): pk for pk, email in CmmsUser.objects.values_list("pk", "email")
+    }
+
+    tasks = []
+    links = []
+    errors = []
+    for line, row in read_csv_rows(stream, TASK_COLUMNS):
+        row_errors = []
+        building_ids = resolve_references(
+            row["buildings"], buildings, "buildings", line, row_errors
+        )
+        person_ids = resolve_references(
+            row["assigned_person"], users, "assigned_person", line, row_errors
+        )
+        form = TaskImportRowForm(row)
+        if not form.is_valid():
+            row_errors = format_form_errors(line, form) + row_errors
+        if row_errors:
+            errors.extend(row_errors)
+            continue
+
+        task = form.save(commit=False)
+        task.created_by = created_by
+        tasks.append(task)
+        links.append((set(building_ids), set(person_ids)))
+
+    if errors:
+        raise CsvImportError(errors)
+
+    TaskBuilding = Task.building.through
+    TaskAssignee = Task.assigned_person.through
+    with transaction.atomic():
+        Task.objects.bulk_create(tasks, batch_size=batch_size)
+        TaskBuilding.objects.bulk_create(
+            [
+                TaskBuilding(task_id=task.pk, building_id=building_id)
+                for task, (building_ids, _) in zip(tasks, links)
+                for building_id in building_ids
+            ],
+            batch_size=batch_size,
+        )
+        TaskAssignee.objects.bulk_create(
+            [
+                TaskAssignee(task_id=task.pk, cmmsuser_id=person_id)
+                for task, (_, person_ids) in zip(tasks, links)
+                for person_id in person_ids
+            ],
+            batch_size=batch_size,
+        )
+        search.index_tasks(task.pk for task in tasks)
+        stats.record_changes(
+            {},
+            {
+                task.pk: (stats.instance_values(task), person_ids, building_ids)
+                for task, (building_ids, person_ids) in zip(tasks, links)
+            },
+        )
+        AuditEntry.log_action(
+            AuditEntry.TASKS_IMPORTED, request, f"Zaimportowano zadania: {len(tasks)}."
+        )
+
+        if notify and tasks:
+            task_ids = [task.pk for task in tasks]
+            created_tasks = []
+            for start in range(0, len(task_ids), batch_size):
+                end = start + batch_size
+                batch = task_ids[start:end]
+                created_tasks.extend(
+                    Task.objects.filter(pk__in=batch).prefetch_related(
+                        "assigned_person", "building"
+                    )
+                )
+            notify_imported_tasks(created_tasks, request)
+    return tasks
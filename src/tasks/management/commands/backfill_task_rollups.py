@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tasks import stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the weekly and monthly task rollups from the whole task history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=stats.ROLLUP_BATCH_SIZE,
+            help="Number of tasks read per query.",
+        )
+
+    def handle(self, *args, **options):
+        count = stats.backfill_rollups(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Task rollups rebuilt, {count} rows."))
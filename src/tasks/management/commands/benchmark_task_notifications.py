@@ -0,0 +1,109 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tasks import notifications
+from tasks.models import Task, TaskComment
+
+from users.models import CmmsUser
+
+TEMPLATES = [
+    "tasks/emails/task_created.txt",
+    "tasks/emails/task_updated.txt",
+    "tasks/emails/task_status_confirmed.txt",
+    "tasks/emails/task_status_reviewed.txt",
+    "tasks/emails/task_commented.txt",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures loading and rendering every task notification for a task "
+        "with many comments, listing the comments the recipient has not seen. The sample task is created in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--comments",
+            type=int,
+            default=300,
+            help="Number of comments of the sample task.",
+        )
+        parser.add_argument(
+            "--assignees",
+            type=int,
+            default=5,
+            help="Number of people assigned to the sample task.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of times each notification is rendered.",
+        )
+
+    def create_sample_task(self, comments, assignees):
+        prefix = uuid.uuid4().hex[:8]
+        users = CmmsUser.objects.bulk_create(
+            [
+                CmmsUser(
+                    email=f"{prefix}.{number}@example.com",
+                    first_name=f"Technik{number}",
+                    last_name="Testowy",
+                    first_login=False,
+                )
+                for number in range(max(assignees, 1))
+            ]
+        )
+        task = Task.objects.create(
+            title="Przegląd instalacji",
+            description="Zadanie utworzone na potrzeby pomiaru.",
+            deadline=timezone.now() + timezone.timedelta(days=7),
+            category="planned",
+            priority="medium",
+            created_by=users[0],
+        )
+        task.assigned_person.set(users)
+        TaskComment.objects.bulk_create(
+            [
+                TaskComment(
+                    task=task,
+                    user=users[number % len(users)],
+                    comment_text=f"Komentarz {number}",
+                )
+                for number in range(comments)
+            ]
+        )
+        return task, users[0]
+
+    def handle(self, *args, **options):
+        repeat = max(options["repeat"], 1)
+        with transaction.atomic():
+            task, author = self.create_sample_task(
+                options["comments"], options["assignees"]
+            )
+            for template_name in TEMPLATES:
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(repeat):
+                        loaded = notifications.load_notification_task(task.pk)
+                        unseen = notifications.unseen_comments(loaded, [author])
+                        _, comments, more = unseen[author.pk]
+                        notifications.render_notification(
+                            template_name,
+                            loaded,
+                            author=author,
+                            comments=comments,
+                            more_comments=more,
+                        )
+                    elapsed = (time.perf_counter() - started) / repeat * 1000
+                self.stdout.write(
+                    f"{template_name}: {elapsed:.2f} ms, "
+                    f"{len(queries) // repeat} queries"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,102 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from tasks.models import Task
+
+from users.models import CmmsUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the query plan and the average execution time of the task list "
+        "and dashboard queries on the configured database. "
+        "Run it before and after migrating to compare index usage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times each query is executed to measure its timing.",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Refresh the planner statistics before explaining the queries.",
+        )
+
+    def get_query_shapes(self):
+        now = timezone.now()
+        week_ago = now - timezone.timedelta(days=7)
+        user = CmmsUser.objects.filter(is_manager=False).first()
+        ordering = ("-created_at", "-id")
+        shapes = {
+            "list page": Task.objects.order_by(*ordering)[:10],
+            "list by status": Task.objects.filter(status_field="confirmed").order_by(
+                *ordering
+            )[:10],
+            "list by category": Task.objects.filter(category="failure").order_by(
+                *ordering
+            )[:10],
+            "list by priority": Task.objects.filter(priority="high").order_by(
+                *ordering
+            )[:10],
+            "list by created_at range": Task.objects.filter(
+                created_at__gte=week_ago, created_at__lt=now
+            ).order_by(*ordering)[:10],
+            "list by closed_at range": Task.objects.filter(
+                closed_at__gte=week_ago, closed_at__lt=now
+            ).order_by(*ordering)[:10],
+            "list by deadline range": Task.objects.filter(
+                deadline__gte=week_ago, deadline__lt=now
+            ).order_by(*ordering)[:10],
+            "dashboard open tasks": Task.objects.filter(
+                status_field__isnull=True
+            ).values("pk"),
+            "dashboard overdue tasks": Task.objects.filter(
+                status_field__isnull=True, deadline__lt=now
+            ).values("pk"),
+            "dashboard closed tasks": Task.objects.filter(
+                status_field="accepted"
+            ).values("closed_at", "created_at"),
+        }
+        if user:
+            shapes["list for assignee"] = Task.objects.filter(
+                assigned_person=user
+            ).order_by(*ordering)[:10]
+            shapes["dashboard for assignee"] = Task.objects.filter(
+                assigned_person=user, status_field__isnull=True
+            ).values("pk")
+        return shapes
+
+    def run_query(self, queryset):
+        """
+        Fetches a page of the list shapes and counts the rows of the dashboard shapes,
+        the same way the views execute them.
+        """
+        if queryset.query.is_sliced:
+            return list(queryset.all())
+        return queryset.count()
+
+    def handle(self, *args, **options):
+        repeat = max(options["repeat"], 1)
+        self.stdout.write(f"Database: {connection.vendor}")
+
+        if options["analyze"]:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        for name, queryset in self.get_query_shapes().items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                self.run_query(queryset)
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(f"\n{name} ({elapsed:.2f} ms)")
+            )
+            self.stdout.write(queryset.explain())
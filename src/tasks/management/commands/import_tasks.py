@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from proj.imports import CsvImportError
+
+from tasks.imports import TASK_COLUMNS, import_tasks
+
+from users.models import CmmsUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports tasks from a UTF-8 CSV file with the columns: "
+        f"{', '.join(TASK_COLUMNS)}. Buildings are referenced by name "
+        "and assignees by email, several of them separated with |."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the CSV file.")
+        parser.add_argument(
+            "--created-by",
+            help="Email of the user recorded as the creator of the tasks.",
+        )
+        parser.add_argument(
+            "--no-notify",
+            action="store_true",
+            help="Do not send the digest emails to the assignees.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of rows written per INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options["created_by"]:
+            try:
+                created_by = CmmsUser.objects.get(email=options["created_by"])
+            except CmmsUser.DoesNotExist:
+                raise CommandError(f"User {options['created_by']} does not exist.")
+
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                tasks = import_tasks(
+                    stream,
+                    created_by=created_by,
+                    notify=not options["no_notify"],
+                    batch_size=options["batch_size"],
+                )
+        except CsvImportError as exc:
+            raise CommandError(f"Import rejected:\n{exc}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(tasks)} tasks."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from tasks import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of tasks and their comments."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Full-text search is not supported on {connection.vendor}."
+                )
+            )
+            return
+        with transaction.atomic():
+            search.index_tasks()
+        self.stdout.write(self.style.SUCCESS("Task search index rebuilt."))
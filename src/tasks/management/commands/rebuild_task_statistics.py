@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from tasks import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the dashboard task statistics and closure time histograms "
+        "and reports the drifted counters."
+    )
+
+    def handle(self, *args, **options):
+        drifted = stats.rebuild()
+        buckets = stats.rebuild_closure_times()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Task statistics rebuilt, {drifted} counters were out of date, "
+                f"{buckets} closure time buckets written."
+            )
+        )
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.notifications import send_pending_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues the digest emails of the users who get their task notifications "
+        "in digests, once their digest interval has passed. Runs until "
+        "interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=60.0,
+            help="Seconds between checks for due digests.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Queue the digests that are due and exit.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                total += send_pending_digests()
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Digests queued: {total}."))
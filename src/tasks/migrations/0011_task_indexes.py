@@ -0,0 +1,79 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buildings", "0001_initial"),
+        ("tasks", "0010_alter_task_category"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["-created_at", "-id"], name="task_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["status_field", "-created_at", "-id"],
+                name="task_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="task_category_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["priority", "-created_at", "-id"],
+                name="task_priority_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["closed_at"], name="task_closed_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["deadline"], name="task_deadline_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("status_field__isnull", True)),
+                fields=["deadline"],
+                name="task_open_deadline_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("status_field", "accepted")),
+                fields=["closed_at", "created_at"],
+                name="task_accepted_closure_idx",
+            ),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX task_assignee_reverse_idx "
+                "ON tasks_task_assigned_person (cmmsuser_id, task_id)"
+            ),
+            reverse_sql="DROP INDEX task_assignee_reverse_idx",
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX task_building_reverse_idx "
+                "ON tasks_task_building (building_id, task_id)"
+            ),
+            reverse_sql="DROP INDEX task_building_reverse_idx",
+        ),
+    ]
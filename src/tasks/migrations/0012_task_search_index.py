@@ -0,0 +1,63 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE tasks_task_fts USING fts5(
+        title, description, comments, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO tasks_task_fts (rowid, title, description, comments)
+    SELECT t.id, t.title, t.description,
+        COALESCE((SELECT group_concat(c.comment_text, ' ')
+                  FROM tasks_taskcomment c WHERE c.task_id = t.id), '')
+    FROM tasks_task t
+    """,
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE TABLE tasks_task_search (
+        task_id bigint PRIMARY KEY REFERENCES tasks_task (id)
+            ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX tasks_task_search_document_idx ON tasks_task_search USING GIN (document)",
+    """
+    INSERT INTO tasks_task_search (task_id, document)
+    SELECT t.id,
+        setweight(to_tsvector('simple', t.title), 'A')
+        || setweight(to_tsvector('simple', t.description), 'B')
+        || setweight(to_tsvector('simple', COALESCE(
+            (SELECT string_agg(c.comment_text, ' ')
+             FROM tasks_taskcomment c WHERE c.task_id = t.id), '')), 'C')
+    FROM tasks_task t
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}
+    for statement in statements.get(vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE tasks_task_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP TABLE tasks_task_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0011_task_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
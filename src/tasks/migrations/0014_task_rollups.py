@@ -0,0 +1,90 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from tasks import stats
+
+
+def fill_rollups(apps, schema_editor):
+    stats.backfill_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buildings", "0002_name_search_indexes"),
+        ("tasks", "0013_task_statistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("week", "Tydzień"), ("month", "Miesiąc")],
+                        max_length=10,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("category", models.CharField(max_length=50)),
+                ("priority", models.CharField(max_length=50)),
+                ("metric", models.CharField(max_length=20)),
+                ("value", models.BigIntegerField(default=0)),
+                (
+                    "building",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_rollups",
+                        to="buildings.building",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["period", "building", "period_start"],
+                        name="task_rollup_period_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "period",
+                            "period_start",
+                            "building",
+                            "category",
+                            "priority",
+                            "metric",
+                        ),
+                        name="task_rollup_unique",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("building__isnull", True)),
+                        fields=(
+                            "period",
+                            "period_start",
+                            "category",
+                            "priority",
+                            "metric",
+                        ),
+                        name="task_rollup_all_buildings_unique",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
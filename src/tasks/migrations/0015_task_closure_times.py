@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+from tasks import stats
+
+
+def fill_closure_times(apps, schema_editor):
+    stats.rebuild_closure_times(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0014_task_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskClosureTime",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("all", "Wszystkie"),
+                            ("building", "Budynek"),
+                            ("person", "Przypisana osoba"),
+                            ("category", "Kategoria"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("key", models.CharField(blank=True, max_length=50)),
+                ("bucket", models.PositiveSmallIntegerField()),
+                ("count", models.BigIntegerField(default=0)),
+                ("total_seconds", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "key", "bucket"),
+                        name="task_closure_time_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_closure_times, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,17 @@
 from buildings.models import Building
 
 from django.db import models
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from tasks import search, stats
 
 from users.models import CmmsUser
 
@@ -20,6 +31,17 @@ class Attachment(models.Model):
         return self.file.name
 
 
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Returns tasks the user is allowed to see: all of them for managers,
+        only the assigned ones for other users.
+        """
+        if user.is_manager:
+            return self
+        return self.filter(assigned_person=user)
+
+
 class Task(models.Model):
     CATEGORY_CHOICES = [
         ("planned", "Zadanie planowe"),
@@ -89,6 +111,37 @@ class Task(models.Model):
         blank=True,
     )
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="task_created_idx"),
+            models.Index(
+                fields=["status_field", "-created_at", "-id"],
+                name="task_status_created_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="task_category_created_idx",
+            ),
+            models.Index(
+                fields=["priority", "-created_at", "-id"],
+                name="task_priority_created_idx",
+            ),
+            models.Index(fields=["closed_at"], name="task_closed_at_idx"),
+            models.Index(fields=["deadline"], name="task_deadline_idx"),
+            models.Index(
+                fields=["deadline"],
+                condition=models.Q(status_field__isnull=True),
+                name="task_open_deadline_idx",
+            ),
+            models.Index(
+                fields=["closed_at", "created_at"],
+                condition=models.Q(status_field="accepted"),
+                name="task_accepted_closure_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -110,3 +163,311 @@ class TaskComment(models.Model):
 
     def __str__(self):
         return self.comment_text
+
+
+class TaskNotification(models.Model):
+    """
+    A task event waiting for the next digest email of a recipient
+    who chose to get their notifications in digests.
+    The snapshot of the task is rendered once per event and shared by all recipients.
+    """
+
+    recipient = models.ForeignKey(
+        CmmsUser,
+        on_delete=models.CASCADE,
+        related_name="pending_notifications",
+    )
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+    event = models.TextField()
+    snapshot = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipient", "created_at"],
+                name="task_notification_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_id}: {self.event}"
+
+
+class CommentWatermark(models.Model):
+    """
+    The newest comment of a task that a recipient has been notified about,
+    so that the next notification only lists the comments added since.
+    While the message that advanced it waits in the outbox, a newer
+    notification replaces that message, so it starts from since_comment_id.
+    """
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="+")
+    recipient = models.ForeignKey(CmmsUser, on_delete=models.CASCADE, related_name="+")
+    since_comment_id = models.PositiveBigIntegerField(default=0)
+    last_comment_id = models.PositiveBigIntegerField(default=0)
+    message = models.ForeignKey(
+        "mailing.OutboxMessage",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["task", "recipient"], name="comment_watermark_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id}/{self.recipient_id}: {self.last_comment_id}"
+
+
+class TaskStatistic(models.Model):
+    """
+    Dashboard counter kept up to date as tasks change.
+    Counters without a user cover all tasks,
+    the others cover the tasks assigned to the user.
+    """
+
+    user = models.ForeignKey(
+        CmmsUser,
+        on_delete=models.CASCADE,
+        related_name="task_statistics",
+        null=True,
+        blank=True,
+    )
+    key = models.CharField(max_length=50)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="task_statistic_user_key_unique"
+            ),
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(user__isnull=True),
+                name="task_statistic_global_key_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id or '*'} {self.key}={self.value}"
+
+
+class TaskRollup(models.Model):
+    """
+    Number of tasks per period, building, category and priority for one metric:
+    created, closed, declined, due or due_on_time.
+    Rollups without a building cover all tasks.
+    """
+
+    PERIOD_CHOICES = [
+        ("week", "Tydzień"),
+        ("month", "Miesiąc"),
+    ]
+
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    building = models.ForeignKey(
+        Building,
+        on_delete=models.CASCADE,
+        related_name="task_rollups",
+        null=True,
+        blank=True,
+    )
+    category = models.CharField(max_length=50)
+    priority = models.CharField(max_length=50)
+    metric = models.CharField(max_length=20)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "period",
+                    "period_start",
+                    "building",
+                    "category",
+                    "priority",
+                    "metric",
+                ],
+                name="task_rollup_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["period", "period_start", "category", "priority", "metric"],
+                condition=models.Q(building__isnull=True),
+                name="task_rollup_all_buildings_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["period", "building", "period_start"],
+                name="task_rollup_period_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.period_start} {self.metric}={self.value}"
+
+
+class TaskClosureTime(models.Model):
+    """
+    Histogram bucket of the closure times of accepted tasks,
+    for all tasks or for the tasks of one building, assigned person or category.
+    See stats.closure_bucket for the bucket boundaries.
+    """
+
+    DIMENSION_CHOICES = [
+        ("all", "Wszystkie"),
+        ("building", "Budynek"),
+        ("person", "Przypisana osoba"),
+        ("category", "Kategoria"),
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=50, blank=True)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+    total_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "key", "bucket"],
+                name="task_closure_time_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} #{self.bucket}={self.count}"
+
+
+@receiver(post_save, sender=Task)
+def task_saved_callback(sender, instance, update_fields=None, **kwargs):
+    """
+    Refreshes the search document of the task,
+    unless the save did not touch the searchable fields.
+    """
+    if update_fields is not None and not {"title", "description"} & set(update_fields):
+        return
+    search.index_tasks([instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted_callback(sender, instance, **kwargs):
+    search.remove_task(instance.pk)
+
+
+@receiver(post_save, sender=TaskComment)
+def task_comment_saved_callback(sender, instance, created=False, **kwargs):
+    """
+    Appends a new comment to the search document of its task.
+    An edited comment needs the whole document rebuilt.
+    """
+    if created:
+        search.index_comment(instance.task_id, instance.comment_text)
+    else:
+        search.index_tasks([instance.task_id])
+
+
+@receiver(post_delete, sender=TaskComment)
+def task_comment_deleted_callback(sender, instance, **kwargs):
+    search.index_tasks([instance.task_id])
+
+
+@receiver(pre_save, sender=Task)
+def task_statistics_pre_save_callback(sender, instance, update_fields=None, **kwargs):
+    """
+    Remembers the counters of the stored task, so that post_save can apply the difference.
+    """
+    instance._statistics_before = {}
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(stats.STAT_FIELDS) & set(update_fields):
+        return
+    instance._statistics_before = stats.snapshot(Task.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Task)
+def task_statistics_post_save_callback(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if not created and not instance._statistics_before:
+        return
+    before = instance._statistics_before
+    _, user_ids, building_ids = before.get(instance.pk, (None, [], []))
+    stats.record_changes(
+        before, {instance.pk: (stats.instance_values(instance), user_ids, building_ids)}
+    )
+
+
+@receiver(pre_delete, sender=Task)
+def task_statistics_pre_delete_callback(sender, instance, **kwargs):
+    instance._statistics_before = stats.snapshot(Task.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Task)
+def task_statistics_post_delete_callback(sender, instance, **kwargs):
+    stats.record_changes(instance._statistics_before, {})
+
+
+def get_relation_changes(instance, action, reverse, pk_set, accessor):
+    """
+    Returns the sign of an m2m_changed action on one of the task relations
+    and the (task values, related ids) pairs it affects,
+    or None if the action does not change the relation.
+    Both ends of the relations use the same accessor name.
+    """
+    if action == "pre_clear":
+        instance._statistics_cleared = set(
+            getattr(instance, accessor).values_list("pk", flat=True)
+        )
+        return None
+    if action == "post_clear":
+        pk_set = instance._statistics_cleared
+    elif action not in ("post_add", "post_remove"):
+        return None
+    if not pk_set:
+        return None
+
+    sign = 1 if action == "post_add" else -1
+    if reverse:
+        tasks = stats.snapshot(Task.objects.filter(pk__in=pk_set))
+        return sign, [(values, [instance.pk]) for values, _, _ in tasks.values()]
+    return sign, [(stats.instance_values(instance), pk_set)]
+
+
+@receiver(m2m_changed, sender=Task.assigned_person.through)
+def task_assignment_changed_callback(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Moves the tasks between the statistics and closure times of their assignees.
+    """
+    changes = get_relation_changes(instance, action, reverse, pk_set, "assigned_person")
+    if changes is not None:
+        sign, pairs = changes
+        stats.record_assignment_changes(pairs, sign)
+
+
+@receiver(m2m_changed, sender=Task.building.through)
+def task_buildings_changed_callback(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Moves the tasks between the rollups and closure times of their buildings.
+    """
+    changes = get_relation_changes(instance, action, reverse, pk_set, "building")
+    if changes is not None:
+        sign, pairs = changes
+        stats.record_building_changes(pairs, sign)
@@ -0,0 +1,449 @@
+import datetime
+import textwrap
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from mailing.attachments import absolute_url
+from mailing.models import OutboxMessage
+from mailing.outbox import enqueue, outbox_message
+
+from tasks.models import CommentWatermark, Task, TaskComment, TaskNotification
+
+from users.models import AuditEntry, CmmsUser
+
+COMMENT_LIMIT = 10
+
+
+def task_summary(task):
+    buildings = ", ".join(building.name for building in task.building.all())
+    return textwrap.dedent(
+        f"""
+        - {task.title} (nr {task.id})
+          Status: {task.get_status_field_display() if task.status_field else '-'}
+          Termin: {task.deadline}
+          Budynek: {buildings}
+        """
+    ).strip()
+
+
+def split_recipients(users):
+    """
+    Returns the users notified at once
+    and the users who collect their notifications in digests.
+    """
+    immediate_users, digest_users = [], []
+    for user in users:
+        if not user.email:
+            continue
+        if user.notification_mode == "digest":
+            digest_users.append(user)
+        else:
+            immediate_users.append(user)
+    return immediate_users, digest_users
+
+
+def buffer_notifications(entries):
+    """
+    Saves (user, event, snapshot, task id) entries for the next digests
+    with a single INSERT.
+    """
+    TaskNotification.objects.bulk_create(
+        [
+            TaskNotification(
+                recipient=user, event=event, snapshot=snapshot, task_id=task_id
+            )
+            for user, event, snapshot, task_id in entries
+        ]
+    )
+
+
+def send_task_digests(tasks, subject, intro, request=None):
+    """
+    Queues one email per assigned person listing all of their tasks,
+    with a single INSERT into the outbox.
+    The tasks of people who get digests are added to their next digest instead.
+    Expects the tasks to have assigned_person and building prefetched.
+    """
+    tasks_by_email = defaultdict(list)
+    buffered = []
+    for task in tasks:
+        summary = task_summary(task)
+        immediate_users, digest_users = split_recipients(task.assigned_person.all())
+        for user in immediate_users:
+            tasks_by_email[user.email].append(summary)
+        buffered.extend(
+            (user, f"{subject}: {task.title}", summary, task.pk)
+            for user in digest_users
+        )
+
+    emails = []
+    descriptions = []
+    for recipient, summaries in tasks_by_email.items():
+        recipient_subject = f"{subject}: {len(summaries)}"
+        message = f"{intro}\n\n" + "\n\n".join(summaries)
+        emails.append(outbox_message(recipient_subject, message, [recipient]))
+        descriptions.append(f"{recipient_subject} -> ['{recipient}']")
+
+    if buffered:
+        buffer_notifications(buffered)
+    if emails:
+        enqueue(emails)
+        AuditEntry.log_actions(AuditEntry.EMAIL_QUEUED, request, descriptions)
+
+
+def notify_bulk_status_update(tasks, request=None):
+    send_task_digests(
+        tasks,
+        "Aktualizacja statusu zadań",
+        "Zmieniono status przypisanych zadań.",
+        request,
+    )
+
+
+def notify_imported_tasks(tasks, request=None):
+    send_task_digests(
+        tasks, "Nowe zadania", "Zostały ci przydzielone nowe zadania:", request
+    )
+
+
+def load_notification_task(pk):
+    """
+    Returns the task with everything the notification templates use
+    except the comments, see unseen_comments, in four queries
+    however many assignees and buildings it has.
+    """
+    return (
+        Task.objects.select_related("created_by")
+        .prefetch_related("assigned_person", "building", "attachments")
+        .get(pk=pk)
+    )
+
+
+def task_context(task):
+    return {
+        "task": task,
+        "assigned_persons": ", ".join(
+            person.full_name for person in task.assigned_person.all()
+        ),
+        "buildings": ", ".join(
+            f"{building.name} ({building.address})" for building in task.building.all()
+        ),
+        "status": task.get_status_field_display() if task.status_field else "-",
+        "deadline": str(task.deadline),
+        "task_url": absolute_url(f"{reverse('task_list')}?task={task.pk}"),
+        "comment_limit": COMMENT_LIMIT,
+    }
+
+
+def render_notification(template_name, task, **context):
+    """
+    Renders a notification body for a task loaded with load_notification_task.
+    The templates are compiled once and kept by the cached template loader.
+    """
+    return render_to_string(template_name, {**task_context(task), **context}).strip()
+
+
+def comment_start(watermark):
+    """
+    Returns the id after which the comments are new to the recipient.
+    While the message that advanced the watermark has not been picked up
+    by the dispatcher, the next notification replaces it, so it has to
+    repeat the comments of that message.
+    """
+    if watermark is None:
+        return 0
+    message = watermark.message
+    if message and message.status == OutboxMessage.PENDING and not message.attempts:
+        return watermark.since_comment_id
+    return watermark.last_comment_id
+
+
+def unseen_comments(task, users):
+    """
+    Returns (start, comments, more) by user id: the id after which the comments
+    of the task are new to the user, up to COMMENT_LIMIT of these comments,
+    newest first, and whether there are more of them.
+    Takes two queries however many comments and users there are, the newest
+    COMMENT_LIMIT comments after the oldest watermark cover every user.
+    """
+    watermarks = {
+        watermark.recipient_id: watermark
+        for watermark in CommentWatermark.objects.filter(
+            task=task, recipient__in=users
+        ).select_related("message")
+    }
+    starts = {user.pk: comment_start(watermarks.get(user.pk)) for user in users}
+    latest = list(
+        TaskComment.objects.filter(task=task, pk__gt=min(starts.values(), default=0))
+        .select_related("user")
+        .order_by("-pk")[: COMMENT_LIMIT + 1]
+    )
+    unseen = {}
+    for user_id, start in starts.items():
+        comments = [comment for comment in latest if comment.pk > start]
+        unseen[user_id] = (
+            start,
+            comments[:COMMENT_LIMIT],
+            len(comments) > COMMENT_LIMIT,
+        )
+    return unseen
+
+
+def advance_watermarks(task, users, unseen, messages):
+    """
+    Records the newest comment each user has been sent with a single query.
+    """
+    message_ids = {message.to[0]: message.pk for message in messages}
+    watermarks = []
+    for user in users:
+        start, comments, _ = unseen[user.pk]
+        watermarks.append(
+            CommentWatermark(
+                task=task,
+                recipient=user,
+                since_comment_id=start,
+                last_comment_id=comments[0].pk if comments else start,
+                message_id=message_ids.get(user.email),
+            )
+        )
+    CommentWatermark.objects.bulk_create(
+        watermarks,
+        update_conflicts=True,
+        unique_fields=["task", "recipient"],
+        update_fields=["since_comment_id", "last_comment_id", "message"],
+    )
+
+
+def task_message(task_id, subject, body, email, attachments=()):
+    """
+    Returns a message to one person about one task, sent after
+    EMAIL_COALESCE_WINDOW seconds. Another notification about the task
+    queued for that person in the meantime replaces it, so a burst of
+    changes ends up in one email showing the latest state.
+    """
+    return outbox_message(
+        subject,
+        body,
+        [email],
+        attachments,
+        coalesce_key=f"task:{task_id}:{email}" if task_id else "",
+        send_after=datetime.timedelta(seconds=settings.EMAIL_COALESCE_WINDOW),
+    )
+
+
+def queue_task_email(task, users, subject, template_name, request=None, **context):
+    """
+    Queues the notification for the users notified at once
+    and adds it to the next digest of the others.
+    The body is only rendered if someone gets it at once.
+    It lists the comments the recipient has not been sent yet, see
+    unseen_comments, and is rendered once per distinct list. Every kind
+    of notification lists them, so that a message replacing a waiting one
+    about the same task still carries the comments of the replaced message.
+    A user listed twice, e.g. a creator who is also an assignee, is notified once.
+    """
+    users = list({user.pk: user for user in users}.values())
+    recipients, digest_users = split_recipients(users)
+    if digest_users:
+        snapshot = task_summary(task)
+        buffer_notifications(
+            (user, subject, snapshot, task.pk) for user in digest_users
+        )
+    if not recipients:
+        return
+    unseen = unseen_comments(task, recipients)
+    rendered, bodies = {}, {}
+    for user in recipients:
+        start, comments, more = unseen[user.pk]
+        if start not in rendered:
+            rendered[start] = render_notification(
+                template_name,
+                task,
+                comments=comments,
+                more_comments=more,
+                **context,
+            )
+        bodies[user.pk] = rendered[start]
+    attachments = [attachment.file.name for attachment in task.attachments.all()]
+    messages = enqueue(
+        [
+            task_message(task.pk, subject, bodies[user.pk], user.email, attachments)
+            for user in recipients
+        ]
+    )
+    advance_watermarks(task, recipients, unseen, messages)
+    emails = [user.email for user in recipients]
+    AuditEntry.log_action(AuditEntry.EMAIL_QUEUED, request, f"{subject} -> {emails}")
+
+
+def notify_task_created(task, request=None):
+    task = load_notification_task(task.pk)
+    queue_task_email(
+        task,
+        task.assigned_person.all(),
+        f"Nowe zadanie: {task.title}",
+        "tasks/emails/task_created.txt",
+        request,
+    )
+
+
+def notify_task_updated(task, request=None):
+    task = load_notification_task(task.pk)
+    queue_task_email(
+        task,
+        task.assigned_person.all(),
+        f"Zmiana zadania: {task.title}",
+        "tasks/emails/task_updated.txt",
+        request,
+    )
+
+
+def notify_status_confirmed(task, request):
+    """
+    Tells the manager and the other assignees that an assignee
+    marked the task as done or took that back.
+    """
+    task = load_notification_task(task.pk)
+    users = [task.created_by] if task.created_by else []
+    users += [
+        person for person in task.assigned_person.all() if person.pk != request.user.pk
+    ]
+    queue_task_email(
+        task,
+        users,
+        f"Aktualizacja statusu: {task.title}",
+        "tasks/emails/task_status_confirmed.txt",
+        request,
+    )
+
+
+def notify_status_reviewed(task, request=None):
+    task = load_notification_task(task.pk)
+    queue_task_email(
+        task,
+        task.assigned_person.all(),
+        f"Aktualizacja statusu: {task.title}",
+        "tasks/emails/task_status_reviewed.txt",
+        request,
+    )
+
+
+def notify_task_commented(task, request):
+    """
+    Tells the creator and the assignees, except the comment author, about a comment.
+    """
+    task = load_notification_task(task.pk)
+    recipients = set(task.assigned_person.all())
+    if task.created_by:
+        recipients.add(task.created_by)
+    recipients.discard(request.user)
+    queue_task_email(
+        task,
+        recipients,
+        f"Dodanie komentarza do zadania: {task.title}",
+        "tasks/emails/task_commented.txt",
+        request,
+        author=request.user,
+    )
+
+
+def notify_task_deleted(title, emails, request=None, task_id=None):
+    if not emails:
+        return
+    subject = f"Usunięcie zadania: {title}"
+    digest_users = list(
+        CmmsUser.objects.filter(email__in=emails, notification_mode="digest")
+    )
+    if digest_users:
+        buffer_notifications(
+            (user, subject, f"- {title} (zadanie usunięte)", None)
+            for user in digest_users
+        )
+        digest_emails = {user.email for user in digest_users}
+        emails = [email for email in emails if email not in digest_emails]
+    if not emails:
+        return
+    body = render_to_string("tasks/emails/task_deleted.txt", {"title": title}).strip()
+    enqueue([task_message(task_id, subject, body, email) for email in emails])
+    AuditEntry.log_action(AuditEntry.EMAIL_QUEUED, request, f"{subject} -> {emails}")
+
+
+def digest_groups(notifications):
+    """
+    Groups the notifications of one recipient by task, in the order of
+    their first event. Each group shows the latest snapshot of its task.
+    """
+    groups = {}
+    for notification in notifications:
+        key = notification.task_id or f"deleted:{notification.pk}"
+        group = groups.setdefault(key, {"entries": []})
+        group["snapshot"] = notification.snapshot
+        group["entries"].append(notification)
+    return list(groups.values())
+
+
+def send_pending_digests(now=None):
+    """
+    Queues one digest email for every recipient whose oldest pending
+    notification is older than their digest interval, and removes the
+    notifications it lists. Recipients who switched back to immediate
+    notifications get their pending ones at once.
+    Returns the number of queued digests.
+    """
+    now = now or timezone.now()
+    oldest = dict(
+        TaskNotification.objects.values("recipient")
+        .annotate(oldest=Min("created_at"))
+        .values_list("recipient", "oldest")
+    )
+    if not oldest:
+        return 0
+    users = CmmsUser.objects.only(
+        "email", "notification_mode", "digest_interval"
+    ).in_bulk(oldest)
+    due = [
+        user
+        for user in users.values()
+        if user.notification_mode != "digest"
+        or oldest[user.pk] <= now - datetime.timedelta(minutes=user.digest_interval)
+    ]
+    if not due:
+        return 0
+
+    with transaction.atomic():
+        pending = TaskNotification.objects.filter(
+            recipient__in=due, created_at__lte=now
+        ).order_by("created_at", "id")
+        by_recipient = defaultdict(list)
+        for notification in pending:
+            by_recipient[notification.recipient_id].append(notification)
+
+        emails = []
+        descriptions = []
+        for user in due:
+            groups = digest_groups(by_recipient[user.pk])
+            if not groups:
+                continue
+            subject = f"Podsumowanie zadań: {len(groups)}"
+            body = render_to_string(
+                "tasks/emails/task_digest.txt", {"groups": groups}
+            ).strip()
+            emails.append(outbox_message(subject, body, [user.email]))
+            descriptions.append(f"{subject} -> ['{user.email}']")
+
+        enqueue(emails)
+        AuditEntry.log_actions(AuditEntry.EMAIL_QUEUED, None, descriptions)
+        TaskNotification.objects.filter(
+            pk__in=[
+                notification.pk
+                for notifications in by_recipient.values()
+                for notification in notifications
+            ]
+        ).delete()
+    return len(emails)
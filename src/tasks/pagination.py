@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(task, reverse=False):
+    """
+    Returns an opaque cursor pointing at the (created_at, id) position of the task.
+    """
+    position = {"c": task.created_at.isoformat(), "i": task.pk}
+    if reverse:
+        position["r"] = 1
+    data = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns a (created_at, id, reverse) tuple decoded from the cursor.
+    Raises Http404 if the cursor has been tampered with.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(data)
+        created_at = parse_datetime(position["c"])
+        pk = int(position["i"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise Http404("Invalid cursor")
+    if created_at is None:
+        raise Http404("Invalid cursor")
+    return created_at, pk, bool(position.get("r"))
+
+
+class CursorPage:
+    """
+    A page of tasks fetched with keyset pagination.
+    Mirrors the parts of django.core.paginator.Page used by the templates.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_by_cursor(queryset, cursor, page_size):
+    """
+    Returns a CursorPage of a queryset ordered by ("-created_at", "-id").
+    The page is fetched with a (created_at, id) range predicate instead of OFFSET,
+    so neither deep pages nor COUNT(*) scans are needed.
+    """
+    reverse = False
+    if cursor:
+        created_at, pk, reverse = decode_cursor(cursor)
+        if reverse:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by("created_at", "id")
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+    rows = list(queryset[: page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if reverse:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(cursor)
+
+    next_cursor = encode_cursor(rows[-1]) if rows and has_next else None
+    previous_cursor = (
+        encode_cursor(rows[0], reverse=True) if rows and has_previous else None
+    )
+    return CursorPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,158 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SQLITE_TABLE = "tasks_task_fts"
+POSTGRESQL_TABLE = "tasks_task_search"
+INDEX_BATCH_SIZE = 500
+
+SQLITE_DOCUMENT = """
+    SELECT t.id, t.title, t.description,
+        COALESCE((SELECT group_concat(c.comment_text, ' ')
+                  FROM tasks_taskcomment c WHERE c.task_id = t.id), '')
+    FROM tasks_task t
+"""
+
+POSTGRESQL_DOCUMENT = """
+    SELECT t.id,
+        setweight(to_tsvector('simple', t.title), 'A')
+        || setweight(to_tsvector('simple', t.description), 'B')
+        || setweight(to_tsvector('simple', COALESCE(
+            (SELECT string_agg(c.comment_text, ' ')
+             FROM tasks_taskcomment c WHERE c.task_id = t.id), '')), 'C')
+    FROM tasks_task t
+"""
+
+
+def is_supported():
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def get_terms(query):
+    """
+    Returns the words of the search query, stripped of any search syntax.
+    """
+    return re.findall(r"\w+", query.lower())
+
+
+def index_tasks(task_ids=None):
+    """
+    Rebuilds the search documents of the given tasks, or of all tasks if None.
+    """
+    if not is_supported():
+        return
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            table, document = SQLITE_TABLE, SQLITE_DOCUMENT
+            key, columns = "rowid", "rowid, title, description, comments"
+        else:
+            table, document = POSTGRESQL_TABLE, POSTGRESQL_DOCUMENT
+            key, columns = "task_id", "task_id, document"
+
+        if task_ids is None:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"INSERT INTO {table} ({columns}) {document}")
+            return
+
+        for start in range(0, len(task_ids), INDEX_BATCH_SIZE):
+            end = start + INDEX_BATCH_SIZE
+            batch = task_ids[start:end]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {key} IN ({placeholders})", batch
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) {document} "
+                f"WHERE t.id IN ({placeholders})",
+                batch,
+            )
+
+
+def index_comment(task_id, comment_text):
+    """
+    Appends a new comment to the search document of its task, without
+    aggregating all the comments of the task again. SQLite still re-tokenizes
+    the row, PostgreSQL only converts the new comment.
+    Rebuilds the document if the task has none yet.
+    """
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"UPDATE {SQLITE_TABLE} SET comments = comments || ' ' || %s "
+                "WHERE rowid = %s",
+                [comment_text, task_id],
+            )
+        else:
+            cursor.execute(
+                f"UPDATE {POSTGRESQL_TABLE} "
+                "SET document = document || setweight(to_tsvector('simple', %s), 'C') "
+                "WHERE task_id = %s",
+                [comment_text, task_id],
+            )
+        updated = cursor.rowcount
+    if not updated:
+        index_tasks([task_id])
+
+
+def remove_task(task_id):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [task_id])
+
+
+def search_tasks(queryset, query):
+    """
+    Returns the tasks matching every word of the query, as a prefix,
+    in the title, description or comments. The queryset is annotated with
+    search_rank, where a higher value means a better match.
+    On databases without a full-text index, falls back to icontains lookups.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        matching_ids = RawSQL(
+            f"SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s", [match]
+        )
+        rank = RawSQL(
+            f"SELECT -bm25({SQLITE_TABLE}, 10.0, 5.0, 1.0) FROM {SQLITE_TABLE} "
+            f"WHERE {SQLITE_TABLE} MATCH %s AND rowid = tasks_task.id",
+            [match],
+            output_field=FloatField(),
+        )
+    elif connection.vendor == "postgresql":
+        match = " & ".join(f"{term}:*" for term in terms)
+        matching_ids = RawSQL(
+            f"SELECT task_id FROM {POSTGRESQL_TABLE} "
+            "WHERE document @@ to_tsquery('simple', %s)",
+            [match],
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {POSTGRESQL_TABLE} "
+            "WHERE task_id = tasks_task.id",
+            [match],
+            output_field=FloatField(),
+        )
+    else:
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term)
+                | Q(description__icontains=term)
+                | Q(taskcomment__comment_text__icontains=term)
+            )
+        return queryset.distinct().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    return queryset.filter(id__in=matching_ids).annotate(search_rank=rank)
@@ -0,0 +1,38 @@
+from proj.api import SparseFieldsetMixin
+
+from rest_framework import serializers
+
+from tasks.models import Task, TaskComment
+
+
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = [
+            "id",
+            "title",
+            "description",
+            "category",
+            "priority",
+            "status_field",
+            "deadline",
+            "created_at",
+            "closed_at",
+            "created_by",
+            "building",
+            "assigned_person",
+        ]
+        read_only_fields = ["created_at", "closed_at", "created_by"]
+
+
+class TaskCommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = TaskComment
+        fields = ["id", "task", "user", "comment_text", "creation_date"]
+        read_only_fields = ["user", "creation_date"]
+
+    def validate_task(self, task):
+        user = self.context["request"].user
+        if not Task.objects.visible_to(user).filter(pk=task.pk).exists():
+            raise serializers.ValidationError("Nie znaleziono zadania.")
+        return task
@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.utils import timezone
+
+from tasks import search, stats
+from tasks.models import Task, TaskComment
+from tasks.notifications import notify_bulk_status_update
+
+from users.models import AuditEntry
+
+
+def bulk_update_status(queryset, status, request=None, comment_text=""):
+    """
+    Moves the tasks of the queryset to the given status with a single UPDATE,
+    adjusts the dashboard statistics, logs one audit entry per task with a single INSERT
+    and queues one email for every assigned person in the same transaction.
+    Tasks already in that status are left untouched.
+    Returns the updated tasks.
+    """
+    tasks = list(
+        queryset.exclude(status_field=status).prefetch_related(
+            "assigned_person", "building"
+        )
+    )
+    if not tasks:
+        return []
+
+    changes = {"status_field": status}
+    if status == "accepted":
+        changes["closed_at"] = timezone.now()
+    task_ids = [task.pk for task in tasks]
+
+    with transaction.atomic():
+        updated = Task.objects.filter(pk__in=task_ids)
+        before = stats.snapshot(updated)
+        updated.update(**changes)
+        stats.record_changes(before, stats.snapshot(updated))
+        if comment_text and request:
+            TaskComment.objects.bulk_create(
+                [
+                    TaskComment(task=task, user=request.user, comment_text=comment_text)
+                    for task in tasks
+                ]
+            )
+            search.index_tasks(task_ids)
+        AuditEntry.log_actions(
+            AuditEntry.TASK_UPDATED,
+            request,
+            [f"id={task.id}, {task.title} -> {status}" for task in tasks],
+        )
+        for task in tasks:
+            for field, value in changes.items():
+                setattr(task, field, value)
+        notify_bulk_status_update(tasks, request)
+    return tasks
@@ -0,0 +1,470 @@
+import datetime
+import math
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+STAT_FIELDS = (
+    "status_field",
+    "category",
+    "priority",
+    "created_at",
+    "closed_at",
+    "deadline",
+)
+ROLLUP_PERIODS = ("week", "month")
+ROLLUP_BATCH_SIZE = 2000
+# closure time buckets grow by 10%, so estimates are within 5% of the real value
+CLOSURE_GAMMA = 1.1
+
+
+def task_counters(values):
+    """
+    Returns the counters a task contributes to, given its STAT_FIELDS values.
+    """
+    counters = {
+        "total": 1,
+        f"category:{values['category']}": 1,
+        f"priority:{values['priority']}": 1,
+    }
+    if values["status_field"] is None:
+        counters["open"] = 1
+    elif values["status_field"] == "accepted":
+        counters["closed"] = 1
+        seconds = closure_seconds(values)
+        if seconds is not None:
+            counters["closure_count"] = 1
+            counters["closure_seconds"] = seconds
+    return counters
+
+
+def closure_seconds(values):
+    """
+    Returns the closure time of an accepted task in seconds, None for other tasks.
+    """
+    if values["status_field"] != "accepted" or not values["closed_at"]:
+        return None
+    if not values["created_at"]:
+        return None
+    return int((values["closed_at"] - values["created_at"]).total_seconds())
+
+
+def closure_bucket(seconds):
+    """
+    Returns the histogram bucket of a closure time.
+    Bucket i holds the times between CLOSURE_GAMMA ** (i - 1) and CLOSURE_GAMMA ** i.
+    """
+    if seconds <= 1:
+        return 0
+    return math.ceil(math.log(seconds, CLOSURE_GAMMA))
+
+
+def bucket_estimate(bucket):
+    return 2 * CLOSURE_GAMMA**bucket / (CLOSURE_GAMMA + 1)
+
+
+def period_start(moment, period):
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    day = moment.date()
+    if period == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def previous_period_start(start, period):
+    if period == "week":
+        return start - datetime.timedelta(days=7)
+    return (start - datetime.timedelta(days=1)).replace(day=1)
+
+
+def task_events(values):
+    """
+    Returns the (metric, moment) pairs a task contributes to the rollups.
+    Declined tasks are counted in the period they were created in,
+    deadlines in the period they fall in, together with the ones met on time.
+    """
+    status = values["status_field"]
+    closed_at = values["closed_at"] if status == "accepted" else None
+    events = [("created", values["created_at"]), ("due", values["deadline"])]
+    if closed_at:
+        events.append(("closed", closed_at))
+        if closed_at <= values["deadline"]:
+            events.append(("due_on_time", values["deadline"]))
+    if status == "declined":
+        events.append(("declined", values["created_at"]))
+    return events
+
+
+def instance_values(task):
+    return {field: getattr(task, field) for field in STAT_FIELDS}
+
+
+def snapshot(queryset):
+    """
+    Returns {task id: (STAT_FIELDS values, assignee ids, building ids)}
+    for the tasks of the queryset.
+    Taken before and after a bulk change, it is passed to record_changes.
+    """
+    rows = {
+        row.pop("pk"): (row, [], [])
+        for row in queryset.order_by().values("pk", *STAT_FIELDS)
+    }
+    if rows:
+        Task = queryset.model
+        assignees = Task.assigned_person.through.objects.filter(
+            task_id__in=rows
+        ).values_list("task_id", "cmmsuser_id")
+        for task_id, user_id in assignees:
+            rows[task_id][1].append(user_id)
+        buildings = Task.building.through.objects.filter(task_id__in=rows).values_list(
+            "task_id", "building_id"
+        )
+        for task_id, building_id in buildings:
+            rows[task_id][2].append(building_id)
+    return rows
+
+
+def add_counters(deltas, counters, user_ids, sign=1):
+    for user_id in user_ids:
+        for key, value in counters.items():
+            deltas[(user_id, key)] += sign * value
+
+
+def add_rollups(deltas, values, building_ids, sign=1):
+    dimensions = (values["category"], values["priority"])
+    for metric, moment in task_events(values):
+        for period in ROLLUP_PERIODS:
+            start = period_start(moment, period)
+            for building_id in building_ids:
+                deltas[(period, start, building_id, *dimensions, metric)] += sign
+
+
+def closure_scopes(user_ids, building_ids):
+    return [("building", str(building_id)) for building_id in building_ids] + [
+        ("person", str(user_id)) for user_id in user_ids
+    ]
+
+
+def add_closure_times(deltas, values, scopes, sign=1):
+    seconds = closure_seconds(values)
+    if seconds is None:
+        return
+    bucket = closure_bucket(seconds)
+    for dimension, key in scopes:
+        count, total = deltas[(dimension, key, bucket)]
+        deltas[(dimension, key, bucket)] = (count + sign, total + sign * seconds)
+
+
+def record_changes(before, after):
+    """
+    Applies the difference between two snapshots
+    to the statistics, rollups and closure times.
+    """
+    counter_deltas = defaultdict(int)
+    rollup_deltas = defaultdict(int)
+    closure_deltas = defaultdict(lambda: (0, 0))
+    for snapshot_rows, sign in ((before, -1), (after, 1)):
+        for values, user_ids, building_ids in snapshot_rows.values():
+            add_counters(counter_deltas, task_counters(values), [None, *user_ids], sign)
+            add_rollups(rollup_deltas, values, [None, *building_ids], sign)
+            scopes = [("all", ""), ("category", values["category"])]
+            scopes += closure_scopes(user_ids, building_ids)
+            add_closure_times(closure_deltas, values, scopes, sign)
+    apply_deltas(counter_deltas)
+    apply_rollup_deltas(rollup_deltas)
+    apply_closure_deltas(closure_deltas)
+
+
+def record_assignment_changes(changes, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) tasks from the statistics of users,
+    given (task values, user ids) pairs.
+    """
+    counter_deltas = defaultdict(int)
+    closure_deltas = defaultdict(lambda: (0, 0))
+    for values, user_ids in changes:
+        add_counters(counter_deltas, task_counters(values), user_ids, sign)
+        add_closure_times(closure_deltas, values, closure_scopes(user_ids, []), sign)
+    apply_deltas(counter_deltas)
+    apply_closure_deltas(closure_deltas)
+
+
+def record_building_changes(changes, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) tasks from the rollups and closure times
+    of buildings, given (task values, building ids) pairs.
+    """
+    rollup_deltas = defaultdict(int)
+    closure_deltas = defaultdict(lambda: (0, 0))
+    for values, building_ids in changes:
+        add_rollups(rollup_deltas, values, building_ids, sign)
+        add_closure_times(
+            closure_deltas, values, closure_scopes([], building_ids), sign
+        )
+    apply_rollup_deltas(rollup_deltas)
+    apply_closure_deltas(closure_deltas)
+
+
+def update_by_delta(model, deltas, lookups, columns=("value",)):
+    """
+    Adds {key: delta} to the columns of the model's rows with one UPDATE
+    per distinct delta, creating the missing rows first.
+    lookups(key) returns the field values identifying the row of the key.
+    With several columns, each delta is a tuple with one value per column.
+    """
+    if len(columns) == 1:
+        deltas = {key: (delta,) for key, delta in deltas.items()}
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    model.objects.bulk_create(
+        [model(**lookups(key)) for key in deltas], ignore_conflicts=True
+    )
+    keys_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        keys_by_delta[delta].append(key)
+    for delta, keys in keys_by_delta.items():
+        condition = Q()
+        for key in keys:
+            condition |= Q(**lookups(key))
+        model.objects.filter(condition).update(
+            **{column: F(column) + value for column, value in zip(columns, delta)}
+        )
+
+
+def apply_deltas(deltas, apps=global_apps):
+    """
+    Adds {(user id or None, key): delta} to the counters.
+    The global counters have no user.
+    """
+    TaskStatistic = apps.get_model("tasks", "TaskStatistic")
+    update_by_delta(
+        TaskStatistic, deltas, lambda scope: {"user_id": scope[0], "key": scope[1]}
+    )
+
+
+def rollup_lookups(key):
+    period, start, building_id, category, priority, metric = key
+    return {
+        "period": period,
+        "period_start": start,
+        "building_id": building_id,
+        "category": category,
+        "priority": priority,
+        "metric": metric,
+    }
+
+
+def apply_rollup_deltas(deltas, apps=global_apps):
+    """
+    Adds {(period, start, building id or None, category, priority, metric): delta}
+    to the rollups. The rollups without a building cover all tasks.
+    """
+    update_by_delta(apps.get_model("tasks", "TaskRollup"), deltas, rollup_lookups)
+
+
+def closure_lookups(key):
+    dimension, dimension_key, bucket = key
+    return {"dimension": dimension, "key": dimension_key, "bucket": bucket}
+
+
+def apply_closure_deltas(deltas, apps=global_apps):
+    """
+    Adds {(dimension, key, bucket): (count, seconds)} to the closure time histograms.
+    """
+    update_by_delta(
+        apps.get_model("tasks", "TaskClosureTime"),
+        deltas,
+        closure_lookups,
+        columns=("count", "total_seconds"),
+    )
+
+
+def read_counters(user=None):
+    """
+    Returns the counters of the user's tasks, or of all tasks if user is None.
+    """
+    TaskStatistic = global_apps.get_model("tasks", "TaskStatistic")
+    return dict(
+        TaskStatistic.objects.filter(user=user)
+        .exclude(value=0)
+        .values_list("key", "value")
+    )
+
+
+def compute_counters(apps=global_apps):
+    """
+    Computes every counter from scratch.
+    """
+    Task = apps.get_model("tasks", "Task")
+    counters = defaultdict(int)
+    for row in Task.objects.values(*STAT_FIELDS).iterator():
+        add_counters(counters, task_counters(row), [None])
+
+    assignees = Task.assigned_person.through.objects.values(
+        "cmmsuser_id", *(f"task__{field}" for field in STAT_FIELDS)
+    )
+    for row in assignees.iterator():
+        values = {field: row[f"task__{field}"] for field in STAT_FIELDS}
+        add_counters(counters, task_counters(values), [row["cmmsuser_id"]])
+    return counters
+
+
+def rebuild(apps=global_apps):
+    """
+    Replaces the stored counters with freshly computed ones.
+    Returns the number of counters that had drifted.
+    """
+    TaskStatistic = apps.get_model("tasks", "TaskStatistic")
+    expected = compute_counters(apps)
+    with transaction.atomic():
+        stored = {
+            (user_id, key): value
+            for user_id, key, value in TaskStatistic.objects.values_list(
+                "user_id", "key", "value"
+            )
+            if value
+        }
+        drifted = sum(
+            1
+            for scope in expected.keys() | stored.keys()
+            if expected.get(scope, 0) != stored.get(scope, 0)
+        )
+        TaskStatistic.objects.all().delete()
+        TaskStatistic.objects.bulk_create(
+            [
+                TaskStatistic(user_id=user_id, key=key, value=value)
+                for (user_id, key), value in expected.items()
+                if value
+            ],
+            batch_size=500,
+        )
+    return drifted
+
+
+def compute_rollups(chunk_size=ROLLUP_BATCH_SIZE, apps=global_apps):
+    """
+    Computes every rollup from scratch, reading the tasks in chunks of chunk_size.
+    Only the rollups are kept in memory.
+    """
+    Task = apps.get_model("tasks", "Task")
+    TaskBuilding = Task.building.through
+    rollups = defaultdict(int)
+    last_id = 0
+    while True:
+        rows = list(
+            Task.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values("pk", *STAT_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return rollups
+        first_id, last_id = rows[0]["pk"], rows[-1]["pk"]
+        building_ids = defaultdict(list)
+        links = TaskBuilding.objects.filter(
+            task_id__gte=first_id, task_id__lte=last_id
+        ).values_list("task_id", "building_id")
+        for task_id, building_id in links:
+            building_ids[task_id].append(building_id)
+        for row in rows:
+            add_rollups(rollups, row, [None, *building_ids[row.pop("pk")]])
+
+
+def backfill_rollups(chunk_size=ROLLUP_BATCH_SIZE, apps=global_apps):
+    """
+    Replaces the stored rollups with ones computed from the whole task history.
+    Returns the number of rollup rows written.
+    """
+    TaskRollup = apps.get_model("tasks", "TaskRollup")
+    rollups = compute_rollups(chunk_size, apps)
+    with transaction.atomic():
+        TaskRollup.objects.all().delete()
+        TaskRollup.objects.bulk_create(
+            [
+                TaskRollup(**rollup_lookups(key), value=value)
+                for key, value in rollups.items()
+                if value
+            ],
+            batch_size=500,
+        )
+    return sum(1 for value in rollups.values() if value)
+
+
+def compute_closure_times(apps=global_apps):
+    """
+    Computes every closure time histogram from scratch.
+    """
+    Task = apps.get_model("tasks", "Task")
+    histograms = defaultdict(lambda: (0, 0))
+    accepted = Task.objects.filter(status_field="accepted", closed_at__isnull=False)
+    for row in accepted.values(*STAT_FIELDS).iterator():
+        scopes = [("all", ""), ("category", row["category"])]
+        add_closure_times(histograms, row, scopes)
+
+    relations = [
+        (Task.assigned_person.through, "cmmsuser_id", "person"),
+        (Task.building.through, "building_id", "building"),
+    ]
+    for through, column, dimension in relations:
+        links = through.objects.filter(
+            task__status_field="accepted", task__closed_at__isnull=False
+        ).values(column, *(f"task__{field}" for field in STAT_FIELDS))
+        for row in links.iterator():
+            values = {field: row[f"task__{field}"] for field in STAT_FIELDS}
+            add_closure_times(histograms, values, [(dimension, str(row[column]))])
+    return histograms
+
+
+def rebuild_closure_times(apps=global_apps):
+    """
+    Replaces the stored closure time histograms with freshly computed ones.
+    Returns the number of histogram buckets written.
+    """
+    TaskClosureTime = apps.get_model("tasks", "TaskClosureTime")
+    histograms = {
+        key: value for key, value in compute_closure_times(apps).items() if value[0]
+    }
+    with transaction.atomic():
+        TaskClosureTime.objects.all().delete()
+        TaskClosureTime.objects.bulk_create(
+            [
+                TaskClosureTime(
+                    **closure_lookups(key), count=count, total_seconds=total_seconds
+                )
+                for key, (count, total_seconds) in histograms.items()
+            ],
+            batch_size=500,
+        )
+    return len(histograms)
+
+
+def summarize_closure_times(buckets, quantiles=(0.5, 0.9, 0.99)):
+    """
+    Returns the count, mean and quantiles in seconds of a histogram
+    given as (bucket, count, total seconds) triples.
+    The mean is exact, the quantiles are within 5% of the real values.
+    """
+    buckets = sorted(
+        (bucket, count, total) for bucket, count, total in buckets if count
+    )
+    count = sum(bucket_count for _, bucket_count, _ in buckets)
+    if not count:
+        return None
+    summary = {
+        "count": count,
+        "mean": sum(total for _, _, total in buckets) / count,
+    }
+    for quantile in quantiles:
+        rank = quantile * (count - 1)
+        seen = 0
+        for bucket, bucket_count, _ in buckets:
+            seen += bucket_count
+            if seen > rank:
+                break
+        summary[f"p{round(quantile * 100)}"] = bucket_estimate(bucket)
+    return summary
@@ -1,106 +1,207 @@
 import datetime
-import mimetypes
 import os
-import textwrap
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.core.mail import EmailMessage
-from django.http import FileResponse, Http404, HttpResponseRedirect, JsonResponse
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
-from django.utils.dateparse import parse_date
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.views import View
 from django.views.generic import CreateView, ListView, UpdateView
 
-from proj.settings import DEFAULT_FROM_EMAIL
+from mailing.attachments import is_valid_attachment_token
 
-from tasks.forms import TaskCommentForm, TaskFilterForm, TaskForm
+from proj.imports import CsvImportView
+from proj.pagination import WindowedPaginator
+
+from tasks import notifications, stats
+from tasks.export import iter_task_rows, stream_csv, stream_xlsx
+from tasks.forms import (
+    TaskBulkStatusForm,
+    TaskCommentForm,
+    TaskFilterForm,
+    TaskForm,
+)
+from tasks.imports import TASK_COLUMNS, import_tasks
 from tasks.models import Attachment, Task, TaskComment
+from tasks.pagination import paginate_by_cursor
+from tasks.services import bulk_update_status
 
 from users.models import AuditEntry
 
 
-class TaskListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class TaskFilterMixin:
+    """
+    Builds the task queryset visible to the user, narrowed down by TaskFilterForm.
+    Shared by the views that must list exactly the same tasks.
+    """
+
+    def get_filtered_queryset(self):
+        queryset = Task.objects.visible_to(self.request.user)
+        self.filter_form = TaskFilterForm(self.request.GET)
+        queryset = self.filter_form.filter_queryset(queryset)
+
+        ordering = ["-created_at", "-id"]
+        if self.is_searching:
+            ordering.insert(0, "-search_rank")
+        return queryset.order_by(*ordering)
+
+    @property
+    def is_searching(self):
+        self.filter_form.is_valid()
+        return bool(self.filter_form.cleaned_data.get("search"))
+
+
+class TaskListView(
+    TaskFilterMixin, LoginRequiredMixin, PermissionRequiredMixin, ListView
+):
     model = Task
     permission_required = "tasks.view_task"
     template_name = "tasks/task_list.html"
     context_object_name = "tasks"
     paginate_by = 10
+    paginator_class = WindowedPaginator
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Task.objects.all()
-
-        if not user.is_manager:
-            queryset = queryset.filter(assigned_person=user)
-
-        assigned_person = self.request.GET.get("assigned_person")
-        status_field = self.request.GET.get("status_field")
-        category = self.request.GET.get("category")
-        priority = self.request.GET.get("priority")
-
-        start_date = self.request.GET.get("start_date")
-        end_date = self.request.GET.get("end_date")
-        closed_start = self.request.GET.get("closed_start")
-        closed_end = self.request.GET.get("closed_end")
-        deadline_start = self.request.GET.get("deadline_start")
-        deadline_end = self.request.GET.get("deadline_end")
-
-        if start_date:
-            start_date = parse_date(start_date)
-        if end_date:
-            end_date = parse_date(end_date)
-        if closed_start:
-            closed_start = parse_date(closed_start)
-        if closed_end:
-            closed_end = parse_date(closed_end)
-        if deadline_start:
-            deadline_start = parse_date(deadline_start)
-        if deadline_end:
-            deadline_end = parse_date(deadline_end)
-
-        if assigned_person:
-            queryset = queryset.filter(assigned_person=assigned_person)
-
-        if status_field:
-            queryset = queryset.filter(status_field=status_field)
-
-        if category:
-            queryset = queryset.filter(category=category)
-
-        if priority:
-            queryset = queryset.filter(priority=priority)
-
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
-
-        if closed_start:
-            queryset = queryset.filter(closed_at__date__gte=closed_start)
-        if closed_end:
-            queryset = queryset.filter(closed_at__date__lte=closed_end)
-
-        if deadline_start:
-            queryset = queryset.filter(deadline__date__gte=deadline_start)
-        if deadline_end:
-            queryset = queryset.filter(deadline__date__lte=deadline_end)
-
-        return queryset.order_by("-created_at")
+        return self.get_filtered_queryset().prefetch_related(
+            "building", "assigned_person"
+        )
+
+    @property
+    def cursor_pagination(self):
+        """
+        Search results are ordered by rank, so they always use offset pagination.
+        """
+        return self.request.GET.get("pagination") == "cursor" and not self.is_searching
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Uses keyset pagination on (created_at, id) when requested with ?pagination=cursor.
+        """
+        if not self.cursor_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        page = paginate_by_cursor(queryset, self.request.GET.get("cursor"), page_size)
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_row_actions(self, task, is_assignee):
+        """
+        Returns the actions the current user may perform on the task in a list row.
+        """
+        status = task.status_field
+        if is_assignee:
+            if status == "declined" or not status:
+                return ("confirm",)
+            if status == "confirmed":
+                return ("revert",)
+        elif self.request.user.is_manager:
+            if status == "declined" or not status:
+                return ("delete", "update")
+            if status == "confirmed":
+                return ("accept", "decline")
+        return ()
+
+    def annotate_rows(self, tasks):
+        """
+        Precomputes per-row flags from the prefetched relations,
+        so that the template does not need to query the database.
+        """
+        user_pk = self.request.user.pk
+        for task in tasks:
+            task.is_assignee = any(
+                person.pk == user_pk for person in task.assigned_person.all()
+            )
+            task.allowed_actions = self.get_row_actions(task, task.is_assignee)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        self.annotate_rows(context["tasks"])
         context["comment_form"] = TaskCommentForm()
-        context["filter_form"] = TaskFilterForm(self.request.GET)
+        context["filter_form"] = self.filter_form
+        context["cursor_pagination"] = self.cursor_pagination
         query_params = self.request.GET.copy()
-        if "page" in query_params:
-            del query_params["page"]
+        for param in ("page", "cursor"):
+            if param in query_params:
+                del query_params[param]
         context["query_params"] = query_params.urlencode()
         return context
 
 
+class TaskDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Returns the details, attachments and comments of a single task as an HTML fragment.
+    Loaded on demand when a task is opened on the list page.
+    """
+
+    permission_required = "tasks.view_task"
+
+    def get(self, request, *args, **kwargs):
+        queryset = (
+            Task.objects.visible_to(request.user)
+            .select_related("created_by")
+            .prefetch_related(
+                "building",
+                "assigned_person",
+                "attachments",
+                Prefetch(
+                    "taskcomment_set",
+                    queryset=TaskComment.objects.select_related("user").order_by(
+                        "creation_date"
+                    ),
+                ),
+            )
+        )
+        task = get_object_or_404(queryset, pk=self.kwargs["pk"])
+        html = render_to_string(
+            "tasks/task_details.html", {"task": task}, request=request
+        )
+        return JsonResponse({"success": True, "html": html})
+
+
+class TaskExportView(
+    TaskFilterMixin, LoginRequiredMixin, PermissionRequiredMixin, View
+):
+    """
+    Streams the tasks matching the task list filters as a CSV or XLSX file.
+    """
+
+    permission_required = "tasks.view_task"
+    formats = {
+        "csv": ("text/csv; charset=utf-8", stream_csv),
+        "xlsx": (
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            stream_xlsx,
+        ),
+    }
+
+    def get(self, request, *args, **kwargs):
+        export_format = kwargs["export_format"]
+        if export_format not in self.formats:
+            raise Http404("Unsupported export format")
+        content_type, stream = self.formats[export_format]
+
+        rows = iter_task_rows(self.get_filtered_queryset())
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        filename = f"zadania-{datetime.date.today():%Y-%m-%d}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        AuditEntry.log_action(
+            AuditEntry.TASKS_EXPORTED, request, f"{filename}, {request.GET.urlencode()}"
+        )
+        return response
+
+
 class TaskCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Task
     permission_required = "tasks.add_task"
@@ -110,21 +211,23 @@ class TaskCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
 
     def form_valid(self, form):
         try:
-            task = form.save()
+            with transaction.atomic():
+                task = form.save()
 
-            task.assigned_person.set(form.cleaned_data["assigned_person"])
-            task.building.set(form.cleaned_data["building"])
-            task.created_by = self.request.user
-            task.save()
+                task.assigned_person.set(form.cleaned_data["assigned_person"])
+                task.building.set(form.cleaned_data["building"])
+                task.created_by = self.request.user
+                task.save()
 
-            attachments = self.request.FILES.getlist("attachments")
-            self.save_attachments(task, attachments)
+                attachments = self.request.FILES.getlist("attachments")
+                self.save_attachments(task, attachments)
 
-            AuditEntry.log_action(
-                AuditEntry.TASK_CREATED, self.request, f"id={task.id}, {task.title}"
-            )
+                AuditEntry.log_action(
+                    AuditEntry.TASK_CREATED, self.request, f"id={task.id}, {task.title}"
+                )
+
+                self.notify_users(task)
 
-            self.notify_users(task)
             messages.success(self.request, "Zadanie utworzone pomyślnie.")
 
             if self.request.headers.get("X-Requested-With") == "XMLHttpRequest":
@@ -160,46 +263,22 @@ class TaskCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
             Attachment.objects.create(file=file, task=task)
 
     def notify_users(self, task):
-        assigned_persons = ", ".join(
-            [user.full_name for user in task.assigned_person.all()]
-        )
-        buildings = ", ".join(
-            [
-                f"{building.name} ({building.address})"
-                for building in task.building.all()
-            ]
-        )
-        subject = f"Nowe zadanie: {task.title}"
-        message = textwrap.dedent(
-            f"""
-            Zostało ci przydzielone nowe zadanie:
-                                       
-            Nazwa: {task.title}
-            Przypisana osoba: {assigned_persons}
-            Termin: {task.deadline}
-            Kategoria: {task.get_category_display()}
-            Priorytet: {task.get_priority_display()}
-            Budynek: {buildings}
-            Opis: {task.description}
-        """
-        ).strip()
-
-        emails = list(task.assigned_person.values_list("email", flat=True))
-        if emails:
-            email = EmailMessage(subject, message, DEFAULT_FROM_EMAIL, emails)
-            for attachment in task.attachments.all():
-                file_path = attachment.file.path
-                mime_type, _ = mimetypes.guess_type(file_path)
-                with open(file_path, "rb") as file_content:
-                    email.attach(
-                        attachment.file.name,
-                        file_content.read(),
-                        mime_type or "application/octet-stream",
-                    )
-            email.send()
-            AuditEntry.log_action(
-                AuditEntry.EMAIL_SENT, self.request, f"{subject} -> {emails}"
-            )
+        notifications.notify_task_created(task, self.request)
+
+
+class TaskImportView(CsvImportView):
+    permission_required = "tasks.add_task"
+    success_url = reverse_lazy("task_list")
+    title = "Import zadań"
+    columns = TASK_COLUMNS
+    column_help = (
+        "category: planned lub failure, priority: low, medium lub high, "
+        "deadline: RRRR-MM-DD GG:MM. Budynki (nazwy) i przypisane osoby (adresy email) "
+        "można podać po kilka, oddzielone znakiem |."
+    )
+
+    def run_import(self, stream):
+        return len(import_tasks(stream, self.request, created_by=self.request.user))
 
 
 class TaskUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
@@ -232,30 +311,32 @@ class TaskUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         try:
-            task = form.save()
+            with transaction.atomic():
+                task = form.save()
 
-            task.assigned_person.set(form.cleaned_data["assigned_person"])
-            task.building.set(form.cleaned_data["building"])
+                task.assigned_person.set(form.cleaned_data["assigned_person"])
+                task.building.set(form.cleaned_data["building"])
 
-            files_to_delete = self.request.POST.get("delete_attachments", "")
-            files_to_delete = [
-                int(file_id)
-                for file_id in files_to_delete.split(",")
-                if file_id.isdigit()
-            ]
-            if files_to_delete:
-                Attachment.objects.filter(id__in=files_to_delete).delete()
+                files_to_delete = self.request.POST.get("delete_attachments", "")
+                files_to_delete = [
+                    int(file_id)
+                    for file_id in files_to_delete.split(",")
+                    if file_id.isdigit()
+                ]
+                if files_to_delete:
+                    Attachment.objects.filter(id__in=files_to_delete).delete()
 
-            task.save()
+                task.save()
 
-            attachments = self.request.FILES.getlist("attachments")
-            self.save_attachments(task, attachments)
+                attachments = self.request.FILES.getlist("attachments")
+                self.save_attachments(task, attachments)
 
-            AuditEntry.log_action(
-                AuditEntry.TASK_UPDATED, self.request, f"id={task.id}, {task.title}"
-            )
+                AuditEntry.log_action(
+                    AuditEntry.TASK_UPDATED, self.request, f"id={task.id}, {task.title}"
+                )
+
+                self.notify_users(task)
 
-            self.notify_users(task)
             messages.success(self.request, "Zadanie zaktualizowane pomyślnie.")
 
             if self.request.headers.get("X-Requested-With") == "XMLHttpRequest":
@@ -291,73 +372,23 @@ class TaskUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
             Attachment.objects.create(file=file, task=task)
 
     def notify_users(self, task):
-        assigned_persons = ", ".join(
-            [user.full_name for user in task.assigned_person.all()]
-        )
-        buildings = ", ".join(
-            [
-                f"{building.name} ({building.address})"
-                for building in task.building.all()
-            ]
-        )
-
-        comments = task.taskcomment_set.all().order_by("-creation_date")
-        if comments.exists():
-            comments_text = "\n".join(
-                [
-                    f"- {comment.user.full_name}: {comment.comment_text}"
-                    for comment in comments
-                ]
-            )
-        else:
-            comments_text = "Brak"
-
-        subject = f"Zmiana zadania: {task.title}"
-
-        message = textwrap.dedent(
-            f"""
-            Zostało zmienione zadanie:
-            
-            Nazwa: {task.title}
-            Przypisana osoba: {assigned_persons}
-            Status: {task.get_status_field_display() if task.status_field else '-'}
-            Termin: {task.deadline}
-            Kategoria: {task.get_category_display()}
-            Priorytet: {task.get_priority_display()}
-            Budynek: {buildings}
-            Opis: {task.description}
-            Komentarze: {comments_text}
-        """
-        ).strip()
-
-        emails = list(task.assigned_person.values_list("email", flat=True))
-        if emails:
-            email = EmailMessage(subject, message, DEFAULT_FROM_EMAIL, emails)
-            for attachment in task.attachments.all():
-                file_path = attachment.file.path
-                mime_type, _ = mimetypes.guess_type(file_path)
-                with open(file_path, "rb") as file_content:
-                    email.attach(
-                        attachment.file.name,
-                        file_content.read(),
-                        mime_type or "application/octet-stream",
-                    )
-            email.send()
-            AuditEntry.log_action(
-                AuditEntry.EMAIL_SENT, self.request, f"{subject} -> {emails}"
-            )
+        notifications.notify_task_updated(task, self.request)
 
 
 class TaskEmployeeStatusUpdateView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = "tasks.employee_task_status_update"
 
+    @transaction.atomic
     def get(self, request, *args, **kwargs):
         task = get_object_or_404(Task, pk=self.kwargs["pk"])
         status = self.kwargs.get("status")
 
         if status == "none":
             status = None
-            Task.objects.filter(pk=task.pk).update(status_field=status)
+            updated = Task.objects.filter(pk=task.pk)
+            before = stats.snapshot(updated)
+            updated.update(status_field=status)
+            stats.record_changes(before, stats.snapshot(updated))
             task.refresh_from_db()
 
             AuditEntry.log_action(
@@ -391,57 +422,13 @@ class TaskEmployeeStatusUpdateView(LoginRequiredMixin, PermissionRequiredMixin,
         return HttpResponseRedirect(reverse_lazy("task_list"))
 
     def notify_manager(self, task):
-        manager = task.created_by
-        assigned_users = task.assigned_person.all().exclude(id=self.request.user.id)
-
-        emails = [manager.email] if manager and manager.email else []
-        emails += [user.email for user in assigned_users if user.email]
-
-        if not emails:
-            return
-        subject = f"Aktualizacja statusu: {task.title}"
-
-        status_text = (
-            "Osoba odpowiedzialna za zadanie oznaczyła je jako wykonano:"
-            if task.status_field
-            else "Osoba odpowiedzialna za zadanie cofnęła wykonanie zadania!"
-        )
-
-        message = textwrap.dedent(
-            f"""
-            {status_text}
-            
-            Nazwa: {task.title}
-            Przypisana osoba: {", ".join(user.full_name for user in task.assigned_person.all())}
-            Status: {task.get_status_field_display() if task.status_field else '-'}
-            Termin: {task.deadline}
-            Kategoria: {task.get_category_display()}
-            Priorytet: {task.get_priority_display()}
-            Budynek: {", ".join(f"{b.name} ({b.address})" for b in task.building.all())}
-            Opis: {task.description}
-            """
-        ).strip()
-
-        email_message = EmailMessage(subject, message, DEFAULT_FROM_EMAIL, emails)
-        for attachment in task.attachments.all():
-            file_path = attachment.file.path
-            mime_type, _ = mimetypes.guess_type(file_path)
-            with open(file_path, "rb") as file_content:
-                email_message.attach(
-                    attachment.file.name,
-                    file_content.read(),
-                    mime_type or "application/octet-stream",
-                )
-        email_message.send()
-
-        AuditEntry.log_action(
-            AuditEntry.EMAIL_SENT, self.request, f"{subject} -> {emails}"
-        )
+        notifications.notify_status_confirmed(task, self.request)
 
 
 class TaskManagerStatusUpdateView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = "tasks.change_task"
 
+    @transaction.atomic
     def get(self, request, *args, **kwargs):
         task = get_object_or_404(Task, pk=self.kwargs["pk"])
         status = self.kwargs.get("status")
@@ -465,6 +452,7 @@ class TaskManagerStatusUpdateView(LoginRequiredMixin, PermissionRequiredMixin, V
 
         return HttpResponseRedirect(reverse_lazy("task_list"))
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         task = get_object_or_404(Task, pk=self.kwargs["pk"])
         task.status_field = "declined"
@@ -496,66 +484,53 @@ class TaskManagerStatusUpdateView(LoginRequiredMixin, PermissionRequiredMixin, V
         return HttpResponseRedirect(reverse_lazy("task_list"))
 
     def notify_users(self, task):
-        assigned_persons = ", ".join(
-            [user.full_name for user in task.assigned_person.all()]
-        )
-        buildings = ", ".join(
-            [
-                f"{building.name} ({building.address})"
-                for building in task.building.all()
-            ]
-        )
+        notifications.notify_status_reviewed(task, self.request)
 
-        comments = task.taskcomment_set.all().order_by("-creation_date")
-        if comments.exists():
-            comments_text = "\n".join(
-                [
-                    f"- {comment.user.full_name}: {comment.comment_text}"
-                    for comment in comments
-                ]
-            )
-        else:
-            comments_text = "Brak"
 
-        subject = f"Aktualizacja statusu: {task.title}"
+class TaskBulkStatusUpdateView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Accepts or declines all the selected confirmed tasks in one request.
+    """
 
-        if task.status_field == "accepted":
-            status_text = "Wykonanie zadania potwierdzone."
-        else:
-            status_text = "Wykonanie zadania nie potwierdzone."
-
-        message = textwrap.dedent(
-            f"""
-            {status_text}
-            
-            Nazwa: {task.title}
-            Przypisana osoba: {assigned_persons}
-            Status: {task.get_status_field_display() if task.status_field else '-'}
-            Termin: {task.deadline}
-            Kategoria: {task.get_category_display()}
-            Priorytet: {task.get_priority_display()}
-            Budynek: {buildings}
-            Opis: {task.description}
-            Komentarze: {comments_text}
-        """
-        ).strip()
-
-        emails = list(task.assigned_person.values_list("email", flat=True))
-        if emails:
-            email = EmailMessage(subject, message, DEFAULT_FROM_EMAIL, emails)
-            for attachment in task.attachments.all():
-                file_path = attachment.file.path
-                mime_type, _ = mimetypes.guess_type(file_path)
-                with open(file_path, "rb") as file_content:
-                    email.attach(
-                        attachment.file.name,
-                        file_content.read(),
-                        mime_type or "application/octet-stream",
-                    )
-            email.send()
-            AuditEntry.log_action(
-                AuditEntry.EMAIL_SENT, self.request, f"{subject} -> {emails}"
+    permission_required = "tasks.change_task"
+
+    def post(self, request, *args, **kwargs):
+        form = TaskBulkStatusForm(request.POST)
+        is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+        if not form.is_valid():
+            message = " ".join(
+                error for errors in form.errors.values() for error in errors
             )
+            if is_ajax:
+                return JsonResponse({"success": False, "message": message}, status=400)
+            messages.error(request, message)
+            return self.redirect_back()
+
+        status = form.cleaned_data["status"]
+        tasks = bulk_update_status(
+            form.cleaned_data["tasks"].filter(status_field="confirmed"),
+            status,
+            request,
+            comment_text=form.cleaned_data["comment_text"],
+        )
+        if status == "accepted":
+            message = f"Wykonanie zadań potwierdzone: {len(tasks)}."
+        else:
+            message = f"Wykonanie zadań nie potwierdzone: {len(tasks)}."
+
+        if is_ajax:
+            return JsonResponse({"success": True, "message": message})
+        messages.success(request, message)
+        return self.redirect_back()
+
+    def redirect_back(self):
+        next_url = self.request.POST.get("next")
+        if next_url and url_has_allowed_host_and_scheme(
+            next_url, allowed_hosts={self.request.get_host()}
+        ):
+            return HttpResponseRedirect(next_url)
+        return HttpResponseRedirect(reverse_lazy("task_list"))
 
 
 class TaskDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -568,11 +543,13 @@ class TaskDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
         assigned_emails = list(task.assigned_person.values_list("email", flat=True))
 
         try:
-            task.delete()
-            AuditEntry.log_action(
-                AuditEntry.TASK_DELETED, self.request, f"id={task_id}, {task_title}"
-            )
-            self.notify_users(task_title, assigned_emails)
+            with transaction.atomic():
+                task.delete()
+                AuditEntry.log_action(
+                    AuditEntry.TASK_DELETED, self.request, f"id={task_id}, {task_title}"
+                )
+                self.notify_users(task_title, assigned_emails)
+
             messages.success(request, "Zadanie usunięte pomyślnie.")
             if self.request.headers.get("X-Requested-With") == "XMLHttpRequest":
                 return JsonResponse(
@@ -593,24 +570,15 @@ class TaskDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
             return redirect("task_list")
 
     def notify_users(self, task_title, assigned_emails):
-        subject = f"Usunięcie zadania: {task_title}"
-        message = textwrap.dedent(
-            f"""
-            Zadanie {task_title} zostało usunięte.
-        """
-        ).strip()
-
-        if assigned_emails:
-            email = EmailMessage(subject, message, DEFAULT_FROM_EMAIL, assigned_emails)
-            email.send()
-            AuditEntry.log_action(
-                AuditEntry.EMAIL_SENT, self.request, f"{subject} -> {assigned_emails}"
-            )
+        notifications.notify_task_deleted(
+            task_title, assigned_emails, self.request, task_id=self.kwargs.get("pk")
+        )
 
 
 class TaskLeaveComment(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = "tasks.leave_comment"
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         task = get_object_or_404(Task, pk=self.kwargs["pk"])
         form = TaskCommentForm(request.POST)
@@ -644,72 +612,21 @@ class TaskLeaveComment(LoginRequiredMixin, PermissionRequiredMixin, View):
         return JsonResponse({"success": False, "errors": form.errors})
 
     def notify_users(self, task):
-        assigned_persons = set(task.assigned_person.all())
-        created_by = task.created_by
-        comment_author = self.request.user
-
-        recipients = set()
-        if created_by and created_by.email:
-            recipients.add(created_by)
-        recipients.update(assigned_persons)
-
-        recipients.discard(comment_author)
-
-        emails = [user.email for user in recipients if user.email]
-
-        if not emails:
-            return
-
-        assigned_persons_str = ", ".join(user.full_name for user in assigned_persons)
-        buildings = ", ".join(f"{b.name} ({b.address})" for b in task.building.all())
-
-        comments = task.taskcomment_set.all().order_by("-creation_date")
-        if comments.exists():
-            comments_text = "\n".join(
-                f"- {c.user.full_name}: {c.comment_text}" for c in comments
-            )
-        else:
-            comments_text = "Brak"
-
-        subject = f"Dodanie komentarza do zadania: {task.title}"
-        message = textwrap.dedent(
-            f"""
-            Użytkownik {comment_author.full_name} dodał komentarz do zadania:
-            
-            Nazwa: {task.title}
-            Przypisane osoby: {assigned_persons_str}
-            Status: {task.get_status_field_display() if task.status_field else '-'}
-            Termin: {task.deadline}
-            Kategoria: {task.get_category_display()}
-            Priorytet: {task.get_priority_display()}
-            Budynek: {buildings}
-            Opis: {task.description}
-            Komentarze: {comments_text}
-        """.strip()
-        )
-
-        email = EmailMessage(subject, message, DEFAULT_FROM_EMAIL, emails)
-
-        for attachment in task.attachments.all():
-            file_path = attachment.file.path
-            mime_type, _ = mimetypes.guess_type(file_path)
-            with open(file_path, "rb") as file_content:
-                email.attach(
-                    attachment.file.name,
-                    file_content.read(),
-                    mime_type or "application/octet-stream",
-                )
-        email.send()
-
-        AuditEntry.log_action(
-            AuditEntry.EMAIL_SENT, self.request, f"{subject} -> {emails}"
-        )
+        notifications.notify_task_commented(task, self.request)
 
 
 def serve_attachment(request, file_path):
     """
     Allows to attach files from media folder in templates.
+    Anonymous users need the signed token of a link sent in a notification email.
     """
+    if not request.user.is_authenticated:
+        token = request.GET.get("token")
+        if not token:
+            return redirect_to_login(request.get_full_path())
+        if not is_valid_attachment_token(file_path, token):
+            raise PermissionDenied
+
     file_full_path = os.path.join(settings.MEDIA_ROOT, file_path)
 
     if not os.path.exists(file_full_path):
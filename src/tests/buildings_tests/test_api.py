@@ -0,0 +1,39 @@
+from django.urls import reverse
+
+import pytest
+
+from rest_framework.test import APIClient
+
+from users.models import AuditEntry
+
+
+@pytest.mark.django_db
+def test_building_api_list(
+    user_factory, building_factory, view_building_permission_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_building_permission_factory())
+    building_factory(name="B")
+    building_factory(name="A")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get(reverse("api-building-list"), {"fields": "name"})
+
+    assert response.status_code == 200
+    assert response.data["results"] == [{"name": "A"}, {"name": "B"}]
+
+
+@pytest.mark.django_db
+def test_building_api_create(user_factory, add_building_permission_factory):
+    user = user_factory()
+    user.user_permissions.add(add_building_permission_factory())
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(
+        reverse("api-building-list"), {"name": "Hala", "address": "Polna 1"}
+    )
+
+    assert response.status_code == 201
+    assert AuditEntry.objects.filter(action=AuditEntry.BUILDING_CREATED).exists()
@@ -0,0 +1,33 @@
+import io
+
+from buildings.imports import import_buildings
+from buildings.models import Building
+
+from proj.autocomplete import get_cache_version
+from proj.imports import CsvImportError
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_import_buildings(django_assert_num_queries):
+    content = 'name,address\nHala A,Polna 1\n\nBiurowiec,"Leśna 2, Gdańsk"\n'
+    version = get_cache_version("buildings")
+
+    with django_assert_num_queries(4):
+        buildings = import_buildings(io.StringIO(content))
+
+    assert len(buildings) == 2
+    assert Building.objects.get(name="Biurowiec").address == "Leśna 2, Gdańsk"
+    assert get_cache_version("buildings") == version + 1
+
+
+@pytest.mark.django_db
+def test_import_buildings_rejects_invalid_rows():
+    content = "Name,Address\nHala A,Polna 1\n,Leśna 2\n"
+
+    with pytest.raises(CsvImportError) as exc_info:
+        import_buildings(io.StringIO(content))
+
+    assert exc_info.value.errors[0].startswith("Wiersz 3: name")
+    assert not Building.objects.exists()
@@ -10,6 +10,7 @@ from buildings.views import (
 )
 
 from django.contrib.messages import constants as message_constants
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
 from django.urls import reverse
@@ -97,6 +98,43 @@ def test_building_list_view_pagination_second_page(
     assert len(page_obj.object_list) == 5
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "page, expected_window",
+    [
+        (1, [1, 2, 3, None, 25]),
+        (4, [1, 2, 3, 4, 5, 6, None, 25]),
+        (10, [1, None, 8, 9, 10, 11, 12, None, 25]),
+        (25, [1, None, 23, 24, 25]),
+    ],
+)
+def test_building_list_view_pagination_page_window(
+    rf,
+    user_factory,
+    view_building_permission_factory,
+    building_factory,
+    page,
+    expected_window,
+):
+    user = user_factory()
+    permission = view_building_permission_factory()
+    user.user_permissions.add(permission)
+
+    Building.objects.bulk_create(
+        Building(name=f"Building {i:03d}", address="Address") for i in range(250)
+    )
+
+    request = rf.get(reverse("building_list"), {"page": page})
+    request.user = user
+
+    response = BuildingListView.as_view()(request)
+    response.render()
+    page_obj = response.context_data.get("page_obj")
+
+    assert page_obj.page_window == expected_window
+    assert response.content.decode().count('href="?page=25"') == (page != 25)
+
+
 @pytest.mark.django_db
 def test_building_create_view_authenticated_with_permission(
     rf, user_factory, add_building_permission_factory
@@ -448,3 +486,28 @@ def test_building_delete_view_ajax_failed_deletion(
         assert len(msg_list) == 1
         assert msg_list[0].message == "Wystąpił błąd. Spróbuj ponownie."
         assert msg_list[0].level == message_constants.ERROR
+
+
+@pytest.mark.django_db
+def test_building_autocomplete_prefix_search_follows_changes(
+    client, user_factory, building_factory, view_building_permission_factory
+):
+    cache.clear()
+    user = user_factory()
+    user.user_permissions.add(view_building_permission_factory())
+    client.force_login(user)
+    building = building_factory(name="Hala produkcyjna")
+    building_factory(name="Biurowiec")
+    url = reverse("building_autocomplete")
+
+    response = client.get(url, {"term": "hala"})
+    assert response.json() == {
+        "results": [{"id": building.pk, "text": "Hala produkcyjna"}],
+        "pagination": {"more": False},
+    }
+
+    building.name = "Magazyn"
+    building.save()
+
+    assert client.get(url, {"term": "hala"}).json()["results"] == []
+    assert len(client.get(url).json()["results"]) == 2
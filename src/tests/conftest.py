@@ -377,3 +377,14 @@ def attach_messages_middleware(rf):
         return request
 
     return _attach
+
+
+@pytest.fixture(autouse=True)
+def local_memory_cache(settings):
+    """
+    Keeps the cache in memory, so that the query counts asserted by the tests
+    do not include the queries of the database cache.
+    """
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
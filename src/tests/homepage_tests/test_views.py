@@ -1,6 +1,11 @@
+import datetime
+import json
+
+from django.core.exceptions import PermissionDenied
 from django.urls import reverse
+from django.utils import timezone
 
-from homepage.views import IndexView
+from homepage.views import ClosureTimeView, IndexView, TaskTrendsView
 
 import pytest
 
@@ -67,3 +72,123 @@ def test_index_view_unauthenticated(rf, anonymous_user):
     request.user = user
     response = IndexView.as_view()(request)
     assert response.status_code == 302
+
+
+def render_dashboard(rf, user):
+    request = rf.get(reverse("index"))
+    request.user = user
+    return IndexView.as_view()(request)
+
+
+@pytest.mark.django_db
+def test_dashboard_stats_values(rf, superuser_factory, task_factory):
+    user = superuser_factory(is_manager=True)
+    now = timezone.now()
+    task_factory(user=user, deadline=now - datetime.timedelta(days=1))
+    task_factory(user=user, category="failure", priority="high")
+    closed = task_factory(user=user, status_field="accepted", priority="high")
+    closed.closed_at = closed.created_at + datetime.timedelta(days=1, hours=2)
+    closed.save()
+    task_factory(user=user, status_field="declined")
+
+    response = render_dashboard(rf, user)
+
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert '<p class="fs-3 fw-bold">4</p>' in content
+    assert '<p class="fs-3 fw-bold" style="color: var(--cmms-yellow);">2</p>' in content
+    assert '<p class="fs-3 fw-bold" style="color: var(--cmms-green);">1</p>' in content
+    assert '<p class="fs-3 fw-bold" style="color: var(--cmms-red);">1</p>' in content
+    assert "1 d. 2 g. 0 min." in content
+    assert '{"category": "Awaria", "count": 1}' in content
+    assert '{"category": "Planowane", "count": 3}' in content
+    assert '{"priority": "Wysoki", "count": 2}' in content
+    assert '{"priority": "Średni", "count": 2}' in content
+
+
+@pytest.mark.django_db
+def test_dashboard_query_count_is_constant(
+    rf, superuser_factory, task_factory, django_assert_num_queries
+):
+    user = superuser_factory(is_manager=True)
+    task_factory(user=user)
+
+    # counters, overdue tasks and recent tasks
+    with django_assert_num_queries(3):
+        render_dashboard(rf, user)
+
+    for category, priority in [("failure", "high"), ("planned", "low")] * 3:
+        task_factory(user=user, category=category, priority=priority)
+
+    with django_assert_num_queries(3):
+        render_dashboard(rf, user)
+
+
+@pytest.mark.django_db
+def test_task_trends_view(
+    rf, superuser_factory, task_factory, django_assert_num_queries
+):
+    user = superuser_factory(is_manager=True)
+    now = timezone.now()
+    task_factory(user=user, deadline=now - datetime.timedelta(minutes=1))
+    closed = task_factory(user=user, status_field="accepted")
+    closed.closed_at = now
+    closed.save()
+    task_factory(user=user, status_field="declined", priority="high")
+
+    request = rf.get(reverse("dashboard_trends"), {"period": "week"})
+    request.user = user
+    # rollups and the overdue tasks of the current week
+    with django_assert_num_queries(2):
+        response = TaskTrendsView.as_view()(request)
+
+    data = json.loads(response.content)
+    assert data["period"] == "week"
+    assert len(data["labels"]) == 52
+    assert (
+        data["labels"][-1]
+        == (now.date() - datetime.timedelta(days=now.weekday())).isoformat()
+    )
+    assert data["series"]["created"][-1] == 3
+    assert data["series"]["closed"][-1] == 1
+    assert data["series"]["declined"][-1] == 1
+    assert data["series"]["overdue"][-1] == 1
+
+    request = rf.get(reverse("dashboard_trends"), {"priority": "high"})
+    request.user = user
+    data = json.loads(TaskTrendsView.as_view()(request).content)
+    assert data["period"] == "month"
+    assert data["series"]["created"][-1] == 1
+
+
+@pytest.mark.django_db
+def test_task_trends_view_requires_manager(rf, user_factory):
+    request = rf.get(reverse("dashboard_trends"))
+    request.user = user_factory()
+    with pytest.raises(PermissionDenied):
+        TaskTrendsView.as_view()(request)
+
+
+@pytest.mark.django_db
+def test_closure_time_view(
+    rf, superuser_factory, task_factory, django_assert_num_queries
+):
+    user = superuser_factory(is_manager=True)
+    for hours in (1, 2, 30):
+        task = task_factory(user=user, status_field="accepted")
+        task.closed_at = task.created_at + datetime.timedelta(hours=hours)
+        task.save()
+
+    request = rf.get(reverse("closure_times"))
+    request.user = user
+    # histograms, buildings and assigned people
+    with django_assert_num_queries(3):
+        response = ClosureTimeView.as_view()(request)
+
+    content = response.content.decode()
+    assert response.status_code == 200
+    assert "Wszystkie zadania" in content
+    assert user.full_name in content
+    assert "Building 1" in content
+    assert "Zadanie planowe" in content
+    assert "0 d. 11 g. 0 min." in content
@@ -0,0 +1,345 @@
+import datetime
+import io
+import smtplib
+from unittest.mock import patch
+
+from django.contrib.messages import get_messages
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from mailing import attachments, outbox
+from mailing.models import OutboxMessage
+
+import pytest
+
+from users.models import AuditEntry
+
+
+def dispatch_once(**options):
+    output = io.StringIO()
+    call_command("dispatch_outbox", once=True, workers=1, stdout=output, **options)
+    return output.getvalue()
+
+
+@pytest.mark.django_db
+def test_dispatch_outbox_sends_queued_messages(settings, tmp_path, mailoutbox):
+    settings.MEDIA_ROOT = tmp_path
+    name = default_storage.save("attachments/report.txt", ContentFile(b"Raport"))
+    outbox.enqueue(
+        [
+            outbox.outbox_message("Raport", "Treść", ["a@example.com"], [name]),
+            outbox.outbox_message(
+                "Bez pliku", "Treść", ["b@example.com"], ["attachments/missing.txt"]
+            ),
+        ]
+    )
+
+    assert "Sent: 2, retrying: 0, failed: 0." in dispatch_once()
+
+    assert sorted(email.subject for email in mailoutbox) == ["Bez pliku", "Raport"]
+    report = next(email for email in mailoutbox if email.subject == "Raport")
+    assert report.message().get_payload()[1].get_payload(decode=True) == b"Raport"
+    assert not OutboxMessage.objects.exclude(status=OutboxMessage.SENT).exists()
+    assert AuditEntry.objects.filter(action=AuditEntry.EMAIL_SENT).count() == 2
+    assert "Sent: 0" in dispatch_once()
+
+
+@pytest.mark.django_db
+def test_dispatch_outbox_retries_with_backoff_and_gives_up(mailoutbox):
+    (message,) = outbox.enqueue(
+        [outbox.outbox_message("Awaria", "Treść", ["a@example.com"])]
+    )
+
+    with patch(
+        "django.core.mail.backends.locmem.EmailBackend.send_messages",
+        side_effect=smtplib.SMTPServerDisconnected("Connection lost"),
+    ):
+        assert "retrying: 1" in dispatch_once(max_attempts=2)
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.PENDING
+        assert message.attempts == 1
+        assert message.last_error == "SMTPServerDisconnected: Connection lost"
+        delay = message.next_attempt_at - timezone.now()
+        assert datetime.timedelta(seconds=40) < delay < datetime.timedelta(seconds=75)
+
+        assert "Sent: 0, retrying: 0, failed: 0." in dispatch_once(max_attempts=2)
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        assert "failed: 1" in dispatch_once(max_attempts=2)
+
+    message.refresh_from_db()
+    assert message.status == OutboxMessage.FAILED
+    assert message.attempts == 2
+    assert AuditEntry.objects.filter(action=AuditEntry.EMAIL_FAILED).count() == 1
+    assert mailoutbox == []
+
+
+def test_retry_delay_is_capped():
+    assert outbox.retry_delay(20) <= outbox.MAX_RETRY_DELAY * 1.2
+    assert outbox.retry_delay(3) >= outbox.RETRY_DELAY * 4 * 0.8
+
+
+@pytest.mark.django_db
+def test_claim_takes_back_stale_messages():
+    outbox.enqueue(
+        [
+            outbox.outbox_message(subject, "Treść", ["a@example.com"])
+            for subject in ("Nowa", "Porzucona", "W trakcie")
+        ]
+    )
+    now = timezone.now()
+    OutboxMessage.objects.filter(subject="Porzucona").update(
+        status=OutboxMessage.SENDING, claimed_at=now - datetime.timedelta(hours=1)
+    )
+    OutboxMessage.objects.filter(subject="W trakcie").update(
+        status=OutboxMessage.SENDING, claimed_at=now
+    )
+
+    claimed = outbox.claim(batch_size=10)
+
+    assert set(
+        OutboxMessage.objects.filter(pk__in=claimed).values_list("subject", flat=True)
+    ) == {"Nowa", "Porzucona"}
+    assert outbox.claim(batch_size=10) == []
+
+
+@pytest.mark.django_db
+def test_dispatcher_reuses_one_connection_per_worker(mailoutbox):
+    outbox.enqueue(
+        [
+            outbox.outbox_message(f"Zadanie {number}", "Treść", ["a@example.com"])
+            for number in range(3)
+        ]
+    )
+
+    with patch(
+        "mailing.outbox.get_connection", wraps=outbox.get_connection
+    ) as get_connection, outbox.Dispatcher(workers=1) as dispatcher:
+        assert dispatcher.dispatch(batch_size=2) == [OutboxMessage.SENT] * 2
+        assert dispatcher.dispatch(batch_size=2) == [OutboxMessage.SENT]
+
+    assert get_connection.call_count == 1
+    assert len(mailoutbox) == 3
+
+
+@pytest.mark.django_db
+def test_dispatcher_reconnects_when_the_server_drops_the_connection(mailoutbox):
+    outbox.enqueue([outbox.outbox_message("Awaria", "Treść", ["a@example.com"])])
+
+    with patch(
+        "django.core.mail.backends.locmem.EmailBackend.send_messages",
+        side_effect=[smtplib.SMTPServerDisconnected("Connection lost"), 1],
+    ) as send_messages:
+        output = dispatch_once(verbosity=2)
+
+    assert send_messages.call_count == 2
+    assert "Batch of 1: 1 sent in" in output
+    assert OutboxMessage.objects.get().status == OutboxMessage.SENT
+
+
+@pytest.mark.django_db
+def test_dispatch_outbox_links_large_attachments(
+    settings, tmp_path, client, mailoutbox
+):
+    settings.MEDIA_ROOT = tmp_path
+    settings.DEFAULT_DOMAIN = "cmms.example.com"
+    settings.EMAIL_ATTACHMENT_INLINE_MAX_SIZE = 10
+    attachments.encoded_attachment.cache_clear()
+    small = default_storage.save("attachments/note.txt", ContentFile(b"Notatka"))
+    large = default_storage.save("attachments/photo.jpg", ContentFile(b"x" * 11))
+    outbox.enqueue(
+        [
+            outbox.outbox_message(
+                f"Zadanie {number}", "Treść", ["a@example.com"], [small, large]
+            )
+            for number in range(2)
+        ]
+    )
+
+    dispatch_once()
+
+    first, second = mailoutbox
+    cache_info = attachments.encoded_attachment.cache_info()
+    assert (cache_info.misses, cache_info.hits) == (1, 1)
+    assert [part.get_filename() for part in second.attachments] == [small]
+    assert second.attachments[0].get_payload(decode=True) == b"Notatka"
+    link = first.body.split(f"- {large}: ")[1]
+    assert link.startswith("https://cmms.example.com/media/attachments/photo.jpg/?")
+    assert "linki ważne przez 7 dni" in first.body
+
+    response = client.get(link.removeprefix("https://cmms.example.com"))
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == b"x" * 11
+    response.close()
+
+
+def test_attachment_token_is_bound_to_the_file_and_expires(settings):
+    token = attachments.attachment_token("attachments/photo.jpg")
+
+    assert attachments.is_valid_attachment_token("attachments/photo.jpg", token)
+    assert not attachments.is_valid_attachment_token("attachments/other.jpg", token)
+    assert not attachments.is_valid_attachment_token("attachments/photo.jpg", "x:y")
+
+    settings.EMAIL_ATTACHMENT_LINK_MAX_AGE = -1
+    assert not attachments.is_valid_attachment_token("attachments/photo.jpg", token)
+
+
+@pytest.mark.django_db
+def test_enqueue_coalesces_messages_waiting_to_be_sent():
+    def message(subject, key="task:1:a@example.com"):
+        return outbox.outbox_message(
+            subject,
+            subject,
+            ["a@example.com"],
+            coalesce_key=key,
+            send_after=datetime.timedelta(seconds=5),
+        )
+
+    (first,) = outbox.enqueue([message("Pierwsza")])
+    send_at = OutboxMessage.objects.get().next_attempt_at
+    (second,) = outbox.enqueue([message("Druga"), message("Inna", key="")])[-1:]
+
+    assert second.pk == first.pk
+    waiting = OutboxMessage.objects.get(pk=first.pk)
+    assert (waiting.subject, waiting.next_attempt_at) == ("Druga", send_at)
+    assert OutboxMessage.objects.count() == 2
+
+    OutboxMessage.objects.filter(pk=first.pk).update(status=OutboxMessage.SENDING)
+    (third,) = outbox.enqueue([message("Trzecia")])
+
+    assert third.pk != first.pk
+    assert OutboxMessage.objects.get(pk=first.pk).subject == "Druga"
+
+
+@pytest.mark.django_db
+def test_dispatcher_sends_the_batch_with_one_call_and_skips_the_failed_message(
+    mailoutbox,
+):
+    outbox.enqueue(
+        [
+            outbox.outbox_message(subject, "Treść", ["a@example.com"])
+            for subject in ("Pierwsza", "Odrzucona", "Trzecia")
+        ]
+    )
+    send_messages = outbox.get_connection().send_messages
+
+    def refuse(emails):
+        for email in emails:
+            if email.subject == "Odrzucona":
+                raise smtplib.SMTPRecipientsRefused({})
+            send_messages([email])
+
+    with patch(
+        "django.core.mail.backends.locmem.EmailBackend.send_messages",
+        side_effect=refuse,
+    ) as backend, outbox.Dispatcher(workers=1, max_attempts=1) as dispatcher:
+        statuses = dispatcher.dispatch(batch_size=10)
+
+    assert statuses == [OutboxMessage.SENT, OutboxMessage.FAILED, OutboxMessage.SENT]
+    assert backend.call_count == 2
+    assert [email.subject for email in mailoutbox] == ["Pierwsza", "Trzecia"]
+    failed = OutboxMessage.objects.get(subject="Odrzucona")
+    assert failed.last_error.startswith("SMTPRecipientsRefused")
+
+
+@pytest.mark.django_db
+def test_dispatcher_erases_sensitive_messages_that_finally_failed(mailoutbox):
+    outbox.enqueue(
+        [
+            outbox.outbox_message(
+                subject,
+                "HASŁO: tajne",
+                ["a@example.com"],
+                html_body="<p>HASŁO: tajne</p>",
+                sensitive=sensitive,
+            )
+            for subject, sensitive in (("Hasło", True), ("Zwykła", False))
+        ]
+    )
+
+    with patch(
+        "django.core.mail.backends.locmem.EmailBackend.send_messages",
+        side_effect=smtplib.SMTPServerDisconnected("Connection lost"),
+    ):
+        assert "failed: 2" in dispatch_once(max_attempts=1)
+
+    assert dict(OutboxMessage.objects.values_list("subject", "body")) == {
+        "Hasło": "",
+        "Zwykła": "HASŁO: tajne",
+    }
+    assert OutboxMessage.objects.get(subject="Hasło").html_body == ""
+
+
+@pytest.mark.django_db
+def test_admin_retry_skips_erased_sensitive_messages(client, superuser_factory):
+    client.force_login(superuser_factory())
+    outbox.enqueue(
+        [
+            outbox.outbox_message("Hasło", "HASŁO: tajne", ["a@example.com"]),
+            outbox.outbox_message("Zwykła", "Treść", ["b@example.com"]),
+        ]
+    )
+    OutboxMessage.objects.filter(subject="Hasło").update(sensitive=True, body="")
+    OutboxMessage.objects.update(status=OutboxMessage.FAILED, attempts=5)
+
+    response = client.post(
+        reverse("admin:mailing_outboxmessage_changelist"),
+        {
+            "action": "retry_now",
+            "_selected_action": list(
+                OutboxMessage.objects.values_list("pk", flat=True)
+            ),
+        },
+    )
+
+    assert response.status_code == 302
+    assert dict(OutboxMessage.objects.values_list("subject", "status")) == {
+        "Hasło": OutboxMessage.FAILED,
+        "Zwykła": OutboxMessage.PENDING,
+    }
+    assert [str(message) for message in get_messages(response.wsgi_request)] == [
+        "Wiadomości ponownie w kolejce: 1.",
+        "Pominięto wiadomości z usuniętą treścią: 1. Zawierały dane logowania, "
+        "ustaw użytkownikom nowe hasło, aby wysłać je ponownie.",
+    ]
+
+
+@pytest.mark.django_db
+def test_admin_retry_skips_messages_being_sent(client, superuser_factory):
+    client.force_login(superuser_factory())
+    outbox.enqueue(
+        [
+            outbox.outbox_message(subject, "Treść", ["a@example.com"])
+            for subject in ("W trakcie", "Porzucona", "Wysłana")
+        ]
+    )
+    now = timezone.now()
+    OutboxMessage.objects.filter(subject="W trakcie").update(
+        status=OutboxMessage.SENDING, claimed_at=now, claim_token="a"
+    )
+    OutboxMessage.objects.filter(subject="Porzucona").update(
+        status=OutboxMessage.SENDING,
+        claimed_at=now - datetime.timedelta(hours=1),
+        claim_token="b",
+    )
+    OutboxMessage.objects.filter(subject="Wysłana").update(status=OutboxMessage.SENT)
+
+    client.post(
+        reverse("admin:mailing_outboxmessage_changelist"),
+        {
+            "action": "retry_now",
+            "_selected_action": list(
+                OutboxMessage.objects.values_list("pk", flat=True)
+            ),
+        },
+    )
+
+    assert dict(OutboxMessage.objects.values_list("subject", "status")) == {
+        "W trakcie": OutboxMessage.SENDING,
+        "Porzucona": OutboxMessage.PENDING,
+        "Wysłana": OutboxMessage.SENT,
+    }
+    assert OutboxMessage.objects.get(subject="Porzucona").claim_token == ""
@@ -0,0 +1,41 @@
+from django.contrib.messages import get_messages
+from django.urls import reverse
+
+import pytest
+
+from tasks.models import Task
+
+
+@pytest.mark.django_db
+def test_admin_status_actions_only_review_confirmed_tasks(
+    client, superuser_factory, user_factory, task_factory
+):
+    client.force_login(superuser_factory())
+    user = user_factory()
+    confirmed = task_factory(user=user, title="Wykonane")
+    Task.objects.filter(pk=confirmed.pk).update(status_field="confirmed")
+    open_task = task_factory(user=user, title="Otwarte")
+    declined = task_factory(user=user, title="Odrzucone")
+    Task.objects.filter(pk=declined.pk).update(status_field="declined")
+
+    response = client.post(
+        reverse("admin:tasks_task_changelist"),
+        {
+            "action": "mark_accepted",
+            "_selected_action": [confirmed.pk, open_task.pk, declined.pk],
+        },
+    )
+
+    assert response.status_code == 302
+    statuses = dict(Task.objects.values_list("title", "status_field"))
+    assert statuses == {
+        "Wykonane": "accepted",
+        "Otwarte": None,
+        "Odrzucone": "declined",
+    }
+    assert list(Task.objects.filter(closed_at__isnull=False)) == [confirmed]
+    (message,) = get_messages(response.wsgi_request)
+    assert str(message) == (
+        "Wykonanie zadań potwierdzone: 1. "
+        "Pominięto zadania nieoznaczone jako wykonane: 2."
+    )
@@ -0,0 +1,262 @@
+from django.urls import reverse
+
+from mailing.models import OutboxMessage
+
+import pytest
+
+from rest_framework.test import APIClient
+
+from tasks.models import Task, TaskComment
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_task_api_list_returns_visible_tasks(
+    api_client, multiple_users, view_task_permission_factory, task_factory
+):
+    users = multiple_users()
+    users[0].user_permissions.add(view_task_permission_factory())
+    task = task_factory(user=users[0], title="Mine")
+    task_factory(user=users[1], title="Someone else's")
+
+    api_client.force_authenticate(users[0])
+    response = api_client.get(reverse("api-task-list"))
+
+    assert response.status_code == 200
+    assert [row["id"] for row in response.data["results"]] == [task.pk]
+    assert response.data["results"][0]["assigned_person"] == [users[0].pk]
+
+
+@pytest.mark.django_db
+def test_task_api_list_requires_view_permission(api_client, user_factory):
+    api_client.force_authenticate(user_factory())
+    response = api_client.get(reverse("api-task-list"))
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_task_api_sparse_fields_skip_unused_prefetches(
+    api_client,
+    user_factory,
+    view_task_permission_factory,
+    task_factory,
+    django_assert_num_queries,
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    for _ in range(3):
+        task_factory(user=user)
+    api_client.force_authenticate(user)
+
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse("api-task-list"), {"fields": "id,title"})
+
+    assert set(response.data["results"][0]) == {"id", "title"}
+
+
+@pytest.mark.django_db
+def test_task_api_applies_task_list_filters(
+    api_client, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    task_factory(user=user, title="Awaria windy", priority="high")
+    task_factory(user=user, title="Awaria bramy", priority="low")
+    api_client.force_authenticate(user)
+
+    response = api_client.get(
+        reverse("api-task-list"), {"priority": "high", "fields": "title"}
+    )
+
+    assert response.data["results"] == [{"title": "Awaria windy"}]
+
+
+@pytest.mark.django_db
+def test_task_api_cursor_pagination(
+    api_client, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    tasks = [task_factory(user=user) for _ in range(5)]
+    api_client.force_authenticate(user)
+
+    first = api_client.get(reverse("api-task-list"), {"page_size": 3, "fields": "id"})
+    second = api_client.get(first.data["next"])
+
+    ids = [row["id"] for row in first.data["results"] + second.data["results"]]
+    assert ids == [task.pk for task in reversed(tasks)]
+    assert "count" not in first.data
+    assert second.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_task_api_conditional_get(
+    api_client, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    task = task_factory(user=user)
+    api_client.force_authenticate(user)
+    url = reverse("api-task-detail", kwargs={"pk": task.pk})
+
+    response = api_client.get(url)
+    etag = response["ETag"]
+    not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    task.title = "Changed"
+    task.save()
+    modified = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert modified.status_code == 200
+    assert modified["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_task_api_create_sets_creator(
+    api_client, user_factory, building_factory, create_task_permission_factory
+):
+    user = user_factory()
+    user.user_permissions.add(create_task_permission_factory())
+    building = building_factory()
+    api_client.force_authenticate(user)
+
+    response = api_client.post(
+        reverse("api-task-list"),
+        {
+            "title": "Nowe zadanie",
+            "description": "Opis",
+            "category": "planned",
+            "priority": "low",
+            "deadline": "2030-01-01T10:00:00",
+            "building": [building.pk],
+            "assigned_person": [user.pk],
+        },
+        format="json",
+    )
+
+    assert response.status_code == 201
+    task = Task.objects.get(pk=response.data["id"])
+    assert task.created_by == user
+    assert list(task.building.all()) == [building]
+
+
+@pytest.mark.django_db
+def test_task_comment_api_create(
+    api_client,
+    multiple_users,
+    task_factory,
+    task_leave_comment_permission_factory,
+):
+    users = multiple_users()
+    users[0].user_permissions.add(task_leave_comment_permission_factory())
+    task = task_factory(user=users[0])
+    other_task = task_factory(user=users[1])
+    task.assigned_person.add(users[1])
+    api_client.force_authenticate(users[0])
+    url = reverse("api-comment-list")
+
+    response = api_client.post(url, {"task": task.pk, "comment_text": "Gotowe"})
+    hidden = api_client.post(url, {"task": other_task.pk, "comment_text": "Nie"})
+
+    assert response.status_code == 201
+    assert TaskComment.objects.get().user == users[0]
+    assert hidden.status_code == 400
+    assert OutboxMessage.objects.filter(
+        subject__startswith="Dodanie komentarza"
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_task_api_status_change_sets_closed_at_and_notifies(
+    api_client, multiple_users, task_factory, update_task_permission_factory
+):
+    manager, technician = multiple_users()
+    manager.is_manager = True
+    manager.save()
+    manager.user_permissions.add(update_task_permission_factory())
+    task = task_factory(user=technician)
+    api_client.force_authenticate(manager)
+    url = reverse("api-task-detail", args=[task.pk])
+
+    response = api_client.patch(url, {"status_field": "accepted"}, format="json")
+
+    assert response.status_code == 200
+    assert response.data["status_field"] == "accepted"
+    assert response.data["closed_at"] is not None
+    task.refresh_from_db()
+    assert task.closed_at is not None
+    (message,) = OutboxMessage.objects.all()
+    assert message.subject == "Aktualizacja statusu zadań: 1"
+    assert message.to == [technician.email]
+
+    response = api_client.patch(url, {"title": "Nowy tytuł"}, format="json")
+
+    assert response.status_code == 200
+    assert OutboxMessage.objects.filter(
+        subject="Zmiana zadania: Nowy tytuł", to=[technician.email]
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_task_api_create_and_delete_notify_assignees(
+    api_client,
+    multiple_users,
+    building_factory,
+    create_task_permission_factory,
+    delete_task_permission_factory,
+):
+    manager, technician = multiple_users()
+    manager.is_manager = True
+    manager.save()
+    manager.user_permissions.add(
+        create_task_permission_factory(), delete_task_permission_factory()
+    )
+    api_client.force_authenticate(manager)
+
+    response = api_client.post(
+        reverse("api-task-list"),
+        {
+            "title": "Nowe zadanie",
+            "description": "Opis",
+            "category": "planned",
+            "priority": "low",
+            "deadline": "2030-01-01T10:00:00",
+            "building": [building_factory().pk],
+            "assigned_person": [technician.pk],
+        },
+        format="json",
+    )
+    assert response.status_code == 201
+    assert OutboxMessage.objects.get().subject == "Nowe zadanie: Nowe zadanie"
+
+    OutboxMessage.objects.update(status=OutboxMessage.SENT)
+    response = api_client.delete(reverse("api-task-detail", args=[response.data["id"]]))
+
+    assert response.status_code == 204
+    assert OutboxMessage.objects.filter(
+        subject="Usunięcie zadania: Nowe zadanie", to=[technician.email]
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_task_comment_api_does_not_edit_or_delete_comments(
+    api_client, multiple_users, task_factory
+):
+    author, other = multiple_users()
+    other.is_superuser = True
+    other.save()
+    task = task_factory(user=other)
+    comment = TaskComment.objects.create(task=task, user=author, comment_text="Mój")
+    api_client.force_authenticate(other)
+    url = reverse("api-comment-detail", args=[comment.pk])
+
+    assert api_client.patch(url, {"comment_text": "Cudzy"}).status_code == 405
+    assert api_client.delete(url).status_code == 405
+    comment.refresh_from_db()
+    assert comment.comment_text == "Mój"
@@ -1,9 +1,12 @@
+import datetime
+
 from django.utils import timezone
 from django.utils.datastructures import MultiValueDict
 
 import pytest
 
 from tasks.forms import TaskCommentForm, TaskFilterForm, TaskForm
+from tasks.models import Task
 
 
 @pytest.mark.django_db
@@ -81,6 +84,67 @@ def test_task_filter_form_invalid_data():
     assert "start_date" in form.errors
 
 
+@pytest.mark.django_db
+def test_task_filter_form_end_date_before_start_date():
+    form = TaskFilterForm(data={"start_date": "2024-01-10", "end_date": "2024-01-01"})
+    assert not form.is_valid()
+    assert "end_date" in form.errors
+
+
+@pytest.mark.django_db
+def test_task_filter_form_filter_queryset_includes_whole_end_day(
+    user_factory, task_factory
+):
+    user = user_factory()
+    task_factory(
+        user=user, title="Start of range", deadline=datetime.datetime(2024, 1, 1)
+    )
+    task_factory(
+        user=user, title="End of range", deadline=datetime.datetime(2024, 1, 10, 23, 59)
+    )
+    task_factory(
+        user=user, title="Out of range", deadline=datetime.datetime(2024, 1, 11)
+    )
+
+    form = TaskFilterForm(
+        data={"deadline_start": "2024-01-01", "deadline_end": "2024-01-10"}
+    )
+    titles = set(
+        form.filter_queryset(Task.objects.all()).values_list("title", flat=True)
+    )
+
+    assert titles == {"Start of range", "End of range"}
+
+
+@pytest.mark.django_db
+def test_task_filter_form_filter_queryset_skips_invalid_fields(
+    user_factory, task_factory
+):
+    user = user_factory()
+    task_factory(user=user, priority="high")
+    task_factory(user=user, priority="low")
+
+    form = TaskFilterForm(data={"priority": "high", "start_date": "invalid-date"})
+
+    assert form.filter_queryset(Task.objects.all()).count() == 1
+
+
+@pytest.mark.django_db
+def test_task_forms_render_only_selected_people(multiple_users, building_factory):
+    first, second = multiple_users()
+    building = building_factory()
+
+    html = TaskForm(initial={"assigned_person": [first], "building": [building]}).as_p()
+    assert str(first) in html
+    assert str(second) not in html
+    assert 'data-ajax--url="/autocomplete/users/"' in html
+    assert 'data-ajax--url="/autocomplete/buildings/"' in html
+
+    html = str(TaskFilterForm()["assigned_person"])
+    assert str(first) not in html
+    assert 'data-ajax--url="/autocomplete/users/"' in html
+
+
 @pytest.mark.django_db
 def test_task_comment_form_valid():
     form_data = {"comment_text": "This is a valid comment."}
@@ -0,0 +1,128 @@
+import io
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from mailing.models import OutboxMessage
+
+from proj.imports import CsvImportError
+
+import pytest
+
+from tasks.imports import import_tasks
+from tasks.models import Task
+from tasks.search import search_tasks
+from tasks.views import TaskImportView
+
+from users.models import AuditEntry
+
+HEADER = "title,description,category,priority,deadline,buildings,assigned_person\n"
+
+
+@pytest.fixture
+def import_targets(multiple_users, building_factory):
+    users = multiple_users()
+    buildings = [building_factory(name="Hala A"), building_factory(name="Biurowiec")]
+    return users, buildings
+
+
+@pytest.mark.django_db
+def test_import_tasks_creates_tasks_and_links(
+    import_targets, django_assert_max_num_queries
+):
+    users, buildings = import_targets
+    rows = "".join(
+        f"Przegląd {number},Opis,planned,low,2030-01-0{number} 08:00,"
+        f"Hala A|biurowiec,{users[0].email}|{users[1].email.upper()}\n"
+        for number in range(1, 6)
+    )
+    rows += f"Awaria,Opis,failure,high,2030-01-10,Hala A,{users[0].email}\n"
+
+    with django_assert_max_num_queries(22):
+        tasks = import_tasks(io.StringIO(HEADER + rows), created_by=users[0])
+
+    assert len(tasks) == 6
+    assert Task.objects.count() == 6
+    assert Task.building.through.objects.count() == 11
+    assert Task.assigned_person.through.objects.count() == 11
+    assert set(Task.objects.get(title="Przegląd 1").building.all()) == set(buildings)
+    assert Task.objects.filter(created_by=users[0]).count() == 6
+    assert search_tasks(Task.objects.all(), "awaria").count() == 1
+    assert AuditEntry.objects.filter(action=AuditEntry.TASKS_IMPORTED).count() == 1
+    assert sorted(OutboxMessage.objects.values_list("subject", flat=True)) == [
+        "Nowe zadania: 5",
+        "Nowe zadania: 6",
+    ]
+
+
+@pytest.mark.django_db
+def test_import_tasks_rejects_file_with_invalid_rows(import_targets):
+    users, _ = import_targets
+    rows = (
+        f"Dobry,Opis,planned,low,2030-01-01 08:00,Hala A,{users[0].email}\n"
+        f"Zły,Opis,unknown,low,2030-01-01 08:00,Hala B,{users[0].email}\n"
+        "Bez osoby,Opis,planned,low,jutro,Hala A,\n"
+    )
+
+    with pytest.raises(CsvImportError) as exc_info:
+        import_tasks(io.StringIO(HEADER + rows))
+
+    errors = exc_info.value.errors
+    assert any(error.startswith("Wiersz 3: category") for error in errors)
+    assert "Wiersz 3: buildings: nie znaleziono 'Hala B'." in errors
+    assert any(error.startswith("Wiersz 4: deadline") for error in errors)
+    assert "Wiersz 4: assigned_person: to pole jest wymagane." in errors
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_import_tasks_requires_columns():
+    with pytest.raises(CsvImportError) as exc_info:
+        import_tasks(io.StringIO("title;description\nA;B\n"))
+    assert exc_info.value.errors == [
+        "Brak kolumn: category, priority, deadline, buildings, assigned_person."
+    ]
+
+
+@pytest.mark.django_db
+def test_task_import_view_uploads_semicolon_separated_file(
+    rf, import_targets, create_task_permission_factory
+):
+    users, _ = import_targets
+    users[0].user_permissions.add(create_task_permission_factory())
+    content = (
+        HEADER.replace(",", ";")
+        + f"Przegląd;Opis, z przecinkiem;planned;low;2030-01-01 08:00;Hala A;{users[1].email}\n"
+    )
+    upload = SimpleUploadedFile("zadania.csv", content.encode("utf-8-sig"))
+
+    request = rf.post(reverse("task_import"), {"file": upload})
+    request.user = users[0]
+    setattr(request, "session", "session")
+    setattr(request, "_messages", FallbackStorage(request))
+    response = TaskImportView.as_view()(request)
+
+    assert response.status_code == 302
+    task = Task.objects.get()
+    assert task.description == "Opis, z przecinkiem"
+    assert task.created_by == users[0]
+
+
+@pytest.mark.django_db
+def test_import_tasks_command(tmp_path, import_targets):
+    users, _ = import_targets
+    path = tmp_path / "tasks.csv"
+    path.write_text(
+        HEADER + f"Przegląd,Opis,planned,low,2030-01-01,Hala A,{users[0].email}\n"
+    )
+
+    call_command("import_tasks", str(path), "--no-notify", stdout=io.StringIO())
+
+    assert Task.objects.count() == 1
+    assert not OutboxMessage.objects.exists()
+
+    path.write_text(HEADER + "Przegląd,Opis,planned,low,2030-01-01,Hala A,x@y.pl\n")
+    with pytest.raises(CommandError):
+        call_command("import_tasks", str(path), stdout=io.StringIO())
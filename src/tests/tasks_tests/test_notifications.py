@@ -0,0 +1,261 @@
+import io
+
+from django.core.management import call_command
+
+from freezegun import freeze_time
+
+from mailing.models import OutboxMessage
+
+import pytest
+
+from tasks import notifications
+from tasks.models import CommentWatermark, Task, TaskComment, TaskNotification
+from tasks.services import bulk_update_status
+
+
+@pytest.mark.django_db
+def test_notify_task_commented_queries_do_not_depend_on_comments(
+    rf, settings, multiple_users, task_factory, django_assert_num_queries
+):
+    settings.DEFAULT_DOMAIN = "cmms.example.com"
+    author, assignee = multiple_users()
+    task = task_factory(user=assignee)
+    task.created_by = author
+    task.save()
+    TaskComment.objects.bulk_create(
+        [
+            TaskComment(
+                task=task,
+                user=(author, assignee)[number % 2],
+                comment_text=f"K{number}",
+            )
+            for number in range(200)
+        ]
+    )
+    request = rf.post("/")
+    request.user = author
+
+    # the task with its relations, the watermarks, the unseen comments,
+    # the pending message lookup, the outbox message, the new watermarks
+    # and the audit entry
+    with django_assert_num_queries(10):
+        notifications.notify_task_commented(task, request)
+
+    message = OutboxMessage.objects.get()
+    assert message.to == [assignee.email]
+    lines = message.body.splitlines()
+    assert lines[0] == f"Użytkownik {author.full_name} dodał komentarz do zadania:"
+    assert "Przypisane osoby: User2 Test" in lines
+    assert lines[-11] == "Nowe komentarze: - User2 Test: K199"
+    assert all(line.startswith("- User") for line in lines[-10:-1])
+    assert lines[-1] == (
+        "Pokazano 10 najnowszych. "
+        f"Wszystkie komentarze: https://cmms.example.com/task/list/?task={task.pk}"
+    )
+
+
+@pytest.mark.django_db
+def test_comment_notifications_only_list_comments_since_the_last_one(
+    rf, multiple_users, task_factory
+):
+    author, assignee = multiple_users()
+    task = task_factory(user=assignee)
+    request = rf.post("/")
+    request.user = author
+
+    def comment(text):
+        TaskComment.objects.create(task=task, user=author, comment_text=text)
+        notifications.notify_task_commented(task, request)
+        return OutboxMessage.objects.latest("id")
+
+    first = comment("Pierwszy")
+    assert "Nowe komentarze: - User1 Test: Pierwszy\n" in first.body
+
+    # the first message is still waiting, so the second one replaces it
+    second = comment("Drugi")
+    assert second.pk == first.pk
+    assert "- User1 Test: Drugi\n- User1 Test: Pierwszy\n" in second.body
+
+    OutboxMessage.objects.update(status=OutboxMessage.SENT)
+    third = comment("Trzeci")
+    assert third.pk != first.pk
+    assert "Nowe komentarze: - User1 Test: Trzeci\nWszystkie" in third.body
+
+    OutboxMessage.objects.update(status=OutboxMessage.SENT)
+    notifications.notify_task_updated(task, request)
+    assert "Nowe komentarze: Brak" in OutboxMessage.objects.latest("id").body
+
+
+@pytest.mark.django_db
+def test_status_change_coalesced_with_a_comment_keeps_the_comment(
+    rf, multiple_users, task_factory
+):
+    manager, technician = multiple_users()
+    task = task_factory(user=technician)
+    task.created_by = manager
+    task.save()
+    request = rf.post("/")
+    request.user = technician
+
+    TaskComment.objects.create(task=task, user=technician, comment_text="Gotowe")
+    notifications.notify_task_commented(task, request)
+    Task.objects.filter(pk=task.pk).update(status_field="confirmed")
+    notifications.notify_status_confirmed(task, request)
+
+    message = OutboxMessage.objects.get()
+    assert message.to == [manager.email]
+    assert message.subject == f"Aktualizacja statusu: {task.title}"
+    assert "oznaczyła je jako wykonano" in message.body
+    assert "Nowe komentarze: - User2 Test: Gotowe\n" in message.body
+
+
+@pytest.mark.django_db
+def test_comment_is_sent_once_when_a_status_change_replaces_its_message(
+    rf, multiple_users, task_factory
+):
+    manager, technician = multiple_users()
+    task = task_factory(user=technician)
+    task.created_by = manager
+    task.save()
+    request = rf.post("/")
+    request.user = technician
+
+    TaskComment.objects.create(task=task, user=technician, comment_text="C1")
+    notifications.notify_task_commented(task, request)
+    Task.objects.filter(pk=task.pk).update(status_field="confirmed")
+    notifications.notify_status_confirmed(task, request)
+    first = OutboxMessage.objects.get()
+    assert "Nowe komentarze: - User2 Test: C1\n" in first.body
+
+    OutboxMessage.objects.update(status=OutboxMessage.SENT)
+    TaskComment.objects.create(task=task, user=technician, comment_text="C2")
+    notifications.notify_task_commented(task, request)
+
+    second = OutboxMessage.objects.latest("id")
+    assert second.pk != first.pk
+    assert "Nowe komentarze: - User2 Test: C2\nWszystkie" in second.body
+
+
+@pytest.mark.django_db
+def test_creator_who_is_also_an_assignee_is_notified_once(
+    rf, multiple_users, task_factory
+):
+    manager, technician = multiple_users()
+    task = task_factory(user=technician)
+    task.assigned_person.add(manager)
+    task.created_by = manager
+    task.save()
+    request = rf.post("/")
+    request.user = technician
+
+    notifications.notify_status_confirmed(task, request)
+
+    assert OutboxMessage.objects.get().to == [manager.email]
+    assert CommentWatermark.objects.get().recipient == manager
+
+    manager.notification_mode = "digest"
+    manager.save()
+    notifications.notify_status_confirmed(task, request)
+
+    assert TaskNotification.objects.get().recipient == manager
+
+
+@pytest.mark.django_db
+def test_benchmark_task_notifications_command_rolls_back(task_factory):
+    output = io.StringIO()
+
+    call_command("benchmark_task_notifications", comments=30, repeat=2, stdout=output)
+
+    assert "tasks/emails/task_commented.txt" in output.getvalue()
+    assert "6 queries" in output.getvalue()
+    assert not TaskComment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_digest_users_get_one_email_per_interval(rf, multiple_users, task_factory):
+    manager, technician, other = multiple_users(count=3)
+    technician.notification_mode = "digest"
+    technician.digest_interval = 30
+    technician.save()
+    task = task_factory(user=technician)
+    task.assigned_person.add(other)
+    task.created_by = manager
+    task.save()
+    request = rf.post("/")
+    request.user = manager
+
+    with freeze_time("2030-01-01 08:00"):
+        notifications.notify_task_updated(task, request)
+    with freeze_time("2030-01-01 08:10"):
+        notifications.notify_task_commented(task, request)
+        notifications.notify_task_deleted("Stare zadanie", [technician.email], request)
+
+    (message,) = OutboxMessage.objects.all()
+    assert message.to == [other.email]
+    assert message.subject == f"Dodanie komentarza do zadania: {task.title}"
+    assert TaskNotification.objects.filter(recipient=technician).count() == 3
+
+    with freeze_time("2030-01-01 08:20"):
+        assert notifications.send_pending_digests() == 0
+    with freeze_time("2030-01-01 08:31"):
+        assert notifications.send_pending_digests() == 1
+
+    digest = OutboxMessage.objects.latest("id")
+    assert digest.to == [technician.email]
+    assert digest.subject == "Podsumowanie zadań: 2"
+    assert digest.body.count(f"(nr {task.pk})") == 1
+    assert f"2030-01-01 08:00 Zmiana zadania: {task.title}" in digest.body
+    assert (
+        f"2030-01-01 08:10 Dodanie komentarza do zadania: {task.title}" in digest.body
+    )
+    assert "- Stare zadanie (zadanie usunięte)" in digest.body
+    assert not TaskNotification.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_digests_buffer_tasks_of_digest_users(multiple_users, task_factory):
+    technician, other = multiple_users()
+    technician.notification_mode = "digest"
+    technician.save()
+    for user in (technician, other):
+        task_factory(user=user, status_field="confirmed")
+
+    bulk_update_status(Task.objects.all(), "accepted")
+
+    assert list(OutboxMessage.objects.values_list("to", flat=True)) == [[other.email]]
+    assert TaskNotification.objects.get().recipient == technician
+
+    technician.notification_mode = "immediate"
+    technician.save()
+    call_command("send_notification_digests", once=True, stdout=io.StringIO())
+
+    assert OutboxMessage.objects.latest("id").to == [technician.email]
+
+
+@pytest.mark.django_db
+def test_burst_of_changes_is_sent_once_per_recipient(rf, multiple_users, task_factory):
+    manager, technician, other = multiple_users(count=3)
+    task = task_factory(user=technician)
+    task.assigned_person.add(other)
+    task.created_by = manager
+    task.save()
+    request = rf.post("/")
+    request.user = manager
+
+    with freeze_time("2030-01-01 08:00:00"):
+        notifications.notify_task_updated(task, request)
+    with freeze_time("2030-01-01 08:00:03"):
+        notifications.notify_task_commented(task, request)
+        notifications.notify_task_deleted(
+            task.title, [technician.email], request, task_id=task.pk
+        )
+
+    messages = {
+        message.to[0]: message for message in OutboxMessage.objects.order_by("id")
+    }
+    assert sorted(messages) == sorted([technician.email, other.email])
+    assert messages[technician.email].subject == f"Usunięcie zadania: {task.title}"
+    assert messages[other.email].subject.startswith("Dodanie komentarza")
+    assert {str(message.next_attempt_at) for message in messages.values()} == {
+        "2030-01-01 08:00:05"
+    }
@@ -0,0 +1,125 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+
+from tasks.models import Task, TaskComment
+from tasks.search import search_tasks
+from tasks.views import TaskListView
+
+
+def search_titles(query):
+    return list(
+        search_tasks(Task.objects.all(), query)
+        .order_by("-search_rank", "-id")
+        .values_list("title", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_search_matches_title_description_and_comments(user_factory, task_factory):
+    user = user_factory()
+    task_factory(user=user, title="Wymiana pompy", description="Kotłownia")
+    task_factory(user=user, title="Przegląd", description="Pompa ciepła w hali")
+    task_factory(user=user, title="Serwis", comments="Sprawdzić pompę obiegową")
+    task_factory(user=user, title="Malowanie", description="Ściany w biurze")
+
+    assert set(search_titles("pomp")) == {"Wymiana pompy", "Przegląd", "Serwis"}
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(user_factory, task_factory):
+    user = user_factory()
+    task_factory(user=user, title="Przegląd", description="Awaria oświetlenia")
+    task_factory(user=user, title="Awaria oświetlenia", description="Hala A")
+
+    assert search_titles("awaria") == ["Awaria oświetlenia", "Przegląd"]
+
+
+@pytest.mark.django_db
+def test_search_requires_every_term_and_ignores_query_syntax(
+    user_factory, task_factory
+):
+    user = user_factory()
+    task_factory(user=user, title="Awaria windy")
+    task_factory(user=user, title="Awaria bramy")
+
+    assert search_titles('(awaria "windy*') == ["Awaria windy"]
+    assert search_titles("*") == ["Awaria bramy", "Awaria windy"]
+
+
+@pytest.mark.django_db
+def test_search_index_follows_task_and_comment_changes(user_factory, task_factory):
+    user = user_factory()
+    task = task_factory(user=user, title="Awaria windy")
+
+    task.title = "Przegląd bramy"
+    task.save()
+    assert search_titles("windy") == []
+    assert search_titles("bramy") == ["Przegląd bramy"]
+
+    comment = TaskComment.objects.create(
+        task=task, user=user, comment_text="Brak części"
+    )
+    assert search_titles("części") == ["Przegląd bramy"]
+
+    comment.delete()
+    assert search_titles("części") == []
+
+    task.delete()
+    assert search_titles("bramy") == []
+
+
+@pytest.mark.django_db
+def test_new_comment_is_appended_without_rebuilding_the_document(
+    user_factory, task_factory
+):
+    user = user_factory()
+    task = task_factory(user=user, title="Przegląd bramy")
+    TaskComment.objects.create(task=task, user=user, comment_text="Brak części")
+
+    with CaptureQueriesContext(connection) as queries:
+        TaskComment.objects.create(task=task, user=user, comment_text="Nowy siłownik")
+
+    assert not any("group_concat" in query["sql"] for query in queries)
+    assert search_titles("części siłownik") == ["Przegląd bramy"]
+
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM tasks_task_fts")
+    TaskComment.objects.create(task=task, user=user, comment_text="Smarowanie")
+    assert search_titles("części smarowanie") == ["Przegląd bramy"]
+
+
+@pytest.mark.django_db
+def test_rebuild_task_search_index_command(user_factory, task_factory):
+    user = user_factory()
+    task_factory(user=user, title="Awaria windy")
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM tasks_task_fts")
+    assert search_titles("windy") == []
+
+    call_command("rebuild_task_search_index")
+
+    assert search_titles("windy") == ["Awaria windy"]
+
+
+@pytest.mark.django_db
+def test_task_list_view_search(
+    rf, user_factory, task_factory, view_task_permission_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    task_factory(user=user, title="Awaria windy")
+    task_factory(user=user, title="Przegląd bramy")
+
+    request = rf.get(reverse("task_list"), {"search": "windy", "pagination": "cursor"})
+    request.user = user
+    response = TaskListView.as_view()(request)
+    response.render()
+
+    content = response.content.decode()
+    assert "Awaria windy" in content
+    assert "Przegląd bramy" not in content
+    assert response.context_data["cursor_pagination"] is False
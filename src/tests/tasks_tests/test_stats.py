@@ -0,0 +1,222 @@
+import datetime
+import io
+from collections import defaultdict
+
+from django.core.management import call_command
+from django.db.models import Sum
+
+import pytest
+
+from tasks import stats
+from tasks.models import Task, TaskClosureTime, TaskRollup, TaskStatistic
+from tasks.services import bulk_update_status
+
+
+def assert_counters_match_tasks():
+    stored = {
+        (user_id, key): value
+        for user_id, key, value in TaskStatistic.objects.values_list(
+            "user_id", "key", "value"
+        )
+        if value
+    }
+    expected = {
+        scope: value for scope, value in stats.compute_counters().items() if value
+    }
+    assert stored == expected
+
+
+@pytest.mark.django_db
+def test_statistics_follow_task_lifecycle(multiple_users, task_factory):
+    first, second = multiple_users()
+    task = task_factory(user=first, category="failure", priority="high")
+    task_factory(user=second)
+
+    assert stats.read_counters() == {
+        "total": 2,
+        "open": 2,
+        "category:failure": 1,
+        "category:planned": 1,
+        "priority:high": 1,
+        "priority:medium": 1,
+    }
+    assert stats.read_counters(first)["category:failure"] == 1
+
+    task.status_field = "accepted"
+    task.closed_at = task.created_at + datetime.timedelta(hours=3)
+    task.save()
+    assert stats.read_counters(first) == {
+        "total": 1,
+        "closed": 1,
+        "closure_count": 1,
+        "closure_seconds": 3 * 3600,
+        "category:failure": 1,
+        "priority:high": 1,
+    }
+
+    task.assigned_person.set([second])
+    assert stats.read_counters(first) == {}
+    assert stats.read_counters(second)["total"] == 2
+
+    second.assigned_person.clear()
+    assert stats.read_counters(second) == {}
+
+    task.delete()
+    assert stats.read_counters()["total"] == 1
+    assert_counters_match_tasks()
+
+
+@pytest.mark.django_db
+def test_statistics_follow_bulk_status_update(multiple_users, task_factory):
+    first, second = multiple_users()
+    for number in range(4):
+        task_factory(user=(first, second)[number % 2], status_field="confirmed")
+    task_factory(user=first)
+
+    bulk_update_status(Task.objects.filter(status_field="confirmed"), "accepted")
+
+    assert stats.read_counters()["closed"] == 4
+    assert stats.read_counters(second)["closed"] == 2
+    assert_counters_match_tasks()
+
+
+@pytest.mark.django_db
+def test_rebuild_task_statistics_command_fixes_drift(user_factory, task_factory):
+    output = io.StringIO()
+    user = user_factory()
+    task_factory(user=user)
+    Task.objects.update(status_field="declined")
+    TaskStatistic.objects.filter(user=user, key="total").update(value=5)
+
+    call_command("rebuild_task_statistics", stdout=output)
+
+    assert "3 counters were out of date" in output.getvalue()
+    assert "open" not in stats.read_counters()
+    assert_counters_match_tasks()
+
+
+def assert_rollups_match_tasks():
+    rows = TaskRollup.objects.values_list(
+        "period",
+        "period_start",
+        "building_id",
+        "category",
+        "priority",
+        "metric",
+        "value",
+    )
+    stored = {tuple(key): value for *key, value in rows if value}
+    expected = {
+        key: value
+        for key, value in stats.compute_rollups(chunk_size=2).items()
+        if value
+    }
+    assert stored == expected
+
+
+@pytest.mark.django_db
+def test_rollups_follow_task_changes(user_factory, building_factory, task_factory):
+    user = user_factory()
+    other_building = building_factory(name="Magazyn")
+    task = task_factory(user=user, deadline=datetime.datetime(2030, 1, 15, 12))
+    task_factory(user=user, status_field="declined")
+
+    task.status_field = "accepted"
+    task.closed_at = task.created_at + datetime.timedelta(hours=1)
+    task.save()
+    task.building.add(other_building)
+    other_building.building.remove(task)
+
+    monthly = dict(
+        TaskRollup.objects.filter(
+            period="month", building=None, period_start=datetime.date(2030, 1, 1)
+        ).values_list("metric", "value")
+    )
+    assert monthly == {"due": 1, "due_on_time": 1}
+    assert_rollups_match_tasks()
+
+    task.delete()
+    assert_rollups_match_tasks()
+
+
+@pytest.mark.django_db
+def test_backfill_task_rollups_command(user_factory, task_factory):
+    output = io.StringIO()
+    user = user_factory()
+    for number in range(3):
+        task_factory(user=user, priority=("low", "high")[number % 2])
+    TaskRollup.objects.all().delete()
+
+    call_command("backfill_task_rollups", chunk_size=2, stdout=output)
+
+    assert "Task rollups rebuilt" in output.getvalue()
+    assert_rollups_match_tasks()
+    assert (
+        TaskRollup.objects.filter(
+            period="week", building=None, metric="created"
+        ).aggregate(total=Sum("value"))["total"]
+        == 3
+    )
+
+
+def assert_closure_times_match_tasks():
+    rows = TaskClosureTime.objects.values_list(
+        "dimension", "key", "bucket", "count", "total_seconds"
+    )
+    stored = {
+        (dimension, key, bucket): (count, total)
+        for dimension, key, bucket, count, total in rows
+        if count
+    }
+    expected = {
+        key: value for key, value in stats.compute_closure_times().items() if value[0]
+    }
+    assert stored == expected
+
+
+def test_summarize_closure_times_is_within_five_percent():
+    durations = [60 * minutes for minutes in range(1, 1001)]
+    histogram = defaultdict(lambda: [0, 0])
+    for seconds in durations:
+        bucket = histogram[stats.closure_bucket(seconds)]
+        bucket[0] += 1
+        bucket[1] += seconds
+
+    summary = stats.summarize_closure_times(
+        (bucket, count, total) for bucket, (count, total) in histogram.items()
+    )
+
+    assert summary["count"] == 1000
+    assert summary["mean"] == sum(durations) / 1000
+    for name, exact in (("p50", 500 * 60), ("p90", 900 * 60), ("p99", 990 * 60)):
+        assert abs(summary[name] - exact) / exact < 0.05
+
+
+@pytest.mark.django_db
+def test_closure_times_follow_task_changes(
+    multiple_users, building_factory, task_factory
+):
+    first, second = multiple_users()
+    task = task_factory(user=first, status_field="confirmed")
+    assert not TaskClosureTime.objects.exists()
+
+    task.status_field = "accepted"
+    task.closed_at = task.created_at + datetime.timedelta(hours=5)
+    task.save()
+    assert set(
+        TaskClosureTime.objects.values_list("dimension", "count", "total_seconds")
+    ) == {
+        ("all", 1, 5 * 3600),
+        ("category", 1, 5 * 3600),
+        ("building", 1, 5 * 3600),
+        ("person", 1, 5 * 3600),
+    }
+
+    task.assigned_person.set([second])
+    task.building.add(building_factory(name="Magazyn"))
+    assert_closure_times_match_tasks()
+
+    task.status_field = "declined"
+    task.save()
+    assert_closure_times_match_tasks()
+    assert not TaskClosureTime.objects.exclude(count=0).exists()
@@ -1,32 +1,50 @@
+import csv
+import io
 import json
+import zipfile
 from unittest.mock import call, patch
 
 from django.contrib.messages import get_messages
 from django.core.exceptions import PermissionDenied
-from django.http import JsonResponse
+from django.db import connection
+from django.http import Http404, JsonResponse
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now, timedelta
 
 from freezegun import freeze_time
 
+from mailing.attachments import absolute_url, attachment_token
+from mailing.models import OutboxMessage
+
 from proj.settings import DEFAULT_FROM_EMAIL
 
 import pytest
 
 from tasks.models import Task, TaskComment
 from tasks.views import (
+    TaskBulkStatusUpdateView,
     TaskCreateView,
     TaskDeleteView,
+    TaskDetailView,
     TaskEmployeeStatusUpdateView,
+    TaskExportView,
     TaskLeaveComment,
     TaskListView,
     TaskManagerStatusUpdateView,
     TaskUpdateView,
+    serve_attachment,
 )
 
 from users.models import AuditEntry
 
 
+def assert_queued_email(subject, body, from_email, to):
+    emails = OutboxMessage.objects.filter(subject=subject)
+    assert {(email.body, email.from_email) for email in emails} == {(body, from_email)}
+    assert sorted(address for email in emails for address in email.to) == sorted(to)
+
+
 @pytest.mark.django_db
 def test_task_list_view_authenticated_with_permission(
     rf, user_factory, view_task_permission_factory
@@ -129,6 +147,395 @@ def test_task_list_view_query_params_excludes_page(
     assert "status_field=accepted" in query_params
 
 
+@pytest.mark.django_db
+def test_task_list_view_query_count_does_not_depend_on_rows(
+    rf,
+    user_factory,
+    multiple_users,
+    view_task_permission_factory,
+    task_factory,
+    attachment_factory,
+    django_assert_num_queries,
+):
+    user = user_factory()
+    permission = view_task_permission_factory()
+    user.user_permissions.add(permission)
+    users = multiple_users(count=3)
+
+    for _ in range(10):
+        task = task_factory(user=user, comments="First comment", created_by=users[0])
+        task.assigned_person.add(*users)
+        attachment_factory(task=task)
+        TaskComment.objects.create(task=task, user=users[1], comment_text="Second")
+
+    request = rf.get(reverse("task_list"))
+    request.user = user
+
+    with django_assert_num_queries(6):
+        response = TaskListView.as_view()(request)
+        response.render()
+
+    assert response.status_code == 200
+    tasks = response.context_data["tasks"]
+    assert all(task.is_assignee for task in tasks)
+    assert all(task.allowed_actions == ("confirm",) for task in tasks)
+
+
+@pytest.mark.django_db
+def test_task_list_view_cursor_pagination(
+    rf, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    permission = view_task_permission_factory()
+    user.user_permissions.add(permission)
+
+    tasks = [task_factory(user=user, title=f"Task {i}") for i in range(15)]
+    expected = sorted(tasks, key=lambda task: (task.created_at, task.pk), reverse=True)
+
+    request = rf.get(reverse("task_list"), {"pagination": "cursor"})
+    request.user = user
+    with CaptureQueriesContext(connection) as queries:
+        response = TaskListView.as_view()(request)
+
+    first_page = response.context_data["page_obj"]
+    assert list(first_page) == expected[:10]
+    assert first_page.has_next() is True
+    assert first_page.has_previous() is False
+    assert not any("COUNT(" in query["sql"] for query in queries.captured_queries)
+
+    request = rf.get(
+        reverse("task_list"),
+        {"pagination": "cursor", "cursor": first_page.next_cursor},
+    )
+    request.user = user
+    response = TaskListView.as_view()(request)
+    response.render()
+
+    second_page = response.context_data["page_obj"]
+    assert list(second_page) == expected[10:]
+    assert second_page.has_next() is False
+    assert second_page.has_previous() is True
+    assert "cursor=" not in response.context_data["query_params"]
+    assert f"?cursor={second_page.previous_cursor}" in response.content.decode()
+
+    request = rf.get(
+        reverse("task_list"),
+        {"pagination": "cursor", "cursor": second_page.previous_cursor},
+    )
+    request.user = user
+    response = TaskListView.as_view()(request)
+
+    assert list(response.context_data["page_obj"]) == expected[:10]
+
+
+@pytest.mark.django_db
+def test_task_list_view_cursor_pagination_keeps_filters(
+    rf, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    permission = view_task_permission_factory()
+    user.user_permissions.add(permission)
+
+    for i in range(12):
+        task_factory(user=user, title=f"Planned {i}", category="planned")
+        task_factory(user=user, title=f"Failure {i}", category="failure")
+
+    request = rf.get(
+        reverse("task_list"), {"pagination": "cursor", "category": "failure"}
+    )
+    request.user = user
+    response = TaskListView.as_view()(request)
+    page = response.context_data["page_obj"]
+
+    request = rf.get(
+        reverse("task_list"),
+        {"pagination": "cursor", "category": "failure", "cursor": page.next_cursor},
+    )
+    request.user = user
+    response = TaskListView.as_view()(request)
+    page = response.context_data["page_obj"]
+
+    assert len(page) == 2
+    assert all(task.category == "failure" for task in page)
+
+
+@pytest.mark.django_db
+def test_task_list_view_cursor_pagination_invalid_cursor(
+    rf, user_factory, view_task_permission_factory
+):
+    user = user_factory()
+    permission = view_task_permission_factory()
+    user.user_permissions.add(permission)
+
+    request = rf.get(reverse("task_list"), {"pagination": "cursor", "cursor": "abc"})
+    request.user = user
+    with pytest.raises(Http404):
+        TaskListView.as_view()(request)
+
+
+@pytest.mark.django_db
+def test_task_detail_view_returns_fragment(
+    rf,
+    user_factory,
+    view_task_permission_factory,
+    task_factory,
+    attachment_factory,
+    django_assert_num_queries,
+):
+    user = user_factory()
+    permission = view_task_permission_factory()
+    user.user_permissions.add(permission)
+    task = task_factory(user=user, comments="First comment", created_by=user)
+    attachment_factory(task=task, file="attachments/report.pdf")
+    TaskComment.objects.create(task=task, user=user, comment_text="Second comment")
+
+    request = rf.get(reverse("task_details", kwargs={"pk": task.pk}))
+    request.user = user
+
+    with django_assert_num_queries(7):
+        response = TaskDetailView.as_view()(request, pk=task.pk)
+
+    assert response.status_code == 200
+    html = json.loads(response.content.decode())["html"]
+    assert task.description in html
+    assert "First comment" in html
+    assert "Second comment" in html
+    assert "attachments/report.pdf" in html
+    assert f'id="comment-form-{task.pk}"' in html
+
+
+@pytest.mark.django_db
+def test_task_detail_view_hides_unassigned_tasks(
+    rf, multiple_users, view_task_permission_factory, task_factory
+):
+    users = multiple_users()
+    permission = view_task_permission_factory()
+    users[0].user_permissions.add(permission)
+    task = task_factory(user=users[1])
+
+    request = rf.get(reverse("task_details", kwargs={"pk": task.pk}))
+    request.user = users[0]
+
+    with pytest.raises(Http404):
+        TaskDetailView.as_view()(request, pk=task.pk)
+
+
+@pytest.mark.django_db
+def test_task_export_view_streams_filtered_csv(
+    rf,
+    multiple_users,
+    view_task_permission_factory,
+    task_factory,
+    django_assert_num_queries,
+):
+    users = multiple_users()
+    users[0].user_permissions.add(view_task_permission_factory())
+    for number in range(5):
+        task_factory(user=users[0], title=f"High {number}", priority="high")
+    task_factory(user=users[0], title="Low priority", priority="low")
+    task_factory(user=users[1], title="Someone else's", priority="high")
+
+    request = rf.get(
+        reverse("task_export", kwargs={"export_format": "csv"}), {"priority": "high"}
+    )
+    request.user = users[0]
+    response = TaskExportView.as_view()(request, export_format="csv")
+
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert response["Content-Disposition"].startswith('attachment; filename="zadania-')
+
+    with django_assert_num_queries(3):
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+
+    lines = content.splitlines()
+    assert lines[0].startswith("ID,Tytuł,Status")
+    assert len(lines) == 6
+    assert "High 4" in lines[1]
+    assert "Low priority" not in content
+    assert "Someone else's" not in content
+
+
+@pytest.mark.django_db
+def test_task_export_view_streams_xlsx(
+    rf, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    task_factory(user=user, title="Awaria <windy> & bramy")
+
+    request = rf.get(reverse("task_export", kwargs={"export_format": "xlsx"}))
+    request.user = user
+    response = TaskExportView.as_view()(request, export_format="xlsx")
+    content = b"".join(response.streaming_content)
+
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert archive.testzip() is None
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+    assert "Awaria &lt;windy&gt; &amp; bramy" in sheet
+    assert sheet.count("<row>") == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("export_format", ["csv", "xlsx"])
+def test_task_export_escapes_formulas(
+    rf, user_factory, view_task_permission_factory, task_factory, export_format
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+    task = task_factory(user=user, title='=HYPERLINK("http://evil.example","x")')
+    task.description = "-1+1"
+    task.save()
+
+    request = rf.get(reverse("task_export", kwargs={"export_format": export_format}))
+    request.user = user
+    response = TaskExportView.as_view()(request, export_format=export_format)
+    content = b"".join(response.streaming_content)
+
+    if export_format == "csv":
+        (row,) = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))[1:]
+        assert row[1] == '\'=HYPERLINK("http://evil.example","x")'
+        assert row[-1] == "'-1+1"
+    else:
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        assert '>\'=HYPERLINK("http://evil.example","x")<' in sheet
+        assert ">'-1+1<" in sheet
+
+
+@pytest.mark.django_db
+def test_task_export_view_unknown_format(
+    rf, user_factory, view_task_permission_factory
+):
+    user = user_factory()
+    user.user_permissions.add(view_task_permission_factory())
+
+    request = rf.get(reverse("task_export", kwargs={"export_format": "pdf"}))
+    request.user = user
+
+    with pytest.raises(Http404):
+        TaskExportView.as_view()(request, export_format="pdf")
+
+
+@pytest.mark.django_db
+def test_task_bulk_status_update_view_accepts_selected_tasks(
+    rf,
+    user_factory,
+    multiple_users,
+    task_factory,
+    update_task_permission_factory,
+    attach_messages_middleware,
+    django_assert_max_num_queries,
+):
+    manager = user_factory(email="manager@dacpol.eu")
+    manager.is_manager = True
+    manager.save()
+    manager.user_permissions.add(update_task_permission_factory())
+    users = multiple_users()
+    tasks = [
+        task_factory(user=users[number % 2], status_field="confirmed")
+        for number in range(6)
+    ]
+    open_task = task_factory(user=users[0])
+
+    request = rf.post(
+        reverse("task_bulk_status_update"),
+        {
+            "tasks": [task.pk for task in tasks] + [open_task.pk],
+            "status": "accepted",
+            "next": "/task/list/?page=2",
+        },
+    )
+    request.user = manager
+    attach_messages_middleware(request)
+
+    # the statistics issue one UPDATE per distinct delta value, not per task
+    with django_assert_max_num_queries(28):
+        response = TaskBulkStatusUpdateView.as_view()(request)
+
+    assert response.status_code == 302
+    assert response.url == "/task/list/?page=2"
+    assert (
+        Task.objects.filter(status_field="accepted", closed_at__isnull=False).count()
+        == 6
+    )
+    assert Task.objects.get(pk=open_task.pk).status_field is None
+    assert AuditEntry.objects.filter(action=AuditEntry.TASK_UPDATED).count() == 6
+    emails = OutboxMessage.objects.all()
+    assert sorted(len(email.body.split("\n- ")) for email in emails) == [4, 4]
+    assert sorted(email.to[0] for email in emails) == sorted(
+        user.email for user in users[:2]
+    )
+
+
+@pytest.mark.django_db
+def test_task_bulk_status_update_view_declines_with_comment(
+    rf, user_factory, task_factory, update_task_permission_factory
+):
+    manager = user_factory()
+    manager.user_permissions.add(update_task_permission_factory())
+    tasks = [task_factory(user=manager, status_field="confirmed") for _ in range(2)]
+
+    request = rf.post(
+        reverse("task_bulk_status_update"),
+        {
+            "tasks": [task.pk for task in tasks],
+            "status": "declined",
+            "comment_text": "Brak zdjęć",
+        },
+        HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+    )
+    request.user = manager
+    response = TaskBulkStatusUpdateView.as_view()(request)
+
+    assert json.loads(response.content) == {
+        "success": True,
+        "message": "Wykonanie zadań nie potwierdzone: 2.",
+    }
+    assert Task.objects.filter(status_field="declined").count() == 2
+    assert TaskComment.objects.filter(comment_text="Brak zdjęć").count() == 2
+    assert OutboxMessage.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_task_bulk_status_update_view_requires_selection(
+    rf, user_factory, update_task_permission_factory
+):
+    manager = user_factory()
+    manager.user_permissions.add(update_task_permission_factory())
+
+    request = rf.post(
+        reverse("task_bulk_status_update"),
+        {"status": "accepted"},
+        HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+    )
+    request.user = manager
+    response = TaskBulkStatusUpdateView.as_view()(request)
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["message"] == "Nie zaznaczono żadnego zadania."
+
+
+@pytest.mark.django_db
+def test_task_list_view_renders_shared_modals(
+    rf, user_factory, view_task_permission_factory, task_factory
+):
+    user = user_factory()
+    permission = view_task_permission_factory()
+    user.user_permissions.add(permission)
+    for _ in range(3):
+        task_factory(user=user, comments="Hidden until opened")
+
+    request = rf.get(reverse("task_list"))
+    request.user = user
+    response = TaskListView.as_view()(request)
+    response.render()
+    content = response.content.decode()
+
+    assert content.count('id="taskDetailsModal"') == 1
+    assert "Hidden until opened" not in content
+
+
 @pytest.mark.django_db
 def test_task_create_view_authenticated_with_permissions(
     rf, user_factory, create_task_permission_factory
@@ -193,11 +600,7 @@ def test_task_create_view_valid_form_submission(
     attach_messages_middleware(request)
     assert request.FILES.getlist("attachments") == test_files
 
-    with patch("tasks.views.EmailMessage") as mock_email_class, patch(
-        "users.models.AuditEntry.log_action"
-    ) as mock_log_action:
-
-        mock_email = mock_email_class.return_value
+    with patch("users.models.AuditEntry.log_action") as mock_log_action:
 
         response = TaskCreateView.as_view()(request)
 
@@ -206,7 +609,7 @@ def test_task_create_view_valid_form_submission(
 
         task = Task.objects.get(title="Test Task")
 
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Nowe zadanie: {task.title}",
             f"Zostało ci przydzielone nowe zadanie:\n\n"
             f"Nazwa: {task.title}\n"
@@ -220,31 +623,20 @@ def test_task_create_view_valid_form_submission(
             [user.email for user in users],
         )
 
-        mock_email.send.assert_called_once()
-
         mock_log_action.assert_any_call(
             AuditEntry.TASK_CREATED, request, f"id={task.id}, {task.title}"
         )
         mock_log_action.assert_any_call(
-            AuditEntry.EMAIL_SENT,
+            AuditEntry.EMAIL_QUEUED,
             request,
             f"Nowe zadanie: {task.title} -> ['user1@example.com', 'user2@example.com']",
         )
 
         assert task.attachments.count() == 2
 
-        mock_email.attach.assert_any_call(
-            task.attachments.get(file__icontains="test_file1").file.name,
-            b"Test file content 1",
-            "text/plain",
+        assert sorted(OutboxMessage.objects.latest("id").attachments) == sorted(
+            attachment.file.name for attachment in task.attachments.all()
         )
-        mock_email.attach.assert_any_call(
-            task.attachments.get(file__icontains="test_file2").file.name,
-            b"Test file content 2",
-            "text/plain",
-        )
-
-        mock_email.send.assert_called_once()
 
         messages_list = list(get_messages(request))
         assert any(
@@ -303,11 +695,7 @@ def test_task_update_view_authenticated_with_permission(
     attach_messages_middleware(request)
     assert request.FILES.getlist("attachments") == test_files
 
-    with patch("tasks.views.EmailMessage") as mock_email_class, patch(
-        "users.models.AuditEntry.log_action"
-    ) as mock_log_action:
-
-        mock_email = mock_email_class.return_value
+    with patch("users.models.AuditEntry.log_action") as mock_log_action:
 
         response = TaskUpdateView.as_view()(request, pk=old_task.id)
         assert response.status_code == 302
@@ -316,7 +704,7 @@ def test_task_update_view_authenticated_with_permission(
         assert old_task.category == "failure"
         assert old_task.priority == "high"
 
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Zmiana zadania: {old_task.title}",
             f"Zostało zmienione zadanie:\n\n"
             f"Nazwa: {old_task.title}\n"
@@ -327,37 +715,27 @@ def test_task_update_view_authenticated_with_permission(
             f"Priorytet: {old_task.get_priority_display()}\n"
             f"Budynek: {', '.join(f'{building.name} ({building.address})' for building in old_task.building.all())}\n"
             f"Opis: {old_task.description}\n"
-            f"Komentarze: Brak",
+            f"Nowe komentarze: Brak\n"
+            f"Wszystkie komentarze: {absolute_url(reverse('task_list'))}?task={old_task.pk}",
             DEFAULT_FROM_EMAIL,
             [user.email for user in users],
         )
 
-        mock_email.send.assert_called_once()
-
         mock_log_action.assert_any_call(
             AuditEntry.TASK_UPDATED, request, f"id={old_task.id}, {old_task.title}"
         )
         mock_log_action.assert_any_call(
-            AuditEntry.EMAIL_SENT,
+            AuditEntry.EMAIL_QUEUED,
             request,
             f"Zmiana zadania: {old_task.title} -> ['user1@example.com', 'user2@example.com']",
         )
 
         assert old_task.attachments.count() == 2
 
-        mock_email.attach.assert_any_call(
-            old_task.attachments.get(file__icontains="test_file1").file.name,
-            b"Test file content 1",
-            "text/plain",
-        )
-        mock_email.attach.assert_any_call(
-            old_task.attachments.get(file__icontains="test_file2").file.name,
-            b"Test file content 2",
-            "text/plain",
+        assert sorted(OutboxMessage.objects.latest("id").attachments) == sorted(
+            attachment.file.name for attachment in old_task.attachments.all()
         )
 
-        mock_email.send.assert_called_once()
-
         messages_list = list(get_messages(request))
         assert any(
             msg.message == "Zadanie zaktualizowane pomyślnie." for msg in messages_list
@@ -446,25 +824,21 @@ def test_task_delete_view_autheticated_with_permission(
     request.user = user
     attach_messages_middleware(request)
 
-    with patch("tasks.views.EmailMessage") as mock_email_class, patch(
-        "users.models.AuditEntry.log_action"
-    ) as mock_log_action:
-        mock_email = mock_email_class.return_value
+    with patch("users.models.AuditEntry.log_action") as mock_log_action:
         response = TaskDeleteView.as_view()(request, pk=task.id)
         assert response.status_code == 302
         assert not Task.objects.filter(title="Test Task").exists()
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Usunięcie zadania: {task.title}",
             f"Zadanie {task.title} zostało usunięte.",
             DEFAULT_FROM_EMAIL,
             [user.email],
         )
-        mock_email.send.assert_called_once()
         mock_log_action.assert_any_call(
             AuditEntry.TASK_DELETED, request, f"id={task.id}, {task.title}"
         )
         mock_log_action.assert_any_call(
-            AuditEntry.EMAIL_SENT,
+            AuditEntry.EMAIL_QUEUED,
             request,
             f"Usunięcie zadania: {task.title} -> ['t.test@dacpol.eu']",
         )
@@ -539,11 +913,8 @@ def test_task_create_view_ajax_authenticated_with_permission(
     attach_messages_middleware(request)
     assert request.FILES.getlist("attachments") == test_files
 
-    with patch("tasks.views.EmailMessage") as mock_email_class, patch(
-        "users.models.AuditEntry.log_action"
-    ) as mock_log_action:
+    with patch("users.models.AuditEntry.log_action") as mock_log_action:
 
-        mock_email = mock_email_class.return_value
         response = TaskCreateView.as_view()(request)
         assert response.status_code == 200
         assert isinstance(response, JsonResponse)
@@ -551,7 +922,7 @@ def test_task_create_view_ajax_authenticated_with_permission(
 
         task = Task.objects.get(title="New Task")
 
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Nowe zadanie: {task.title}",
             f"Zostało ci przydzielone nowe zadanie:\n\n"
             f"Nazwa: {task.title}\n"
@@ -565,29 +936,20 @@ def test_task_create_view_ajax_authenticated_with_permission(
             [assigned_person.email for assigned_person in assigned_persons],
         )
 
-        mock_email.send.assert_called_once()
         mock_log_action.assert_any_call(
             AuditEntry.TASK_CREATED, request, f"id={task.id}, {task.title}"
         )
         mock_log_action.assert_any_call(
-            AuditEntry.EMAIL_SENT,
+            AuditEntry.EMAIL_QUEUED,
             request,
             f"Nowe zadanie: {task.title} -> ['user1@example.com', 'user2@example.com']",
         )
 
         assert task.attachments.count() == 2
 
-        mock_email.attach.assert_any_call(
-            task.attachments.get(file__icontains="test_file1").file.name,
-            b"Test file content 1",
-            "text/plain",
-        )
-        mock_email.attach.assert_any_call(
-            task.attachments.get(file__icontains="test_file2").file.name,
-            b"Test file content 2",
-            "text/plain",
+        assert sorted(OutboxMessage.objects.latest("id").attachments) == sorted(
+            attachment.file.name for attachment in task.attachments.all()
         )
-        mock_email.send.assert_called_once()
 
         messages_list = list(get_messages(request))
         assert any(
@@ -631,10 +993,7 @@ def test_task_update_view_ajax_authenticated_with_permission(
     attach_messages_middleware(request)
     assert request.FILES.getlist("attachments") == test_files
 
-    with patch("tasks.views.EmailMessage") as mock_email_class, patch(
-        "users.models.AuditEntry.log_action"
-    ) as mock_log_action:
-        mock_email = mock_email_class.return_value
+    with patch("users.models.AuditEntry.log_action") as mock_log_action:
         response = TaskUpdateView.as_view()(request, pk=old_task.id)
         assert response.status_code == 200
         assert isinstance(response, JsonResponse)
@@ -642,7 +1001,7 @@ def test_task_update_view_ajax_authenticated_with_permission(
         assert old_task.title == "New Task"
         assert old_task.priority == "low"
         assert old_task.category == "planned"
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Zmiana zadania: {old_task.title}",
             f"Zostało zmienione zadanie:\n\n"
             f"Nazwa: {old_task.title}\n"
@@ -653,31 +1012,23 @@ def test_task_update_view_ajax_authenticated_with_permission(
             f"Priorytet: {old_task.get_priority_display()}\n"
             f"Budynek: {', '.join(f'{building.name} ({building.address})' for building in old_task.building.all())}\n"
             f"Opis: {old_task.description}\n"
-            f"Komentarze: Brak",
+            f"Nowe komentarze: Brak\n"
+            f"Wszystkie komentarze: {absolute_url(reverse('task_list'))}?task={old_task.pk}",
             DEFAULT_FROM_EMAIL,
             [user.email for user in users],
         )
-        mock_email.send.assert_called_once()
         mock_log_action.assert_any_call(
             AuditEntry.TASK_UPDATED, request, f"id={old_task.id}, {old_task.title}"
         )
         mock_log_action.assert_any_call(
-            AuditEntry.EMAIL_SENT,
+            AuditEntry.EMAIL_QUEUED,
             request,
             f"Zmiana zadania: {old_task.title} -> ['user1@example.com', 'user2@example.com']",
         )
         assert old_task.attachments.count() == 2
-        mock_email.attach.assert_any_call(
-            old_task.attachments.get(file__icontains="test_file1").file.name,
-            b"Test file content 1",
-            "text/plain",
-        )
-        mock_email.attach.assert_any_call(
-            old_task.attachments.get(file__icontains="test_file2").file.name,
-            b"Test file content 2",
-            "text/plain",
+        assert sorted(OutboxMessage.objects.latest("id").attachments) == sorted(
+            attachment.file.name for attachment in old_task.attachments.all()
         )
-        mock_email.send.assert_called_once()
 
         messages_list = list(get_messages(request))
         assert any(
@@ -704,26 +1055,22 @@ def test_task_delete_view_ajax_authenticated_with_permission(
     request.user = user
     attach_messages_middleware(request)
 
-    with patch("tasks.views.EmailMessage") as mock_email_class, patch(
-        "users.models.AuditEntry.log_action"
-    ) as mock_log_action:
-        mock_email = mock_email_class.return_value
+    with patch("users.models.AuditEntry.log_action") as mock_log_action:
         response = TaskDeleteView.as_view()(request, pk=task.id)
         assert response.status_code == 200
         assert isinstance(response, JsonResponse)
         assert not Task.objects.filter(title="Test Task").exists()
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Usunięcie zadania: {task.title}",
             f"Zadanie {task.title} zostało usunięte.",
             DEFAULT_FROM_EMAIL,
             [user.email],
         )
-        mock_email.send.assert_called_once()
         mock_log_action.assert_any_call(
             AuditEntry.TASK_DELETED, request, f"id={task.id}, {task.title}"
         )
         mock_log_action.assert_any_call(
-            AuditEntry.EMAIL_SENT,
+            AuditEntry.EMAIL_QUEUED,
             request,
             f"Usunięcie zadania: {task.title} -> ['t.test@dacpol.eu']",
         )
@@ -819,11 +1166,7 @@ def test_task_employee_status_update_view(
     request_task_status_update.user = assigned_persons[0]
     attach_messages_middleware(request_task_status_update)
 
-    with patch("tasks.views.AuditEntry.log_action") as mock_log_action, patch(
-        "tasks.views.EmailMessage"
-    ) as mock_email_class:
-
-        mock_email = mock_email_class.return_value
+    with patch("tasks.views.AuditEntry.log_action") as mock_log_action:
 
         response = TaskEmployeeStatusUpdateView.as_view()(
             request_task_status_update, pk=task.pk, status="confirmed"
@@ -833,7 +1176,7 @@ def test_task_employee_status_update_view(
         task.refresh_from_db()
         assert task.status_field == "confirmed"
 
-        mock_email_class.assert_called_once_with(
+        assert_queued_email(
             f"Aktualizacja statusu: {task.title}",
             f"Osoba odpowiedzialna za zadanie oznaczyła je jako wykonano:\n\n"
             f"Nazwa: {task.title}\n"
@@ -848,8 +1191,6 @@ def test_task_employee_status_update_view(
             [manager.email, assigned_persons[1].email],
         )
 
-        mock_email.send.assert_called_once()
-
         expected_calls = [
             call(
                 AuditEntry.TASK_UPDATED,
@@ -857,7 +1198,7 @@ def test_task_employee_status_update_view(
                 f"id={task.id}, {task.title} -> {task.status_field}",
             ),
             call(
-                AuditEntry.EMAIL_SENT,
+                AuditEntry.EMAIL_QUEUED,
                 request_task_status_update,
                 f"Aktualizacja statusu: {task.title} -> ['{task.created_by.email}', '{assigned_persons[1].email}']",
             ),
@@ -895,9 +1236,7 @@ def test_task_employee_status_update_view_return_empty_status(
     request.user = user
     attach_messages_middleware(request)
 
-    with patch("tasks.views.AuditEntry.log_action") as mock_log_action, patch(
-        "tasks.views.EmailMessage"
-    ):
+    with patch("tasks.views.AuditEntry.log_action") as mock_log_action:
         response = TaskEmployeeStatusUpdateView.as_view()(
             request, pk=task.pk, status="none"
         )
@@ -913,7 +1252,7 @@ def test_task_employee_status_update_view_return_empty_status(
                 f"id={task.id}, {task.title} -> Wykonanie zadania cofnięte.",
             ),
             call(
-                AuditEntry.EMAIL_SENT,
+                AuditEntry.EMAIL_QUEUED,
                 request,
                 f"Aktualizacja statusu: {task.title} -> ['{task.created_by.email}']",
             ),
@@ -968,7 +1307,7 @@ def test_task_manager_status_update_view_get(
                 f"id={task.id}, {task.title} -> {task.status_field}",
             ),
             call(
-                AuditEntry.EMAIL_SENT,
+                AuditEntry.EMAIL_QUEUED,
                 request,
                 f"Aktualizacja statusu: {task.title} -> ['{task.created_by.email}']",
             ),
@@ -1020,7 +1359,7 @@ def test_task_manager_status_update_view_post(
                 f"id={task.id}, {task.title} -> {task.status_field}",
             ),
             call(
-                AuditEntry.EMAIL_SENT,
+                AuditEntry.EMAIL_QUEUED,
                 request,
                 f"Aktualizacja statusu: {task.title} -> ['{task.created_by.email}']",
             ),
@@ -1053,6 +1392,25 @@ def test_task_list_view_filters(
     assert task2.title not in response.content.decode()
 
 
+@pytest.mark.django_db
+def test_task_list_view_preselects_the_linked_task(
+    rf, user_factory, task_factory, view_task_permission_factory
+):
+    user = user_factory()
+    task1 = task_factory(user=user, title="Linked Task")
+    task2 = task_factory(user=user, title="Other Task")
+    user.user_permissions.add(view_task_permission_factory())
+
+    request = rf.get(reverse("task_list"), {"task": task1.pk})
+    request.user = user
+    response = TaskListView.as_view()(request)
+    response.render()
+
+    assert response.status_code == 200
+    assert list(response.context_data["tasks"]) == [task1]
+    assert task2.title not in response.content.decode()
+
+
 @pytest.mark.django_db
 def test_task_list_view_date_filtering(
     rf, user_factory, task_factory, view_task_permission_factory
@@ -1079,6 +1437,32 @@ def test_task_list_view_date_filtering(
     assert task2.title not in response.content.decode()
 
 
+@pytest.mark.django_db
+def test_task_list_view_date_filters_use_range_predicates(rf, user_factory):
+    user = user_factory()
+    request = rf.get(
+        reverse("task_list"),
+        {
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+            "closed_start": "2024-01-01",
+            "closed_end": "2024-01-31",
+            "deadline_start": "2024-01-01",
+            "deadline_end": "2024-01-31",
+        },
+    )
+    request.user = user
+    view = TaskListView()
+    view.setup(request)
+
+    sql = str(view.get_queryset().query)
+
+    assert "django_datetime_cast_date" not in sql
+    for column in ("created_at", "closed_at", "deadline"):
+        assert f'"tasks_task"."{column}" >= 2024-01-01 00:00:00' in sql
+        assert f'"tasks_task"."{column}" < 2024-02-01 00:00:00' in sql
+
+
 @pytest.mark.django_db
 def test_task_list_view_manager_access(
     rf, user_factory, multiple_users, task_factory, view_task_permission_factory
@@ -1257,3 +1641,19 @@ def test_task_leave_comment_email_with_attachments(
         assert json_response["success"] is True
 
         mock_notify.assert_called_once_with(task)
+
+
+def test_serve_attachment_requires_login_or_signed_token(rf, anonymous_user):
+    path = reverse("serve_attachment", kwargs={"file_path": "attachments/photo.jpg"})
+    request = rf.get(path)
+    request.user = anonymous_user()
+
+    response = serve_attachment(request, file_path="attachments/photo.jpg")
+    assert response.status_code == 302
+    assert "/login" in response.url
+
+    token = attachment_token("attachments/other.jpg")
+    request = rf.get(path, {"token": token})
+    request.user = anonymous_user()
+    with pytest.raises(PermissionDenied):
+        serve_attachment(request, file_path="attachments/photo.jpg")
@@ -0,0 +1,110 @@
+import io
+
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from mailing.models import OutboxMessage
+
+from proj.imports import CsvImportError
+
+import pytest
+
+from users.imports import PARALLEL_HASHING_THRESHOLD, hash_passwords, import_users
+from users.models import AuditEntry, CmmsUser
+
+HEADER = "email,first_name,last_name,password,is_manager,groups,permissions\n"
+
+
+@pytest.mark.django_db
+def test_import_users_creates_users_groups_and_permissions(
+    django_assert_max_num_queries,
+):
+    technicians = Group.objects.create(name="Technicy")
+    rows = "".join(
+        f"tech{number}@example.com,Jan,Nowak{number},Haslo{number},false,"
+        "technicy,tasks.view_task|TASKS.change_task\n"
+        for number in range(5)
+    )
+    rows += "kierownik@example.com,Anna,Kowalska,,true,,\n"
+
+    with django_assert_max_num_queries(14):
+        users = import_users(io.StringIO(HEADER + rows))
+
+    assert len(users) == 6
+    technician = CmmsUser.objects.get(email="tech3@example.com")
+    assert technician.check_password("Haslo3")
+    assert technician.first_login
+    assert list(technician.groups.all()) == [technicians]
+    assert technician.has_perm("tasks.change_task")
+    assert CmmsUser.objects.get(email="kierownik@example.com").is_manager
+    assert CmmsUser.user_permissions.through.objects.count() == 10
+    assert AuditEntry.objects.filter(action=AuditEntry.USER_ADDED).count() == 6
+    messages = OutboxMessage.objects.filter(sensitive=True)
+    assert messages.count() == 6
+    assert "HASŁO: Haslo3" in messages.get(to=["tech3@example.com"]).body
+
+
+@pytest.mark.django_db
+def test_import_users_rejects_file_with_invalid_rows(user_factory):
+    user_factory(email="zajety@example.com")
+    rows = (
+        "zajety@example.com,Jan,Nowak,,,,\n"
+        "nowy@example.com,Jan,,,,Brak,\n"
+        "nowy@example.com,Jan,Nowak,,,,tasks.fly\n"
+        "dwa@example.com,Jan,Nowak,,,,\n"
+        "DWA@example.com,Jan,Nowak,,,,\n"
+    )
+
+    with pytest.raises(CsvImportError) as exc_info:
+        import_users(io.StringIO(HEADER + rows))
+
+    errors = exc_info.value.errors
+    assert "Wiersz 2: email: adres jest już zajęty." in errors
+    assert any(error.startswith("Wiersz 3: last_name") for error in errors)
+    assert "Wiersz 3: groups: nie znaleziono 'Brak'." in errors
+    assert "Wiersz 4: permissions: nie znaleziono 'tasks.fly'." in errors
+    assert "Wiersz 6: email: adres jest już zajęty." in errors
+    assert len(errors) == 5
+    assert CmmsUser.objects.count() == 1
+
+
+def test_hash_passwords_in_a_process_pool():
+    passwords = [f"Haslo{number}" for number in range(PARALLEL_HASHING_THRESHOLD)]
+
+    hashes = hash_passwords(passwords, workers=2)
+
+    assert len(set(hashes)) == len(passwords)
+    assert all(map(check_password, passwords, hashes))
+    assert hashes[0].startswith("argon2")
+
+
+@pytest.mark.django_db
+def test_user_import_view_in_admin(client, superuser_factory):
+    client.force_login(superuser_factory())
+    content = "email;first_name;last_name\nnowy@example.com;Jan;Nowak\n"
+    upload = io.BytesIO(content.encode("utf-8-sig"))
+    upload.name = "uzytkownicy.csv"
+
+    response = client.post(reverse("admin:users_cmmsuser_import"), {"file": upload})
+
+    assert response.status_code == 302
+    assert response.url == reverse("admin:users_cmmsuser_changelist")
+    assert CmmsUser.objects.filter(email="nowy@example.com").exists()
+    response = client.get(reverse("admin:users_cmmsuser_changelist"))
+    assert reverse("admin:users_cmmsuser_import").encode() in response.content
+
+
+@pytest.mark.django_db
+def test_import_users_command(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text(HEADER + "nowy@example.com,Jan,Nowak,,,,\n")
+
+    call_command("import_users", str(path), "--no-notify", stdout=io.StringIO())
+
+    assert CmmsUser.objects.filter(email="nowy@example.com").exists()
+    assert not OutboxMessage.objects.exists()
+
+    with pytest.raises(CommandError):
+        call_command("import_users", str(path), stdout=io.StringIO())
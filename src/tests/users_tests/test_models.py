@@ -1,12 +1,16 @@
+import io
 from ipaddress import ip_address
 from unittest.mock import Mock
 
+from django.core.management import call_command
 from django.db.utils import IntegrityError
 from django.utils.timezone import now
 
+from mailing.models import OutboxMessage
+
 import pytest
 
-from users.models import AuditEntry
+from users.models import AuditEntry, CmmsUser
 from users.models import get_visitor_ip
 
 
@@ -18,6 +22,47 @@ def test_create_user(user_factory):
     assert user.last_name == "Doe"
 
 
+@pytest.mark.django_db
+def test_new_user_gets_a_queued_welcome_email(
+    settings, mailoutbox, django_assert_num_queries
+):
+    user = CmmsUser.objects.create(
+        email="new@example.com",
+        password="Haslo123",
+        first_name="Jan",
+        last_name="Nowak",
+    )
+
+    assert user.check_password("Haslo123")
+    assert mailoutbox == []
+    message = OutboxMessage.objects.get()
+    assert (message.subject, message.to) == (
+        "CMMS: Twoje dane logowania",
+        ["new@example.com"],
+    )
+    assert message.sensitive
+    assert "HASŁO: Haslo123" in message.body
+    assert "<b>new@example.com</b>" in message.html_body
+    assert set(AuditEntry.objects.values_list("action", flat=True)) == {
+        AuditEntry.USER_ADDED,
+        AuditEntry.EMAIL_QUEUED,
+    }
+
+    call_command("dispatch_outbox", once=True, workers=1, stdout=io.StringIO())
+
+    (email,) = mailoutbox
+    html, mimetype = email.alternatives[0]
+    assert mimetype == "text/html"
+    assert "Haslo123" in html
+    message.refresh_from_db()
+    assert (message.body, message.html_body) == ("", "")
+
+    user.first_name = "Janusz"
+    with django_assert_num_queries(1):
+        user.save()
+    assert OutboxMessage.objects.count() == 1
+
+
 @pytest.mark.django_db
 def test_create_superuser(superuser_factory):
     user = superuser_factory()
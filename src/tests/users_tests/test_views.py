@@ -1,7 +1,10 @@
+from django.core.cache import cache
 from django.urls import reverse
 
 import pytest
 
+from users.models import CmmsUser
+
 
 @pytest.mark.django_db
 def test_login_view_get(client):
@@ -100,3 +103,95 @@ def test_first_login_password_change_flow(client, user_factory):
 
     user.refresh_from_db()
     assert not user.first_login
+
+
+@pytest.fixture
+def autocomplete_client(client, user_factory, view_task_permission_factory):
+    cache.clear()
+    user = user_factory(first_name="Anna", last_name="Kowalska")
+    user.user_permissions.add(view_task_permission_factory())
+    client.force_login(user)
+    return client
+
+
+@pytest.mark.django_db
+def test_user_autocomplete_requires_permission(client, user_factory):
+    client.force_login(user_factory())
+    response = client.get(reverse("user_autocomplete"), {"term": "a"})
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_user_autocomplete_matches_name_and_email_prefixes(autocomplete_client):
+    CmmsUser.objects.create(
+        email="j.nowak@example.com", first_name="Jan", last_name="Nowak"
+    )
+    CmmsUser.objects.create(
+        email="p.janik@example.com", first_name="Piotr", last_name="Janik"
+    )
+    CmmsUser.objects.create(
+        email="m.bajan@example.com", first_name="Marek", last_name="Bajan"
+    )
+
+    response = autocomplete_client.get(reverse("user_autocomplete"), {"term": "JAN"})
+    texts = [result["text"] for result in response.json()["results"]]
+    assert texts == ["Piotr Janik", "Jan Nowak"]
+
+    response = autocomplete_client.get(
+        reverse("user_autocomplete"), {"term": "jan now"}
+    )
+    assert [result["text"] for result in response.json()["results"]] == ["Jan Nowak"]
+    assert response["Cache-Control"] == "private, no-cache"
+
+    response = autocomplete_client.get(
+        reverse("user_autocomplete"),
+        {"term": "jan now"},
+        headers={"if-none-match": response["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_user_autocomplete_pages_and_skips_inactive_users(autocomplete_client):
+    CmmsUser.objects.bulk_create(
+        CmmsUser(
+            email=f"worker{i:02}@example.com",
+            first_name=f"Worker{i:02}",
+            last_name="Worker",
+            is_active=i != 0,
+        )
+        for i in range(25)
+    )
+
+    url = reverse("user_autocomplete")
+    first = autocomplete_client.get(url, {"term": "work"}).json()
+    second = autocomplete_client.get(url, {"term": "work", "page": 2}).json()
+
+    assert len(first["results"]) == 20
+    assert first["pagination"] == {"more": True}
+    assert len(second["results"]) == 4
+    assert second["pagination"] == {"more": False}
+    texts = [result["text"] for result in first["results"] + second["results"]]
+    assert "Worker00 Worker" not in texts
+
+
+@pytest.mark.django_db
+def test_user_autocomplete_cache_is_invalidated_on_save(
+    autocomplete_client, django_assert_num_queries
+):
+    url = reverse("user_autocomplete")
+    autocomplete_client.get(url, {"term": "kow"})
+    # session, user and permissions only; the results come from the cache
+    with django_assert_num_queries(4):
+        response = autocomplete_client.get(url, {"term": "kow"})
+    assert len(response.json()["results"]) == 1
+
+    CmmsUser.objects.create(
+        email="k.kowal@example.com", first_name="Karol", last_name="Kowal"
+    )
+
+    response = autocomplete_client.get(
+        url, {"term": "kow"}, headers={"if-none-match": response["ETag"]}
+    )
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 2
@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.urls import path
 
 from .forms import CmmsUserChangeForm, CmmsUserCreationForm
 from .models import AuditEntry, CmmsUser
+from .views import UserImportView
 
 
 class CmmsUserAdmin(UserAdmin):
@@ -16,6 +18,7 @@ class CmmsUserAdmin(UserAdmin):
             "Permissions",
             {"fields": ("is_manager", "is_staff", "is_superuser", "is_active")},
         ),
+        ("Notifications", {"fields": ("notification_mode", "digest_interval")}),
     )
     add_fieldsets = (
         (
@@ -40,6 +43,19 @@ class CmmsUserAdmin(UserAdmin):
     search_fields = ("email", "first_name", "last_name")
     ordering = ("email", "first_name", "last_name")
 
+    def get_urls(self):
+        """
+        Adds the CSV import, linked from the change list.
+        """
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(UserImportView.as_view()),
+                name="users_cmmsuser_import",
+            ),
+            *super().get_urls(),
+        ]
+
 
 class AuditEntryAdmin(admin.ModelAdmin):
     list_display = ("date", "action", "email", "ip", "description")
@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib.auth.forms import (
     PasswordChangeForm,
     UserChangeForm,
@@ -31,6 +32,26 @@ class CmmsUserCreationForm(UserCreationForm):
         fields = ("email", "first_name", "last_name")
 
 
+class UserImportRowForm(forms.ModelForm):
+    """
+    Validates the fields of one row of an imported CSV file.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["first_name"].required = True
+        self.fields["last_name"].required = True
+
+    def validate_unique(self):
+        """
+        Skipped, import_users checks the emails of all rows at once.
+        """
+
+    class Meta:
+        model = CmmsUser
+        fields = ["email", "first_name", "last_name", "is_manager"]
+
+
 class CmmsUserChangeForm(UserChangeForm):
 
     def __init__(self, *args, **kwargs):
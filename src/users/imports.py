@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+
+from proj.autocomplete import invalidate_autocomplete
+from proj.imports import (
+    CsvImportError,
+    format_form_errors,
+    read_csv_rows,
+    resolve_references,
+)
+
+from users.forms import UserImportRowForm
+from users.models import AuditEntry, CmmsUser, queue_welcome_emails
+
+USER_COLUMNS = ["email", "first_name", "last_name"]
+USER_OPTIONAL_COLUMNS = ["password", "is_manager", "groups", "permissions"]
+# Below this many passwords starting the processes costs more than it saves
+PARALLEL_HASHING_THRESHOLD = 16
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes the passwords with the default hasher, Argon2, which is slow
+    on purpose and bounds the time of a large import. They are split
+    between a pool of processes, one per core unless workers is given.
+    The processes are spawned rather than forked, so that they do not
+    inherit the open database connections.
+    """
+    passwords = list(passwords)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < PARALLEL_HASHING_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    chunksize = max(len(passwords) // (workers * 4), 1)
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def get_permission_lookup():
+    """
+    Maps lowercased app_label.codename names of the permissions to their ids.
+    """
+    return {
+        f"{app_label}.{codename}".lower(): pk
+        for pk, app_label, codename in Permission.objects.values_list(
+            "pk", "content_type__app_label", "codename"
+        )
+    }
+
+
+def import_users(stream, request=None, notify=True, batch_size=500, workers=None):
+    """
+    Validates every row of the CSV stream and, if all of them are valid,
+    hashes the passwords in parallel, see hash_passwords, and creates the users
+    and their group and permission links with bulk INSERTs.
+    Groups are referenced by name and permissions as app_label.codename,
+    separated with |. Rows without a password get one from initial_password.
+    Logs one audit entry per user and queues the welcome emails.
+    Returns the created users, or raises CsvImportError listing the invalid rows.
+    """
+    emails = {
+        email.lower() for email in CmmsUser.objects.values_list("email", flat=True)
+    }
+    groups = {name.lower(): pk for pk, name in Group.objects.values_list("pk", "name")}
+    permissions = get_permission_lookup()
+
+    users = []
+    passwords = []
+    links = []
+    errors = []
+    for line, row in read_csv_rows(stream, USER_COLUMNS, USER_OPTIONAL_COLUMNS):
+        row_errors = []
+        group_ids = resolve_references(
+            row["groups"], groups, "groups", line, row_errors, required=False
+        )
+        permission_ids = resolve_references(
+            row["permissions"],
+            permissions,
+            "permissions",
+            line,
+            row_errors,
+            required=False,
+        )
+        form = UserImportRowForm(row)
+        if not form.is_valid():
+            row_errors = format_form_errors(line, form) + row_errors
+        elif form.cleaned_data["email"].lower() in emails:
+            row_errors.append(f"Wiersz {line}: email: adres jest już zajęty.")
+        if row_errors:
+            errors.extend(row_errors)
+            continue
+
+        user = form.save(commit=False)
+        user.password = row["password"]
+        emails.add(user.email.lower())
+        users.append(user)
+        passwords.append(user.initial_password())
+        links.append((set(group_ids), set(permission_ids)))
+
+    if errors:
+        raise CsvImportError(errors)
+
+    for user, hashed in zip(users, hash_passwords(passwords, workers)):
+        user.password = hashed
+
+    UserGroup = CmmsUser.groups.through
+    UserPermission = CmmsUser.user_permissions.through
+    with transaction.atomic():
+        CmmsUser.objects.bulk_create(users, batch_size=batch_size)
+        UserGroup.objects.bulk_create(
+            [
+                UserGroup(cmmsuser_id=user.pk, group_id=group_id)
+                for user, (group_ids, _) in zip(users, links)
+                for group_id in group_ids
+            ],
+            batch_size=batch_size,
+        )
+        UserPermission.objects.bulk_create(
+            [
+                UserPermission(cmmsuser_id=user.pk, permission_id=permission_id)
+                for user, (_, permission_ids) in zip(users, links)
+                for permission_id in permission_ids
+            ],
+            batch_size=batch_size,
+        )
+        AuditEntry.log_actions(
+            AuditEntry.USER_ADDED,
+            request,
+            [f"id={user.id}, {user.full_name}" for user in users],
+        )
+        if notify and users:
+            queue_welcome_emails(users, passwords)
+            AuditEntry.log_action(
+                AuditEntry.EMAIL_QUEUED,
+                request,
+                f"Welcome emails -> {len(users)} users",
+            )
+
+    invalidate_autocomplete("users")
+    return users
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from proj.imports import CsvImportError
+
+from users.imports import USER_COLUMNS, USER_OPTIONAL_COLUMNS, import_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users from a UTF-8 CSV file with the columns: "
+        f"{', '.join(USER_COLUMNS)} and optionally {', '.join(USER_OPTIONAL_COLUMNS)}. "
+        "Groups are referenced by name and permissions as app_label.codename, "
+        "several of them separated with |. Passwords are hashed in parallel "
+        "and every user gets a welcome email with their password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the CSV file.")
+        parser.add_argument(
+            "--no-notify",
+            action="store_true",
+            help="Do not send the welcome emails.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of processes hashing the passwords, one per core by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of rows written per INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                users = import_users(
+                    stream,
+                    notify=not options["no_notify"],
+                    batch_size=options["batch_size"],
+                    workers=options["workers"],
+                )
+        except CsvImportError as exc:
+            raise CommandError(f"Import rejected:\n{exc}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(users)} users."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0003_alter_cmmsuser_is_manager"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cmmsuser",
+            index=models.Index(
+                django.db.models.functions.text.Lower("first_name"),
+                name="user_first_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cmmsuser",
+            index=models.Index(
+                django.db.models.functions.text.Lower("last_name"),
+                name="user_last_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cmmsuser",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="user_email_lower_idx",
+            ),
+        ),
+    ]
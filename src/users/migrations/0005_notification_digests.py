@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_name_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cmmsuser",
+            name="digest_interval",
+            field=models.PositiveIntegerField(
+                default=60, verbose_name="Odstęp między podsumowaniami (minuty)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cmmsuser",
+            name="notification_mode",
+            field=models.CharField(
+                choices=[("immediate", "Od razu"), ("digest", "Zbiorczo")],
+                default="immediate",
+                max_length=10,
+                verbose_name="Powiadomienia e-mail",
+            ),
+        ),
+    ]
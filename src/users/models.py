@@ -2,11 +2,13 @@ import logging
 
 from django.contrib.auth import user_logged_in, user_logged_out, user_login_failed
 from django.contrib.auth.models import AbstractUser
-from django.core.mail import EmailMultiAlternatives
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.template import loader
 from django.utils import timezone
+from django.utils.html import strip_tags
 
 from ipware import get_client_ip
 
@@ -33,12 +35,32 @@ class CmmsUser(AbstractUser):
     email = models.EmailField(("email address"), unique=True)
     first_login = models.BooleanField(default=True)
     is_manager = models.BooleanField(default=False, verbose_name=("Jest menedżerem"))
+    notification_mode = models.CharField(
+        max_length=10,
+        choices=[
+            ("immediate", "Od razu"),
+            ("digest", "Zbiorczo"),
+        ],
+        default="immediate",
+        verbose_name="Powiadomienia e-mail",
+    )
+    digest_interval = models.PositiveIntegerField(
+        default=60,
+        verbose_name="Odstęp między podsumowaniami (minuty)",
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
     objects = CmmsUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower("first_name"), name="user_first_name_lower_idx"),
+            models.Index(Lower("last_name"), name="user_last_name_lower_idx"),
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
     @property
     def full_name(self):
         """
@@ -46,73 +68,92 @@ class CmmsUser(AbstractUser):
         """
         return f"{self.first_name.title()} {self.last_name.capitalize()}"
 
+    def initial_password(self):
+        """
+        Returns the password given when creating the user, a random one,
+        or DEBUG_DEFAULT_PASSWORD from settings.py in debug mode.
+        """
+        if self.password:
+            return self.password
+        if DEBUG_PASSWORDS:
+            return DEBUG_DEFAULT_PASSWORD
+        return CmmsUser.objects.make_random_password()
+
     def save(self, *args, **kwargs):
         """
         Saves user to the database.
-        Sets a randomly generated password if the user is created automatically.
-        Sets a default password specified in DEBUG_DEFAULT_PASSWORD in settings.py if in debug mode.
-        If the user is newly created, then an email is sent to user's email address.
+        A newly created user gets the password from initial_password, sent in
+        a welcome email queued in the outbox in the same transaction and
+        delivered by the dispatch_outbox command. Telling a new user apart
+        does not take a query.
         """
         if self.is_superuser:
             self.first_login = False
             self.is_staff = True
 
-        if self.first_login and not CmmsUser.objects.filter(email=self.email).exists():
-            if self.password:
-                user_password = self.password
-            else:
-                if not DEBUG_PASSWORDS:
-                    user_password = CmmsUser.objects.make_random_password()
-                else:
-                    user_password = DEBUG_DEFAULT_PASSWORD
-            self.set_password(user_password)
-
-            # send an email with a generated password
-            context = {
-                "user_email": self.email,
-                "user_first_name": self.first_name,
-                "user_password": user_password,
-            }
-            try:
-                subject = loader.render_to_string(
-                    "registration/initial_password_subject.txt", context
-                )
-                subject = "".join(subject.splitlines())
-                body = loader.render_to_string(
-                    "registration/initial_password_email.html", context
-                )
+        if not (self._state.adding and self.first_login):
+            super().save(*args, **kwargs)
+            return
+
+        user_password = self.initial_password()
+        self.set_password(user_password)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            queue_welcome_emails([self], [user_password])
+            AuditEntry.log_action(
+                AuditEntry.USER_ADDED, None, f"id={self.id}, {self.full_name}", None
+            )
+            AuditEntry.log_action(
+                AuditEntry.EMAIL_QUEUED,
+                None,
+                f"Welcome email -> {self.full_name}",
+                None,
+            )
 
-                email_message = EmailMultiAlternatives(
-                    subject, body, DEFAULT_FROM_EMAIL, [self.email]
-                )
-                html_email = loader.render_to_string(
-                    "registration/initial_password_email.html", context
-                )
-                email_message.attach_alternative(html_email, "text/html")
-                email_message.send()
+    def __str__(self):
+        return self.full_name
 
-                AuditEntry.log_action(
-                    AuditEntry.USER_ADDED, None, f"id={self.id}, {self.full_name}", None
-                )
-                AuditEntry.log_action(
-                    AuditEntry.EMAIL_SENT,
-                    None,
-                    f"Welcome email -> {self.full_name}",
-                    None,
-                )
-            except Exception as exc:
-                AuditEntry.log_action(
-                    AuditEntry.EMAIL_FAILED,
-                    None,
-                    f"Welcome email - > {self.full_name}",
-                    None,
-                )
-                logger.error(exc)
 
-        super().save(*args, **kwargs)
+def welcome_message(user, password):
+    """
+    Returns the outbox message with the login and the password of a new user.
+    The template is rendered once, its text is the plain text alternative.
+    The message is sensitive, so its body is erased once it has been sent.
+    """
+    from mailing.outbox import outbox_message
+
+    context = {
+        "user_email": user.email,
+        "user_first_name": user.first_name,
+        "user_password": password,
+    }
+    subject = loader.render_to_string(
+        "registration/initial_password_subject.txt", context
+    )
+    html_body = loader.render_to_string(
+        "registration/initial_password_email.html", context
+    )
+    return outbox_message(
+        "".join(subject.splitlines()),
+        "\n".join(
+            line.strip() for line in strip_tags(html_body).splitlines() if line.strip()
+        ),
+        [user.email],
+        from_email=DEFAULT_FROM_EMAIL,
+        html_body=html_body,
+        sensitive=True,
+    )
+
+
+def queue_welcome_emails(users, passwords):
+    """
+    Queues the welcome messages of the users with a single INSERT.
+    """
+    from mailing.outbox import enqueue
 
-    def __str__(self):
-        return self.full_name
+    enqueue(
+        [welcome_message(user, password) for user, password in zip(users, passwords)]
+    )
 
 
 class AuditEntry(models.Model):
@@ -126,13 +167,17 @@ class AuditEntry(models.Model):
     TASK_UPDATE_FAILED = "task_update_failed"
     TASK_DELETED = "task_deleted"
     TASK_DELETE_FAILED = "task_delete_failed"
+    TASKS_EXPORTED = "tasks_exported"
+    TASKS_IMPORTED = "tasks_imported"
     BUILDING_CREATED = "building_created"
     BUILDING_CREATION_FAILED = "building_creation_failed"
     BUILDING_UPDATED = "building_updated"
     BUILDING_UPDATE_FAILED = "building_update_failed"
     BUILDING_DELETED = "building_deleted"
     BUILDING_DELETE_FAILED = "building_delete_failed"
+    BUILDINGS_IMPORTED = "buildings_imported"
     TASK_COMMENT_CREATED = "task_comment_created"
+    EMAIL_QUEUED = "email_queued"
     EMAIL_SENT = "email_sent"
     EMAIL_FAILED = "email_failed"
 
@@ -174,6 +219,35 @@ class AuditEntry(models.Model):
             description=description,
         )
 
+    @staticmethod
+    def log_actions(action=None, request=None, descriptions=(), ip=None):
+        """
+        Adds one AuditEntry per description with a single bulk INSERT.
+        Takes the same params as log_action, with a list of descriptions.
+        """
+        if not ip:
+            if request:
+                ip = get_visitor_ip(request)
+
+        try:
+            email = request.user.email if request else None
+        except AttributeError:
+            email = None
+
+        date = timezone.now()
+        AuditEntry.objects.bulk_create(
+            [
+                AuditEntry(
+                    action=action,
+                    ip=ip,
+                    email=email,
+                    date=date,
+                    description=description,
+                )
+                for description in descriptions
+            ]
+        )
+
     def __unicode__(self):
         return "{0} - {1} - {2}".format(self.action, self.email, self.ip)
 
@@ -248,3 +322,16 @@ def get_visitor_ip(request):
             ip = ""
 
     return ip
+
+
+@receiver(post_save, sender=CmmsUser)
+@receiver(post_delete, sender=CmmsUser)
+def user_changed_callback(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidates the cached user autocomplete results, except on login updates.
+    """
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    from proj.autocomplete import invalidate_autocomplete
+
+    invalidate_autocomplete("users")
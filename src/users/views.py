@@ -9,8 +9,12 @@ from django.contrib.auth.views import (
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
 
+from proj.autocomplete import AutocompleteView
+from proj.imports import CsvImportView
+
 from users.forms import FirstLoginPasswordChangeForm
-from users.models import AuditEntry
+from users.imports import USER_COLUMNS, import_users
+from users.models import AuditEntry, CmmsUser
 
 
 class LoginView(LoginView):
@@ -90,3 +94,36 @@ class PasswordResetView(PasswordResetView):
             f'for: {request.POST.get("email")}',
         )
         return super().post(request)
+
+
+class UserAutocompleteView(AutocompleteView):
+    model = CmmsUser
+    permission_required = "tasks.view_task"
+    search_fields = ("first_name", "last_name", "email")
+    ordering = ("last_name", "first_name", "id")
+    namespace = "users"
+
+    def get_queryset(self):
+        return CmmsUser.objects.filter(is_active=True).only(
+            "id", "first_name", "last_name"
+        )
+
+
+class UserImportView(CsvImportView):
+    """
+    Imports users from the admin, see CmmsUserAdmin.get_urls.
+    """
+
+    permission_required = "users.add_cmmsuser"
+    success_url = reverse_lazy("admin:users_cmmsuser_changelist")
+    title = "Import użytkowników"
+    columns = USER_COLUMNS
+    column_help = (
+        "Opcjonalne kolumny: password (bez hasła zostanie wygenerowane), "
+        "is_manager: true lub false, groups (nazwy grup) i permissions "
+        "(app_label.codename), po kilka oddzielone znakiem |. "
+        "Każdy użytkownik dostanie e-mail z danymi logowania."
+    )
+
+    def run_import(self, stream):
+        return len(import_users(stream, self.request))